@@ -1,16 +1,38 @@
 """
 WINi Bottle Image Processor
 Removes backgrounds, normalizes to 400x800px, splits into left/right halves.
+
+Each image goes through one in-memory chain: remove background, clean its
+alpha, crop to the alpha bbox, a single LANCZOS resample of that crop,
+composite onto the canvas, then split. Every bottle, single or from the pair
+photo, is fitted by its bbox, so empty margins in the source no longer make
+it smaller on the canvas. Halves are crops of that one canvas; --halves views skips their PNGs
+and records their rectangles in halves.json instead. PNGs are written by
+the encoding stage the wini-app scripts share (bottle_pipeline/encode.py).
+
+Usage: python scripts/process_bottles.py [--model u2net|u2netp|isnet|silueta] [--no-cache]
+                                         [--work-size PX] [--halves files|views]
 """
 
-from rembg import remove
 from PIL import Image
+import argparse
+import json
+import math
 import os
 import sys
 
+# Shared pipeline helpers live next to the wini-app scripts
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "wini-app", "scripts"))
+from bottle_pipeline.alpha import clean_alpha  # noqa: E402
+from bottle_pipeline.encode import save_png  # noqa: E402
+from bottle_pipeline.engine import DEFAULT_MODEL, MODELS, BackgroundRemover, get_remover  # noqa: E402
+
 INPUT_DIR = os.path.join(os.path.dirname(__file__), "..", "wine-bottles")
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "..", "public", "bottles", "processed")
 TARGET_SIZE = (400, 800)
+PADDING = 20
+FIT_SIZE = (TARGET_SIZE[0] - 2 * PADDING, TARGET_SIZE[1] - 2 * PADDING)
+VIEWS_JSON = os.path.join(OUTPUT_DIR, "halves.json")
 
 # Map original filenames -> clean output names
 # Note: Pngtree files use em-dashes (—) not underscores
@@ -26,117 +48,90 @@ BOTTLE_MAP = {
 PAIR_IMAGE = "mockup-free-kJp843ucZ1I-unsplash.jpg"
 
 
-def process_bottle(input_path: str, output_name: str) -> None:
-    """Remove background, resize to fit 400x800 canvas, split into halves."""
-    print(f"  Loading {os.path.basename(input_path)}...")
-    img = Image.open(input_path)
-
-    # Convert to RGBA if needed
-    if img.mode != "RGBA":
-        img = img.convert("RGBA")
+def render(img: Image.Image, frame: tuple, bbox: tuple) -> Image.Image:
+    """Fit frame (a box of img) into the canvas, resampling only the bbox inside it.
 
-    print(f"  Removing background...")
-    img_nobg = remove(img)
-
-    # Fit bottle into target canvas maintaining aspect ratio
-    # Leave 20px padding on each side
-    max_w = TARGET_SIZE[0] - 40
-    max_h = TARGET_SIZE[1] - 40
-    img_nobg.thumbnail((max_w, max_h), Image.LANCZOS)
-
-    # Create transparent canvas and center the bottle
+    Produces what thumbnail() on img.crop(frame) would, but LANCZOS only
+    touches the destination pixels that can be non-transparent.
+    """
     canvas = Image.new("RGBA", TARGET_SIZE, (0, 0, 0, 0))
-    offset_x = (TARGET_SIZE[0] - img_nobg.width) // 2
-    offset_y = (TARGET_SIZE[1] - img_nobg.height) // 2
-    canvas.paste(img_nobg, (offset_x, offset_y), img_nobg)
-
-    # Split into left and right halves
+    fw, fh = frame[2] - frame[0], frame[3] - frame[1]
+    scale = min(FIT_SIZE[0] / fw, FIT_SIZE[1] / fh, 1.0)  # thumbnail never enlarges
+    out_w, out_h = max(1, round(fw * scale)), max(1, round(fh * scale))
+    sx, sy = out_w / fw, out_h / fh
+
+    # Destination rectangle covering the bbox, and the exact source box behind it
+    dx0, dy0 = math.floor((bbox[0] - frame[0]) * sx), math.floor((bbox[1] - frame[1]) * sy)
+    dx1, dy1 = math.ceil((bbox[2] - frame[0]) * sx), math.ceil((bbox[3] - frame[1]) * sy)
+    src = (frame[0] + dx0 / sx, frame[1] + dy0 / sy, frame[0] + dx1 / sx, frame[1] + dy1 / sy)
+    region = img.resize((dx1 - dx0, dy1 - dy0), Image.LANCZOS, box=src)
+
+    offset_x = (TARGET_SIZE[0] - out_w) // 2
+    offset_y = (TARGET_SIZE[1] - out_h) // 2
+    canvas.paste(region, (offset_x + dx0, offset_y + dy0), region)
+    return canvas
+
+
+def emit(canvas: Image.Image, output_name: str, halves: str, views: dict) -> None:
+    """Save the canvas, plus its halves as files or as rectangles in views."""
+    save_png(canvas, os.path.join(OUTPUT_DIR, f"{output_name}-full.png"))
     mid = TARGET_SIZE[0] // 2
-    left_half = canvas.crop((0, 0, mid, TARGET_SIZE[1]))
-    right_half = canvas.crop((mid, 0, TARGET_SIZE[0], TARGET_SIZE[1]))
+    boxes = {"left": (0, 0, mid, TARGET_SIZE[1]), "right": (mid, 0, TARGET_SIZE[0], TARGET_SIZE[1])}
+    if halves == "views":
+        views[output_name] = {"src": f"{output_name}-full.png", **{side: list(box) for side, box in boxes.items()}}
+        print(f"  -> Saved {output_name}-full.png (halves as views)")
+        return
+    for side, box in boxes.items():
+        save_png(canvas.crop(box), os.path.join(OUTPUT_DIR, f"{output_name}-{side}.png"))
+    print(f"  -> Saved {output_name}-left.png, {output_name}-right.png, {output_name}-full.png")
 
-    # Save all three versions
-    left_path = os.path.join(OUTPUT_DIR, f"{output_name}-left.png")
-    right_path = os.path.join(OUTPUT_DIR, f"{output_name}-right.png")
-    full_path = os.path.join(OUTPUT_DIR, f"{output_name}-full.png")
 
-    left_half.save(left_path)
-    right_half.save(right_path)
-    canvas.save(full_path)
-    print(f"  -> Saved {output_name}-left.png, {output_name}-right.png, {output_name}-full.png")
+def process_bottle(input_path: str, output_name: str, remover: BackgroundRemover, halves: str, views: dict) -> None:
+    """Remove background, fit the bottle's bbox to the 400x800 canvas, split into halves."""
+    print(f"  Removing background from {os.path.basename(input_path)}...")
+    img_nobg = clean_alpha(remover.remove_file(input_path))
+    bbox = img_nobg.getchannel("A").getbbox()
+    if bbox is None:
+        print("  WARNING: nothing left after background removal")
+        return
+    emit(render(img_nobg, bbox, bbox), output_name, halves, views)
 
 
-def process_pair_image(input_path: str) -> None:
-    """Handle the two-bottle image: crop each bottle, then process individually."""
+def process_pair_image(input_path: str, remover: BackgroundRemover, halves: str, views: dict) -> None:
+    """Handle the two-bottle image: fit each half's bottle to its own canvas."""
     print(f"\nProcessing pair image: {os.path.basename(input_path)}")
-    img = Image.open(input_path)
-
-    if img.mode != "RGBA":
-        img = img.convert("RGBA")
 
     # First remove background from the whole image
     print("  Removing background from pair...")
-    img_nobg = remove(img)
+    img_nobg = clean_alpha(remover.remove_file(input_path))
+    alpha = img_nobg.getchannel("A")
 
-    # Find the bounding boxes of each bottle by analyzing alpha channel
-    # Split roughly at the center, but be smart about it
+    # Split roughly at the center, with some overlap margin
     w, h = img_nobg.size
     mid_x = w // 2
-
-    # Crop left bottle (with some overlap margin)
-    left_bottle = img_nobg.crop((0, 0, mid_x + 20, h))
-    # Crop right bottle
-    right_bottle = img_nobg.crop((mid_x - 20, 0, w, h))
-
-    # Save temp files and process each
-    temp_left = os.path.join(OUTPUT_DIR, "_temp_left.png")
-    temp_right = os.path.join(OUTPUT_DIR, "_temp_right.png")
-
-    left_bottle.save(temp_left)
-    right_bottle.save(temp_right)
-
-    # Process each bottle individually (background already removed)
-    process_bottle_nobg(temp_left, "red-label-pair")
-    process_bottle_nobg(temp_right, "gold-label")
-
-    # Clean up temp files
-    os.remove(temp_left)
-    os.remove(temp_right)
+    for (x0, x1), output_name in (((0, mid_x + 20), "red-label-pair"), ((mid_x - 20, w), "gold-label")):
+        bbox = alpha.crop((x0, 0, x1, h)).getbbox()
+        if bbox is None:
+            print(f"  WARNING: no bottle in the {output_name} half")
+            continue
+        # The bottle is trimmed to its bbox, so frame and bbox coincide
+        bbox = (bbox[0] + x0, bbox[1], bbox[2] + x0, bbox[3])
+        emit(render(img_nobg, bbox, bbox), output_name, halves, views)
     print(f"  -> Pair processed: red-label-pair + gold-label")
 
 
-def process_bottle_nobg(input_path: str, output_name: str) -> None:
-    """Process a bottle that already has background removed."""
-    img = Image.open(input_path)
-    if img.mode != "RGBA":
-        img = img.convert("RGBA")
-
-    # Trim transparent edges to find the actual bottle
-    bbox = img.getbbox()
-    if bbox:
-        img = img.crop(bbox)
-
-    # Fit into target canvas
-    max_w = TARGET_SIZE[0] - 40
-    max_h = TARGET_SIZE[1] - 40
-    img.thumbnail((max_w, max_h), Image.LANCZOS)
-
-    canvas = Image.new("RGBA", TARGET_SIZE, (0, 0, 0, 0))
-    offset_x = (TARGET_SIZE[0] - img.width) // 2
-    offset_y = (TARGET_SIZE[1] - img.height) // 2
-    canvas.paste(img, (offset_x, offset_y), img)
-
-    mid = TARGET_SIZE[0] // 2
-    left_half = canvas.crop((0, 0, mid, TARGET_SIZE[1]))
-    right_half = canvas.crop((mid, 0, TARGET_SIZE[0], TARGET_SIZE[1]))
-
-    left_half.save(os.path.join(OUTPUT_DIR, f"{output_name}-left.png"))
-    right_half.save(os.path.join(OUTPUT_DIR, f"{output_name}-right.png"))
-    canvas.save(os.path.join(OUTPUT_DIR, f"{output_name}-full.png"))
-    print(f"  -> Saved {output_name}-left.png, {output_name}-right.png, {output_name}-full.png")
-
-
 def main():
+    parser = argparse.ArgumentParser(description="Process the original WINi bottle photos.")
+    parser.add_argument("--model", choices=MODELS, default=DEFAULT_MODEL, help="rembg model")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the rembg output cache")
+    parser.add_argument("--work-size", type=int, metavar="PX",
+                        help="run rembg on a copy at most PX on its long side, upsampling only the mask")
+    parser.add_argument("--halves", choices=("files", "views"), default="files",
+                        help="write -left/-right PNGs, or only their rectangles in halves.json")
+    args = parser.parse_args()
+    remover = get_remover(args.model, not args.no_cache, args.work_size)
+    views: dict = {}
+
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     print(f"Input: {os.path.abspath(INPUT_DIR)}")
     print(f"Output: {os.path.abspath(OUTPUT_DIR)}")
@@ -147,7 +142,7 @@ def main():
         path = os.path.join(INPUT_DIR, filename)
         if os.path.exists(path):
             print(f"\nProcessing: {filename} -> {clean_name}")
-            process_bottle(path, clean_name)
+            process_bottle(path, clean_name, remover, args.halves, views)
         else:
             print(f"\nWARNING: Not found: {filename}")
             # Try to find similar file
@@ -158,12 +153,20 @@ def main():
     # Process the pair image
     pair_path = os.path.join(INPUT_DIR, PAIR_IMAGE)
     if os.path.exists(pair_path):
-        process_pair_image(pair_path)
+        process_pair_image(pair_path, remover, args.halves, views)
     else:
         print(f"\nWARNING: Pair image not found: {PAIR_IMAGE}")
 
+    if views:
+        with open(VIEWS_JSON, "w", encoding="utf-8") as f:
+            json.dump(views, f, indent=2)
+        print(f"\nWrote {len(views)} half views to {os.path.basename(VIEWS_JSON)}")
+
+    print("\n--- Background removal timing ---")
+    print(remover.report())
+
     print("\n--- Processing complete ---")
-    processed = [f for f in os.listdir(OUTPUT_DIR) if f.endswith(".png") and not f.startswith("_")]
+    processed = [f for f in os.listdir(OUTPUT_DIR) if f.endswith(".png")]
     print(f"Generated {len(processed)} images:")
     for f in sorted(processed):
         print(f"  {f}")
@@ -0,0 +1,362 @@
+"""Benchmark the bottle image pipeline stage by stage against a JSON baseline.
+
+Every image in assets/stock-photos/ (wini-app's and the repo root's) and
+test-data/ goes through the same stages as process-uploaded-bottles.py, each
+timed on its own:
+
+  decode -> rembg -> clean_alpha -> split_bottles -> normalize_bottle -> png_encode
+
+Per stage the wall time, CPU time and peak RSS growth are recorded (median
+wall/CPU and worst peak over --repeats runs). Each fixture runs in a fresh
+process, so memory freed by an earlier fixture cannot hide the next one's
+peak. Totals are compared with the baseline, and the run fails when a
+stage's wall time or peak memory grows past --threshold times the baseline. Run once with --update-baseline on a
+machine to record its baseline before comparing an upgrade against it.
+
+--startup instead starts `bottle-cli.py status` and `dry-run` under
+`python -X importtime` and lists their slowest imports. Those commands must
+finish within STARTUP_BUDGET_S and never import rembg, onnxruntime or
+scipy, or the check fails. It is kept apart from the stage benchmark, so a
+slow dry-run never skews a stage regression run. tests/test_startup.py runs
+it against a throwaway copy of wini-app with a one-bottle manifest, so it
+needs neither real photos nor the model.
+
+Runs offline: the rembg model must already be downloaded (any earlier
+process-bottles run does that), and the rembg output cache is bypassed so
+inference is always measured.
+
+Dependencies: pip install rembg[cpu] Pillow numpy (psutil optional, for peak
+memory off Linux)
+
+Usage: python bench-bottles.py [FIXTURE ...] [--model u2net|u2netp|isnet|silueta]
+                               [--repeats N] [--baseline PATH] [--update-baseline]
+                               [--threshold X] [--startup]
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+from pathlib import Path
+from statistics import median
+
+try:
+    from PIL import Image
+    from bottle_pipeline.alpha import ALPHA_THRESHOLD
+    from bottle_pipeline.encode import encode_png
+    from bottle_pipeline.engine import DEFAULT_MODEL, MODELS, BackgroundRemover
+    from bottle_pipeline.scripts import load_script
+    from bottle_pipeline.strips import clean_alpha_strips
+except ImportError as e:
+    print(f"Missing dependency: {e}")
+    print("Run: pip install rembg[cpu] Pillow numpy")
+    sys.exit(1)
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+ROOT = Path(__file__).resolve().parent.parent
+REPO = ROOT.parent
+FIXTURE_DIRS = [ROOT / "assets" / "stock-photos", REPO / "assets" / "stock-photos", REPO / "test-data"]
+FIXTURE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+BASELINE = ROOT / ".cache" / "bench-baseline.json"  # timings are per machine, so not committed
+
+STAGES = ["decode", "rembg", "clean_alpha", "split_bottles", "normalize_bottle", "png_encode"]
+SPLIT_COUNT = 2  # bottles asked of split_bottles; only its cost is measured here
+THRESHOLD = 1.25  # fail when a stage takes more than this times its baseline
+NOISE_MS = 20.0  # ...and is slower by more than this, so tiny stages don't flap
+NOISE_MIB = 8.0  # same floor for peak memory
+SAMPLE_INTERVAL = 0.002  # seconds between RSS samples
+
+CLI = Path(__file__).resolve().parent / "bottle-cli.py"
+STARTUP_COMMANDS = [["status"], ["dry-run"]]  # bottle-cli.py runs that need no inference
+STARTUP_BUDGET_S = 1.0  # wall time each may take, interpreter start included
+HEAVY_IMPORTS = {"rembg", "onnxruntime", "onnx", "scipy", "numba", "pymatting"}
+IMPORT_TOP = 8  # slowest top-level imports listed per command
+
+
+def model_path(model: str) -> Path:
+    """Where rembg keeps the weights for a CLI model name."""
+    home = os.getenv("U2NET_HOME") or os.path.join(os.getenv("XDG_DATA_HOME", "~"), ".u2net")
+    return Path(home).expanduser() / f"{MODELS[model]}.onnx"
+
+
+def current_rss() -> int | None:
+    """Resident set size of this process in bytes, or None if unknown."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Stage:
+    """Times one stage: wall and CPU time, plus peak RSS growth sampled on a thread."""
+
+    def __enter__(self):
+        self.start_rss = self.peak_rss = current_rss()
+        self._done = threading.Event()
+        self._sampler = None
+        if self.start_rss is not None:
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+        self.start_wall, self.start_cpu = time.perf_counter(), time.process_time()
+        return self
+
+    def _sample(self) -> None:
+        while not self._done.wait(SAMPLE_INTERVAL):
+            self.peak_rss = max(self.peak_rss, current_rss())
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self.start_wall
+        self.cpu = time.process_time() - self.start_cpu
+        self._done.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self.peak_rss = max(self.peak_rss, current_rss())
+        return False
+
+    @property
+    def peak_mib(self) -> float | None:
+        if self.start_rss is None:
+            return None
+        return (self.peak_rss - self.start_rss) / 2**20
+
+
+def run_chain(path: Path, remover: BackgroundRemover, script) -> dict[str, Stage]:
+    """Push one fixture through every stage once."""
+    timings = {}
+    with Stage() as timings["decode"]:
+        img = Image.open(path).convert("RGBA")
+    with Stage() as timings["rembg"]:
+        nobg = remover.remove(img)
+    with Stage() as timings["clean_alpha"]:
+        clean = clean_alpha_strips(nobg, ALPHA_THRESHOLD, script.FEATHER_RADIUS, script.TILE_BYTES)
+    with Stage() as timings["split_bottles"], contextlib.redirect_stdout(io.StringIO()):
+        script.split_bottles(clean, SPLIT_COUNT)
+    with Stage() as timings["normalize_bottle"]:
+        result = script.normalize_bottle(clean)
+    with Stage() as timings["png_encode"]:
+        encode_png(result)
+    return timings
+
+
+def bench_fixture(path: Path, remover: BackgroundRemover, script, repeats: int) -> dict[str, dict]:
+    """Median wall/CPU and worst peak memory of each stage over repeats runs."""
+    runs = [run_chain(path, remover, script) for _ in range(repeats)]
+    results = {}
+    for stage in STAGES:
+        peaks = [r[stage].peak_mib for r in runs if r[stage].peak_mib is not None]
+        results[stage] = {
+            "wall_ms": round(median(r[stage].wall for r in runs) * 1000, 2),
+            "cpu_ms": round(median(r[stage].cpu for r in runs) * 1000, 2),
+            "peak_mib": round(max(peaks), 2) if peaks else None,
+        }
+    return results
+
+
+def _bench_worker(path: Path, model: str, repeats: int) -> tuple[dict[str, dict], float]:
+    """Benchmark one fixture in this (fresh) process; returns (results, session load seconds)."""
+    script = load_script("process-uploaded-bottles.py")
+    remover = BackgroundRemover(model)
+    remover.warm_up()
+    remover.remove(Image.new("RGBA", (64, 64)))  # keep first-inference setup out of the timings
+    return bench_fixture(path, remover, script, repeats), remover.session_load_s
+
+
+def totals(fixtures: dict[str, dict], names) -> dict[str, dict]:
+    """Per-stage sums of wall/CPU time and the largest peak over the named fixtures."""
+    out = {}
+    for stage in STAGES:
+        rows = [fixtures[n][stage] for n in names]
+        peaks = [r["peak_mib"] for r in rows if r["peak_mib"] is not None]
+        out[stage] = {
+            "wall_ms": round(sum(r["wall_ms"] for r in rows), 2),
+            "cpu_ms": round(sum(r["cpu_ms"] for r in rows), 2),
+            "peak_mib": round(max(peaks), 2) if peaks else None,
+        }
+    return out
+
+
+def versions() -> dict[str, str | None]:
+    """Versions of everything whose upgrade this benchmark is meant to catch."""
+    found = {"python": platform.python_version()}
+    for package in ("Pillow", "numpy", "rembg", "onnxruntime", "scipy"):
+        try:
+            found[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            found[package] = None
+    return found
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Regressions of current against baseline, over the fixtures both contain."""
+    common = sorted(set(current["fixtures"]) & set(baseline["fixtures"]))
+    if not common:
+        print("  WARNING: no fixtures in common with the baseline; nothing compared")
+        return []
+    if len(common) < len(current["fixtures"]):
+        print(f"  Comparing the {len(common)} fixtures also in the baseline")
+
+    now, then = totals(current["fixtures"], common), totals(baseline["fixtures"], common)
+    failures = []
+    print(f"\n  {'stage':18s} {'baseline':>10s} {'current':>10s} {'ratio':>6s}   {'peak MiB':>17s}")
+    for stage in STAGES:
+        new, old = now[stage], then[stage]
+        ratio = new["wall_ms"] / old["wall_ms"] if old["wall_ms"] else 1.0
+        flag = ""
+        if ratio > threshold and new["wall_ms"] - old["wall_ms"] > NOISE_MS:
+            flag = "  SLOWER"
+            failures.append(f"{stage}: {old['wall_ms']:.0f} ms -> {new['wall_ms']:.0f} ms ({ratio:.2f}x)")
+        peak = ""
+        if new["peak_mib"] is not None and old["peak_mib"] is not None:
+            peak = f"{old['peak_mib']:7.1f} -> {new['peak_mib']:7.1f}"
+            if new["peak_mib"] > old["peak_mib"] * threshold and new["peak_mib"] - old["peak_mib"] > NOISE_MIB:
+                flag += "  MORE MEMORY"
+                failures.append(f"{stage}: peak {old['peak_mib']:.0f} MiB -> {new['peak_mib']:.0f} MiB")
+        print(f"  {stage:18s} {old['wall_ms']:8.0f}ms {new['wall_ms']:8.0f}ms {ratio:5.2f}x   {peak:>17s}{flag}")
+    return failures
+
+
+def parse_importtime(stderr: str) -> list[tuple[int, int, str]]:
+    """(cumulative us, nesting depth, module) of every line -X importtime wrote."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(cumulative), depth, name.strip()))
+    return rows
+
+
+def startup_report(cli: Path = CLI) -> list[str]:
+    """Time STARTUP_COMMANDS under -X importtime; returns what broke the budget or imported too much."""
+    failures = []
+    for argv in STARTUP_COMMANDS:
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", str(cli), *argv],
+                              capture_output=True, text=True, cwd=cli.parent)
+        wall = time.perf_counter() - start
+        rows = parse_importtime(proc.stderr)
+        top = sorted((r for r in rows if r[1] == 0), reverse=True)
+        command = " ".join(argv)
+        print(f"  bottle-cli.py {command}: {wall:.2f}s, {sum(r[0] for r in top) / 1000:.0f} ms importing")
+        for cumulative, _, name in top[:IMPORT_TOP]:
+            print(f"    {cumulative / 1000:7.1f} ms  {name}")
+
+        heavy = sorted({name for _, _, name in rows if name.split(".")[0] in HEAVY_IMPORTS})
+        if proc.returncode != 0:
+            last = (proc.stdout.strip().splitlines() or [""])[-1]
+            failures.append(f"{command}: exited with {proc.returncode}" + (f" ({last})" if last else ""))
+        if heavy:
+            failures.append(f"{command}: imported {', '.join(sorted({n.split('.')[0] for n in heavy}))}")
+        if wall > STARTUP_BUDGET_S:
+            failures.append(f"{command}: took {wall:.2f}s (budget {STARTUP_BUDGET_S:.1f}s)")
+    return failures
+
+
+def find_fixtures(specs: list[str]) -> list[Path]:
+    """Image files named on the command line, or every image under FIXTURE_DIRS."""
+    paths = [Path(s) for s in specs] or [
+        p for folder in FIXTURE_DIRS if folder.exists() for p in sorted(folder.rglob("*"))
+    ]
+    return [p for p in paths if p.suffix.lower() in FIXTURE_SUFFIXES]
+
+
+def fixture_name(path: Path) -> str:
+    try:
+        return path.resolve().relative_to(REPO).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the bottle pipeline stage by stage.")
+    parser.add_argument("fixtures", nargs="*", help="images to use (default: stock photos and test-data)")
+    parser.add_argument("--model", choices=MODELS, default=DEFAULT_MODEL, help="rembg model")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per fixture (default: 3)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE, help=f"baseline JSON (default: {BASELINE})")
+    parser.add_argument("--update-baseline", action="store_true", help="save this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"fail when a stage exceeds this times its baseline (default: {THRESHOLD})")
+    parser.add_argument("--startup", action="store_true",
+                        help="check the start-up time and imports of bottle-cli.py instead of benchmarking")
+    args = parser.parse_args()
+
+    if args.startup:
+        print("=== Start-up imports (python -X importtime) ===")
+        failures = startup_report()
+        for failure in failures:
+            print(f"  FAIL {failure}")
+        sys.exit(1 if failures else 0)
+
+    weights = model_path(args.model)
+    if not weights.exists():
+        print(f"ERROR: {weights} not found. The benchmark runs offline; download the model once "
+              f"with: python -c \"from rembg import new_session; new_session('{MODELS[args.model]}')\"")
+        sys.exit(1)
+
+    fixtures = find_fixtures(args.fixtures)
+    if not fixtures:
+        print("ERROR: no fixture images found")
+        sys.exit(1)
+
+    print(f"Benchmarking {len(fixtures)} fixtures x {args.repeats} runs (model {args.model})")
+    results = {}
+    for path in fixtures:
+        name = fixture_name(path)
+        # spawn, because forking after onnxruntime has started threads can hang
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results[name], load_s = pool.submit(_bench_worker, path, args.model, max(1, args.repeats)).result()
+        walls = "  ".join(f"{stage} {results[name][stage]['wall_ms']:.0f}" for stage in STAGES)
+        print(f"  {name}: {walls} ms (session load {load_s * 1000:.0f})")
+
+    current = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "model": args.model,
+        "repeats": args.repeats,
+        "versions": versions(),
+        "platform": platform.platform(),
+        "stages": totals(results, results),
+        "fixtures": results,
+    }
+
+    if args.baseline.exists() and not args.update_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        print(f"\n=== Against baseline from {baseline['created']} ===")
+        changed = {k: (v, current["versions"].get(k)) for k, v in baseline["versions"].items()
+                   if current["versions"].get(k) != v}
+        for package, (old, new) in changed.items():
+            print(f"  {package}: {old} -> {new}")
+        if baseline["model"] != args.model:
+            print(f"  WARNING: baseline used model {baseline['model']}")
+        failures = compare(current, baseline, args.threshold)
+    else:
+        failures = []
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+        print(f"\nBaseline written to {args.baseline}")
+
+    if failures:
+        print(f"\nFAIL: {len(failures)} regression(s):")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""One entry point for the bottle scripts, quick to start.
+
+  python bottle-cli.py ingest [ARGS ...]     process-bottles.py: manifest stock photos
+  python bottle-cli.py split [ARGS ...]      process-uploaded-bottles.py: uploads, multi-bottle photos split
+  python bottle-cli.py normalize [ARGS ...]  normalize-bottles.py: re-fill already cut-out PNGs
+  python bottle-cli.py watch [ARGS ...]      watch-bottles.py: process photos as they land in the intake folders
+  python bottle-cli.py status [--model M] [--work-size PX]
+                                             up to date / stale counts of every output, from build state,
+                                             and the rembg cache and frame store sizes
+  python bottle-cli.py dry-run [ARGS ...]    the outputs ingest and split would rebuild
+
+ARGS go to the script unchanged, e.g. `ingest --batch 4 --work-size 1024`
+or `split --help`. Nothing here imports rembg, onnxruntime or scipy: the
+scripts load rembg once a source actually needs segmenting (see
+bottle_pipeline/engine.py) and scipy once an image is split, so status,
+dry-run, normalize and all-cached runs start in a fraction of a second.
+`python bench-bottles.py --startup` checks that this stays true.
+
+status reads the build state only; dry-run also applies the duplicate
+checks, which hash every new source. dry-run runs both scripts even if the
+first one exits with an error, and exits non-zero if either did.
+"""
+import argparse
+import json
+import runpy
+import sys
+from pathlib import Path
+
+try:
+    from bottle_pipeline.buildstate import BuildState, make_record
+    from bottle_pipeline.cache import CACHE_DIR, file_digest
+    from bottle_pipeline.engine import DEFAULT_MODEL, MODELS
+    from bottle_pipeline.frames import FRAMES_DIR
+    from bottle_pipeline.scripts import SCRIPTS_DIR, load_script
+except ImportError as e:
+    print(f"Missing dependency: {e}")
+    print("Run: pip install Pillow numpy")
+    sys.exit(1)
+
+# subcommand -> (script, help)
+SCRIPT_COMMANDS = {
+    "ingest": ("process-bottles.py", "process the manifest's stock photos"),
+    "split": ("process-uploaded-bottles.py", "process uploads, splitting multi-bottle photos"),
+    "normalize": ("normalize-bottles.py", "normalize already cut-out PNGs"),
+    "watch": ("watch-bottles.py", "process new photos as they land in the intake folders"),
+}
+DRY_RUN_SCRIPTS = ["process-bottles.py", "process-uploaded-bottles.py"]
+
+
+def run_script(filename: str, argv: list[str]) -> int:
+    """Run a script as if it had been started with argv; returns its exit status.
+
+    It runs as __main__, so process pools can pickle its functions and
+    spawned workers (Windows) re-import the script rather than this file.
+    A sys.exit() in the script ends only the script.
+    """
+    saved = sys.argv
+    sys.argv = [filename, *argv]
+    try:
+        runpy.run_path(str(SCRIPTS_DIR / filename), run_name="__main__")
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)  # sys.exit("message") exits with 1
+        return 1
+    finally:
+        sys.argv = saved
+    return 0
+
+
+def ingest_status(model: str, work_size: int | None) -> dict[str, list[str]]:
+    """Manifest outputs of process-bottles.py by state."""
+    script = load_script("process-bottles.py")
+    found = {"up to date": [], "stale": [], "no source": []}
+    if not script.MANIFEST.exists():
+        return found
+    with open(script.MANIFEST, encoding="utf-8") as f:
+        bottles = json.load(f).get("bottles", [])
+    state = BuildState(script.BUILD_STATE)
+    params = script.build_params(model, work_size)
+    for entry in bottles:
+        out = script.OUT_DIR / f"{entry['slug']}-full.png"
+        src = script.find_source(entry["file"])
+        if src is None:
+            found["no source"].append(out.name)
+            continue
+        record = make_record(file_digest(src), params, "process-bottles", script.PIPELINE_VERSION)
+        found["stale" if state.is_stale(out, record) else "up to date"].append(out.name)
+    return found
+
+
+def split_status(model: str, work_size: int | None) -> dict[str, list[str]]:
+    """Outputs of process-uploaded-bottles.py by state."""
+    script = load_script("process-uploaded-bottles.py")
+    found = {"up to date": [], "stale": [], "no source": []}
+    state = BuildState(script.BUILD_STATE)
+    params = script.build_params(model, work_size)
+    sources = [(f, [slug], False) for f, slug in script.SINGLES.items()]
+    sources += [(f, slugs, True) for f, slugs in script.MULTIS.items()]
+    for filename, slugs, multi in sources:
+        outs = {slug: script.NORM_DIR / f"{slug}-full.png" for slug in slugs}
+        src = script.find_source(filename)
+        if src is None:
+            found["no source"].extend(out.name for out in outs.values())
+            continue
+        records = script.output_records(file_digest(src), params, slugs, multi)
+        for slug, out in outs.items():
+            found["stale" if state.is_stale(out, records[slug]) else "up to date"].append(out.name)
+    return found
+
+
+def normalize_status() -> dict[str, list[str]]:
+    """normalize-bottles.py inputs whose output is missing or older than them."""
+    script = load_script("normalize-bottles.py")
+    found = {"up to date": [], "stale": []}
+    for path in map(Path, script.expand_inputs([str(script.BASE)])):
+        out = script.OUT / path.name
+        fresh = out.exists() and out.stat().st_mtime >= path.stat().st_mtime
+        found["up to date" if fresh else "stale"].append(path.name)
+    return found
+
+
+def status(model: str, work_size: int | None) -> None:
+    """Print the state counts of every script's outputs, then the rembg cache and frame store sizes."""
+    for name, found in (("ingest", ingest_status(model, work_size)),
+                        ("split", split_status(model, work_size)),
+                        ("normalize", normalize_status())):
+        counts = ", ".join(f"{len(files)} {label}" for label, files in found.items())
+        print(f"{name:10s} {counts}")
+        for filename in found["stale"]:
+            print(f"  stale: {filename}")
+
+    entries = list(CACHE_DIR.rglob("*.png")) if CACHE_DIR.exists() else []
+    size = sum(p.stat().st_size for p in entries)
+    print(f"rembg cache: {len(entries)} entries, {size / 2**20:.1f} MiB in {CACHE_DIR}")
+    frames = list(FRAMES_DIR.glob("*/*.rgba")) if FRAMES_DIR.exists() else []
+    size = sum(p.stat().st_size for p in frames)
+    print(f"frame store: {len(frames)} frames, {size / 2**20:.1f} MiB in {FRAMES_DIR}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the bottle pipeline scripts from one entry point.")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+    for name, (filename, help_text) in SCRIPT_COMMANDS.items():
+        # Every argument, --help included, goes to the script's own parser
+        commands.add_parser(name, help=f"{help_text} ({filename})", add_help=False)
+    sub = commands.add_parser("status", help="count up-to-date and stale outputs without processing")
+    sub.add_argument("--model", choices=MODELS, default=DEFAULT_MODEL, help="rembg model the outputs should match")
+    sub.add_argument("--work-size", type=int, metavar="PX", help="--work-size the outputs should match")
+    commands.add_parser("dry-run", help="list the outputs ingest and split would rebuild "
+                                        "(other arguments, e.g. --model or --force, go to both)")
+    args, rest = parser.parse_known_args()
+
+    if args.command == "status":
+        if rest:
+            parser.error(f"unrecognized arguments: {' '.join(rest)}")
+        status(args.model, args.work_size)
+    elif args.command == "dry-run":
+        failed = []
+        for filename in DRY_RUN_SCRIPTS:
+            print(f"=== {filename} ===")
+            code = run_script(filename, [*rest, "--dry-run"])
+            if code:
+                print(f"  {filename} exited with {code}")
+                failed.append(filename)
+        if failed:
+            sys.exit(1)
+    else:
+        sys.exit(run_script(SCRIPT_COMMANDS[args.command][0], rest))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Local HTTP service that turns bottle photos into normalized PNGs.
+
+Every `python process-*.py` run imports rembg/onnxruntime and loads the
+model before the first image. This server does that once and keeps the
+session warm, then runs the same steps as process-uploaded-bottles.py
+(rembg -> clean_alpha -> split_bottles -> normalize_bottle) per request.
+
+Requests are handled on threads. rembg/onnxruntime, numpy and Pillow
+release the GIL while they work, so --jobs worker threads share one warm
+session. At most --queue more requests wait for a worker; anything past
+that gets 503 with Retry-After, so a burst cannot pile up unbounded work.
+A request takes its slot before its body is read, so a refused one never
+buffers its upload, and at most --jobs + --queue bodies are in memory.
+
+  POST /process?slug=NAME            image bytes in, one normalized PNG out
+  POST /process?slug=A&slug=B...     multi-bottle image in, JSON out:
+                                     {"bottles": [{"slug": A, "png": base64}, ...]}
+  GET  /health                       model, workers, queue depth, counts
+
+Try it locally:
+  python bottle-server.py --port 8765
+  curl --data-binary @photo.jpg "http://127.0.0.1:8765/process?slug=rioja" -o rioja-full.png
+
+Stage timings of every request go to .cache/runs.jsonl (see trace.py).
+
+Usage: python bottle-server.py [--host H] [--port N] [--model u2net|u2netp|isnet|silueta]
+                               [--work-size PX] [--jobs N] [--queue N]
+"""
+import argparse
+import base64
+import io
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+try:
+    from PIL import Image, UnidentifiedImageError
+    from bottle_pipeline.alpha import ALPHA_THRESHOLD
+    from bottle_pipeline.encode import encode_png
+    from bottle_pipeline.engine import DEFAULT_MODEL, MODELS, get_remover
+    from bottle_pipeline.scripts import load_script
+    from bottle_pipeline.strips import clean_alpha_strips
+    from bottle_pipeline.trace import Tracer
+except ImportError as e:
+    print(f"Missing dependency: {e}")
+    print("Run: pip install rembg[cpu] Pillow numpy")
+    sys.exit(1)
+
+DEFAULT_PORT = 8765
+MAX_BODY = 50 * 1024 * 1024  # largest accepted upload, in bytes
+MAX_SLUGS = 12  # bottles per multi-bottle request
+
+
+class Pipeline:
+    """A warm remover plus a bounded pool that runs the processing steps."""
+
+    def __init__(self, model: str, work_size: int | None, jobs: int, queue: int):
+        self.script = load_script("process-uploaded-bottles.py")
+        self.remover = get_remover(model, use_cache=False, work_size=work_size)
+        self.remover.warm_up()
+        self.jobs = jobs
+        self.pool = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="bottle")
+        # Running plus waiting requests; acquiring never blocks, a full pool answers 503
+        self.slots = threading.BoundedSemaphore(jobs + queue)
+        self.capacity = jobs + queue
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+
+    def process(self, data: bytes, slugs: list[str]) -> list[tuple[str, bytes]]:
+        """Normalized PNG bytes per slug; runs on a pool thread."""
+        tracer = Tracer("bottle-server")
+        item = slugs[0] if len(slugs) == 1 else "+".join(slugs)
+        try:
+            with tracer.stage("decode", item) as event:
+                img = Image.open(io.BytesIO(data)).convert("RGBA")
+                event.output(img)
+            with tracer.stage("rembg", item, img) as event:
+                nobg = self.remover.remove(img)
+                event.output(nobg)
+            with tracer.stage("clean_alpha", item, nobg) as event:
+                clean = clean_alpha_strips(nobg, ALPHA_THRESHOLD, self.script.FEATHER_RADIUS, self.script.TILE_BYTES)
+                event.output(clean)
+            if len(slugs) == 1:
+                bottles = [clean]
+            else:
+                with tracer.stage("split", item, clean):
+                    bottles = self.script.split_bottles(clean, len(slugs))
+                if len(bottles) != len(slugs):
+                    raise ValueError(f"found {len(bottles)} bottles, expected {len(slugs)}")
+
+            results = []
+            for slug, bottle in zip(slugs, bottles):
+                with tracer.stage("normalize", slug, bottle) as event:
+                    result = self.script.normalize_bottle(bottle)
+                    event.output(result)
+                with tracer.stage("encode_png", slug, result) as event:
+                    png = encode_png(result)
+                    event.wrote(len(png))
+                results.append((slug, png))
+            return results
+        finally:
+            tracer.write()
+
+    def reserve(self) -> bool:
+        """Take a slot for a request about to be read; False when the pool is full."""
+        if not self.slots.acquire(blocking=False):
+            return False
+        with self.lock:
+            self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        """Give back a reserved slot whose request was never submitted."""
+        self.slots.release()
+        with self.lock:
+            self.in_flight -= 1
+
+    def submit(self, data: bytes, slugs: list[str]):
+        """Queue a request holding a reserved slot; returns its future. The slot is freed when it finishes."""
+        future = self.pool.submit(self.process, data, slugs)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future) -> None:
+        self.release()
+        with self.lock:
+            if future.exception() is None:
+                self.processed += 1
+            else:
+                self.failed += 1
+
+    def health(self) -> dict:
+        with self.lock:
+            return {
+                "model": self.remover.model,
+                "work_size": self.remover.work_size,
+                "workers": self.jobs,
+                "capacity": self.capacity,
+                "in_flight": self.in_flight,
+                "processed": self.processed,
+                "failed": self.failed,
+            }
+
+
+class Handler(BaseHTTPRequestHandler):
+    pipeline: Pipeline  # set on the subclass built in main()
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: dict | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, status: int, payload: dict, headers: dict | None = None) -> None:
+        self._send(status, json.dumps(payload).encode(), "application/json", headers)
+
+    def do_GET(self) -> None:
+        if urlparse(self.path).path == "/health":
+            self._json(200, self.pipeline.health())
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        if url.path != "/process":
+            self._json(404, {"error": "not found"})
+            return
+        slugs = [s for s in parse_qs(url.query).get("slug", []) if s]
+        if not slugs or len(slugs) > MAX_SLUGS:
+            self._json(400, {"error": f"give 1 to {MAX_SLUGS} slug= parameters"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self._json(400, {"error": "Content-Length is not a number"})
+            return
+        if length <= 0:
+            self._json(400, {"error": "empty body; POST the image bytes"})
+            return
+        if length > MAX_BODY:
+            self._json(413, {"error": f"body larger than {MAX_BODY} bytes"})
+            return
+
+        # Refuse before reading, so a burst of uploads is never buffered only to get 503s
+        if not self.pipeline.reserve():
+            self.close_connection = True  # the unread body must not be parsed as the next request
+            self._json(503, {"error": "busy, retry shortly"}, {"Retry-After": "1"})
+            return
+        try:
+            data = self.rfile.read(length)
+        except BaseException:
+            self.pipeline.release()
+            raise
+        future = self.pipeline.submit(data, slugs)
+        try:
+            results = future.result()
+        except UnidentifiedImageError:
+            self._json(400, {"error": "body is not a readable image"})
+            return
+        except ValueError as e:  # empty after background removal, or a failed split
+            self._json(422, {"error": str(e)})
+            return
+        except Exception as e:
+            self._json(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+
+        if len(results) == 1:
+            slug, png = results[0]
+            self._send(200, png, "image/png", {"X-Bottle-Slug": slug})
+        else:
+            self._json(200, {"bottles": [
+                {"slug": slug, "png": base64.b64encode(png).decode("ascii")} for slug, png in results
+            ]})
+
+    def log_message(self, fmt: str, *args) -> None:
+        print(f"  {self.address_string()} {fmt % args}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve bottle normalization over local HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to bind (default: localhost only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port (default: {DEFAULT_PORT})")
+    parser.add_argument("--model", choices=MODELS, default=DEFAULT_MODEL, help="rembg model")
+    parser.add_argument("--work-size", type=int, metavar="PX",
+                        help="run rembg on a copy at most PX on its long side, upsampling only the mask")
+    parser.add_argument("--jobs", "-j", type=int, default=2, help="worker threads (default: 2)")
+    parser.add_argument("--queue", type=int, default=8, help="requests allowed to wait for a worker (default: 8)")
+    args = parser.parse_args()
+
+    print(f"Loading {args.model} ...")
+    try:
+        pipeline = Pipeline(args.model, args.work_size, max(1, args.jobs), max(0, args.queue))
+    except ImportError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    handler = type("BoundHandler", (Handler,), {"pipeline": pipeline})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    host, port = server.server_address[:2]
+    print(f"Serving on http://{host}:{port} ({pipeline.jobs} workers, queue {args.queue}; "
+          f"session load {pipeline.remover.session_load_s * 1000:.0f} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.server_close()
+        pipeline.pool.shutdown(wait=True)
+        print(pipeline.remover.report())
+
+
+if __name__ == "__main__":
+    main()
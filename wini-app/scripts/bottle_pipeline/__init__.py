@@ -0,0 +1,6 @@
+"""Shared building blocks for the bottle image scripts in wini-app/scripts/.
+
+The hyphenated scripts (process-bottles.py, process-uploaded-bottles.py, ...)
+import from here; running them from wini-app/scripts puts this package on
+sys.path automatically.
+"""
@@ -0,0 +1,175 @@
+"""Batched background-removal masks: one onnxruntime run for many bottles.
+
+rembg.remove() feeds the network one image per run. At u2net's 320x320
+input a single image leaves onnxruntime's CPU kernels little to split
+between threads, so per-image overhead (graph dispatch, small GEMMs,
+thread wake-ups) weighs heavily. BatchSegmenter does what rembg's session
+does, N images at a time:
+
+- resizes each source to the model input and normalizes it exactly as
+  rembg does, then stacks the results into one (N, 3, H, W) tensor;
+- runs that tensor through its own onnxruntime session, built with
+  explicit intra-op and inter-op thread counts;
+- min/max-normalizes each output plane on its own and resizes it back to
+  its source's size, so every mask matches what rembg would have given.
+
+The published rembg models declare a fixed batch of 1. When the optional
+onnx package is installed, a copy with a free batch dimension is written
+once to wini-app/.cache/onnx/. Without onnx, or for a graph that still
+will not take a batch, the stacked inputs are run one sample at a time on
+the same session; preprocessing and thread settings are shared either way.
+
+Run `python -m bottle_pipeline.batch IMAGE... [--batch N] [--threads N]`
+from wini-app/scripts to compare images/sec of rembg's per-image path
+against batched runs, with the IoU of each batched mask against rembg's.
+"""
+import argparse
+import os
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import onnxruntime as ort
+from PIL import Image, ImageOps
+from rembg.sessions import sessions
+
+try:
+    import onnx
+except ImportError:
+    onnx = None
+
+APP_ROOT = Path(__file__).resolve().parents[2]
+ONNX_CACHE = APP_ROOT / ".cache" / "onnx"
+DEFAULT_BATCH = 8  # images per run for the comparison CLI; the input tensor alone is ~10 MiB at 320px
+
+# rembg model name -> (input size, mean, std), as its session normalizes
+INPUT_SPECS = {
+    "u2net": ((320, 320), (0.485, 0.456, 0.406), (0.229, 0.224, 0.225)),
+    "u2netp": ((320, 320), (0.485, 0.456, 0.406), (0.229, 0.224, 0.225)),
+    "silueta": ((320, 320), (0.485, 0.456, 0.406), (0.229, 0.224, 0.225)),
+    "isnet-general-use": ((1024, 1024), (0.5, 0.5, 0.5), (1.0, 1.0, 1.0)),
+}
+
+
+def preprocess(img: Image.Image, size: tuple[int, int], mean, std) -> np.ndarray:
+    """(3, H, W) float32 network input of img, computed as rembg's session does."""
+    arr = np.array(img.convert("RGB").resize(size, Image.LANCZOS))
+    arr = arr / max(np.max(arr), 1e-6)
+    out = (arr - np.array(mean)) / np.array(std)
+    return out.transpose((2, 0, 1)).astype(np.float32)
+
+
+def postprocess(plane: np.ndarray, size: tuple[int, int]) -> Image.Image:
+    """L mask at size from one output plane, min/max-normalized as rembg does."""
+    lo, hi = plane.min(), plane.max()
+    pred = (plane - lo) / max(hi - lo, 1e-6)
+    mask = Image.fromarray((pred.clip(0, 1) * 255).astype(np.uint8), "L")
+    return mask.resize(size, Image.LANCZOS)
+
+
+def _batched_model(path: Path) -> Path | None:
+    """A cached copy of the model at path with a free batch dimension, or None without onnx."""
+    if onnx is None:
+        return None
+    out = ONNX_CACHE / f"{path.stem}-{path.stat().st_size}-batch.onnx"
+    if out.exists():
+        return out
+    model = onnx.load(str(path))
+    for value in [*model.graph.input, *model.graph.output]:
+        value.type.tensor_type.shape.dim[0].dim_param = "batch"
+    # Inferred intermediate shapes still say 1; onnxruntime re-infers them
+    del model.graph.value_info[:]
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(".tmp")
+    onnx.save(model, str(tmp))
+    os.replace(tmp, out)
+    return out
+
+
+class BatchSegmenter:
+    """An onnxruntime session for one rembg model that predicts masks N images at a time."""
+
+    def __init__(self, model_name: str, batch_size: int = DEFAULT_BATCH,
+                 intra_threads: int | None = None, inter_threads: int = 1):
+        if model_name not in INPUT_SPECS:
+            raise ValueError(f"No batched input spec for {model_name!r}")
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.size, self.mean, self.std = INPUT_SPECS[model_name]
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = intra_threads or os.cpu_count() or 1
+        opts.inter_op_num_threads = max(1, inter_threads)
+        if inter_threads > 1:  # independent branches of the graph run concurrently
+            opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        self.threads = (opts.intra_op_num_threads, opts.inter_op_num_threads)
+
+        source = Path(sessions[model_name].download_models())
+        relaxed = _batched_model(source)
+        self.batched = relaxed is not None
+        self.session = ort.InferenceSession(str(relaxed or source), sess_options=opts,
+                                            providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def _run(self, tensor: np.ndarray) -> np.ndarray:
+        """Output planes (N, H, W) for an (N, 3, H, W) input."""
+        if self.batched and len(tensor) > 1:
+            try:
+                return self.session.run(None, {self.input_name: tensor})[0][:, 0]
+            except Exception as e:  # a reshape in the graph that still assumes batch 1
+                warnings.warn(f"{self.model_name} will not run batched ({type(e).__name__}); "
+                              f"running one image at a time", RuntimeWarning, stacklevel=3)
+                self.batched = False
+        return np.concatenate([self.session.run(None, {self.input_name: t[None]})[0][:, 0] for t in tensor])
+
+    def masks(self, imgs: list[Image.Image]) -> list[Image.Image]:
+        """One L mask per image, at its own size, in batch_size runs."""
+        out = []
+        for i in range(0, len(imgs), self.batch_size):
+            chunk = imgs[i:i + self.batch_size]
+            tensor = np.stack([preprocess(img, self.size, self.mean, self.std) for img in chunk])
+            planes = self._run(tensor)
+            out.extend(postprocess(plane, img.size) for plane, img in zip(planes, chunk))
+        return out
+
+
+def _compare(paths: list[Path], model: str, batch_size: int, threads: int | None) -> None:
+    from rembg import new_session, remove
+
+    from .engine import MODELS
+    from .mask import mask_iou
+
+    model_name = MODELS[model]
+    imgs = [ImageOps.exif_transpose(Image.open(p).convert("RGBA")) for p in paths]
+    session = new_session(model_name)
+    remove(imgs[0], session=session, only_mask=True)  # warm-up
+    start = time.perf_counter()
+    reference = [remove(img, session=session, only_mask=True) for img in imgs]
+    single = time.perf_counter() - start
+
+    segmenter = BatchSegmenter(model_name, batch_size, threads)
+    segmenter.masks(imgs[:segmenter.batch_size])  # warm-up, at full batch shape
+    start = time.perf_counter()
+    batched = segmenter.masks(imgs)
+    elapsed = time.perf_counter() - start
+
+    mode = "batched" if segmenter.batched else "one at a time (no onnx, or the graph needs batch 1)"
+    print(f"{len(imgs)} images, {model}, batch {segmenter.batch_size}, "
+          f"threads intra {segmenter.threads[0]} / inter {segmenter.threads[1]}, {mode}")
+    print(f"  per image (rembg): {len(imgs) / single:6.2f} images/sec")
+    print(f"  batched:           {len(imgs) / elapsed:6.2f} images/sec ({single / elapsed:.2f}x)")
+    ious = [mask_iou(a, b) for a, b in zip(reference, batched)]
+    print(f"  mask IoU vs rembg: min {min(ious):.4f}, mean {sum(ious) / len(ious):.4f}")
+
+
+if __name__ == "__main__":
+    from .engine import DEFAULT_MODEL, MODELS
+
+    parser = argparse.ArgumentParser(description="Compare per-image and batched rembg mask throughput.")
+    parser.add_argument("images", nargs="+", type=Path)
+    parser.add_argument("--model", choices=MODELS, default=DEFAULT_MODEL, help="rembg model")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help=f"images per run (default: {DEFAULT_BATCH})")
+    parser.add_argument("--threads", type=int, help="intra-op threads (default: one per CPU)")
+    args = parser.parse_args()
+    _compare(args.images, args.model, args.batch, args.threads)
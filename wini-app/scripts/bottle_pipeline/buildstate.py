@@ -0,0 +1,36 @@
+"""Build records (source sha256, parameters, script version) per output, so only stale bottles are rebuilt."""
+import json
+import os
+from pathlib import Path
+
+
+def make_record(source_digest: str, params: dict, script: str, version: int) -> dict:
+    """The fingerprint stored for one output."""
+    return {"source": source_digest, "params": params, "script": script, "version": version}
+
+
+class BuildState:
+    """JSON file mapping output filename -> build record."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.outputs: dict[str, dict] = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                self.outputs = json.load(f).get("outputs", {})
+
+    def is_stale(self, output: Path, record: dict) -> bool:
+        """True if the output is missing or was built from different inputs."""
+        return not output.exists() or self.outputs.get(output.name) != record
+
+    def record(self, output: Path, record: dict) -> None:
+        self.outputs[output.name] = record
+
+    def save(self) -> None:
+        """Write the state atomically with stable ordering so diffs stay small."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"outputs": self.outputs}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        os.replace(tmp, self.path)
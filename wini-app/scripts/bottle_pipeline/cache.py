@@ -0,0 +1,92 @@
+"""Size-capped LRU cache of background-removed images under .cache/rembg/, keyed by source sha256 and model."""
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from PIL import Image
+
+APP_ROOT = Path(__file__).resolve().parents[2]
+CACHE_DIR = APP_ROOT / ".cache" / "rembg"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GiB
+EVICT_TO = 0.9  # eviction goes down to this fraction of the cap, so a full cache is not rescanned on every put
+
+
+def file_digest(path: Path) -> str:
+    """sha256 hex digest of a file's bytes."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class RembgCache:
+    """PNG files named by cache key; file mtime doubles as the LRU clock."""
+
+    def __init__(self, root: Path = CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total: int | None = None  # bytes on disk, scanned on first put and then kept as a running total
+        self._lock = threading.Lock()  # puts come from several I/O threads
+
+    @staticmethod
+    def key(source_digest: str, model: str) -> str:
+        return hashlib.sha256(f"{source_digest}:{model}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.png"
+
+    def get(self, key: str) -> Image.Image | None:
+        """Return the cached image for a key, or None on a miss."""
+        path = self._path(key)
+        try:
+            os.utime(path)  # mark as recently used
+            with Image.open(path) as img:
+                img.load()
+        except FileNotFoundError:  # never cached, or evicted by another thread or process meanwhile
+            self.misses += 1
+            return None
+        self.hits += 1
+        return img
+
+    def put(self, key: str, img: Image.Image) -> None:
+        """Store an image atomically, then trim the cache if that took it over its size cap."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        img.save(tmp, "PNG")
+        size = tmp.stat().st_size
+        with self._lock:
+            if self._total is None:
+                self._total = self.size()
+            replaced = path.stat().st_size if path.exists() else 0
+            os.replace(tmp, path)
+            self._total += size - replaced
+            if self._total > self.max_bytes:
+                self.evict()
+
+    def size(self) -> int:
+        """Bytes of every cached entry, by walking the tree."""
+        return sum(path.stat().st_size for path in self.root.glob("*/*.png"))
+
+    def evict(self) -> int:
+        """Delete least-recently-used entries until under EVICT_TO of max_bytes. Returns count removed."""
+        entries = []
+        total = 0
+        for path in self.root.glob("*/*.png"):
+            st = path.stat()
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        self._total = total  # also picks up entries other processes wrote
+        return removed
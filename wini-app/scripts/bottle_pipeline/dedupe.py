@@ -0,0 +1,210 @@
+"""Perceptual-hash index (aHash, dHash, pHash) for spotting the same bottle photo twice.
+
+Usage (from wini-app/scripts): python -m bottle_pipeline.dedupe DIR... [--distance N]
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from .cache import file_digest
+
+APP_ROOT = Path(__file__).resolve().parents[2]
+INDEX_PATH = APP_ROOT / ".cache" / "phash-index.json"  # one entry per source slug and per normalized output
+PHASH_DISTANCE = 6  # max pHash bits apart for a near-duplicate; text-heavy pages differ by ~8
+DHASH_DISTANCE = 10  # ...and dHash bits, which rejects chance pHash matches
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+
+_DCT = np.cos(np.pi * (2 * np.arange(32)[None, :] + 1) * np.arange(32)[:, None] / 64)
+
+
+def _pack(bits: np.ndarray) -> np.ndarray:
+    """(N, 64) booleans -> N uint64 hashes, first bit most significant."""
+    return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def hash_arrays(gray32: np.ndarray, gray9x8: np.ndarray) -> dict[str, np.ndarray]:
+    """aHash, dHash and pHash of a batch: (N, 32, 32) and (N, 8, 9) float thumbnails."""
+    n = len(gray32)
+    blocks = gray32.reshape(n, 8, 4, 8, 4).mean(axis=(2, 4)).reshape(n, 64)
+    a = _pack(blocks > blocks.mean(axis=1, keepdims=True))
+    d = _pack((gray9x8[:, :, 1:] > gray9x8[:, :, :-1]).reshape(n, 64))
+    low = (_DCT @ gray32 @ _DCT.T)[:, :8, :8].reshape(n, 64)
+    p = _pack(low > np.median(low[:, 1:], axis=1, keepdims=True))  # DC term left out of the median
+    return {"a": a, "d": d, "p": p}
+
+
+def thumbnails(img: Image.Image) -> tuple[np.ndarray, np.ndarray]:
+    """The 32x32 and 9x8 grayscale thumbnails the hashes are computed from."""
+    if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+        # Whatever colour sits under transparent pixels is not part of the picture
+        img = Image.alpha_composite(Image.new("RGBA", img.size, (255, 255, 255, 255)), img.convert("RGBA"))
+    gray = img.convert("L")
+    return (np.asarray(gray.resize((32, 32), Image.BOX), dtype=np.float64),
+            np.asarray(gray.resize((9, 8), Image.BOX), dtype=np.float64))
+
+
+def image_hashes(img: Image.Image) -> dict[str, int]:
+    """{"a", "d", "p"} hashes of one image."""
+    big, small = thumbnails(img)
+    return {k: int(v[0]) for k, v in hash_arrays(big[None], small[None]).items()}
+
+
+def file_hashes(path: Path) -> dict[str, int]:
+    """Hashes of an image file; JPEGs are decoded at reduced size."""
+    with Image.open(path) as img:
+        img.draft("RGB", (64, 64))
+        return image_hashes(img)
+
+
+def distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class MultiIndex:
+    """Multi-index hashing: exact-match tables on radius + 1 slices of each hash.
+
+    Two hashes within radius bits must agree exactly on at least one of
+    radius + 1 disjoint slices (pigeonhole), so a query only verifies the
+    entries sharing a slice with it. Over 5000 entries at radius 6 that is
+    ~0.04 ms per query, against ~0.6 ms for a linear scan; a pure-Python
+    BK-tree was slower than the scan at this size.
+    """
+
+    def __init__(self, radius: int):
+        self.radius = radius
+        parts = radius + 1
+        self.slices = [(64 * i // parts, 64 * (i + 1) // parts) for i in range(parts)]
+        self.tables: list[dict[int, set[str]]] = [{} for _ in self.slices]
+        self.hashes: dict[str, int] = {}
+
+    def _parts(self, h: int) -> list[int]:
+        return [(h >> lo) & ((1 << (hi - lo)) - 1) for lo, hi in self.slices]
+
+    def add(self, key: str, h: int) -> None:
+        self.remove(key)
+        self.hashes[key] = h
+        for table, part in zip(self.tables, self._parts(h)):
+            table.setdefault(part, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        h = self.hashes.pop(key, None)
+        if h is None:
+            return
+        for table, part in zip(self.tables, self._parts(h)):
+            table[part].discard(key)
+
+    def query(self, h: int) -> list[tuple[int, str]]:
+        """(distance, key) of every entry within radius of h, nearest first."""
+        candidates = set()
+        for table, part in zip(self.tables, self._parts(h)):
+            candidates.update(table.get(part, ()))
+        found = ((distance(h, self.hashes[key]), key) for key in candidates)
+        return sorted((d, key) for d, key in found if d <= self.radius)
+
+
+class HashIndex:
+    """Persistent {kind:name -> sha256 + hashes}, searchable by pHash."""
+
+    def __init__(self, path: Path = INDEX_PATH):
+        self.path = Path(path)
+        self.entries: dict[str, dict] = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries", {})
+        self.lookup = MultiIndex(PHASH_DISTANCE)
+        for key, entry in self.entries.items():
+            self.lookup.add(key, int(entry["p"], 16))
+
+    @staticmethod
+    def key(kind: str, name: str) -> str:
+        return f"{kind}:{name}"
+
+    @staticmethod
+    def _hashes(entry: dict) -> dict[str, int]:
+        return {k: int(entry[k], 16) for k in ("a", "d", "p")}
+
+    def hash_file(self, path: Path, digest: str, kind: str, name: str) -> dict[str, int]:
+        """Hashes of path, reused from the entry for kind:name when digest is unchanged."""
+        entry = self.entries.get(self.key(kind, name))
+        if entry is not None and entry["digest"] == digest:
+            return self._hashes(entry)
+        return file_hashes(path)
+
+    def add(self, kind: str, name: str, digest: str, hashes: dict[str, int]) -> None:
+        key = self.key(kind, name)
+        self.entries[key] = {"digest": digest, **{k: f"{v:016x}" for k, v in hashes.items()}}
+        self.lookup.add(key, hashes["p"])
+
+    def find_duplicate(self, hashes: dict[str, int], kind: str, name: str) -> tuple[str, int] | None:
+        """Nearest other kind entry that is a near-duplicate: (its name, pHash distance)."""
+        prefix = f"{kind}:"
+        for d, key in self.lookup.query(hashes["p"]):
+            if not key.startswith(prefix) or key == self.key(kind, name):
+                continue
+            if distance(int(self.entries[key]["d"], 16), hashes["d"]) <= DHASH_DISTANCE:
+                return key[len(prefix):], d
+        return None
+
+    def admit_source(self, path: Path, digest: str, name: str, check: bool = True) -> tuple[str, int] | None:
+        """Index a source under name, unless check is set and it near-duplicates another source.
+
+        Returns that other source as (name, pHash distance), or None once indexed.
+        """
+        hashes = self.hash_file(path, digest, "source", name)
+        if check:
+            duplicate = self.find_duplicate(hashes, "source", name)
+            if duplicate is not None:
+                return duplicate
+        self.add("source", name, digest, hashes)
+        return None
+
+    def add_output(self, path: Path, name: str) -> tuple[str, int] | None:
+        """Index a written output; returns another output it near-duplicates, if any."""
+        digest = file_digest(path)
+        hashes = self.hash_file(path, digest, "output", name)
+        self.add("output", name, digest, hashes)
+        return self.find_duplicate(hashes, "output", name)
+
+    def save(self) -> None:
+        """Write the index atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"entries": self.entries}, f, indent=1, sort_keys=True)
+            f.write("\n")
+        os.replace(tmp, self.path)
+
+
+def _groups(folders: list[Path], radius: int) -> None:
+    paths = sorted(p for folder in folders for p in folder.rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES)
+    lookup = MultiIndex(radius)
+    hashes = {}
+    for path in map(str, paths):
+        hashes[path] = file_hashes(Path(path))
+        lookup.add(path, hashes[path]["p"])
+
+    seen = set()
+    for path in map(str, paths):
+        if path in seen:
+            continue
+        group = [(d, other) for d, other in lookup.query(hashes[path]["p"])
+                 if distance(hashes[other]["d"], hashes[path]["d"]) <= DHASH_DISTANCE]
+        if len(group) > 1:
+            print(f"{len(group)} near-duplicates:")
+            for d, other in group:
+                print(f"  {d:2d} bits  {other}")
+                seen.add(other)
+    print(f"{len(paths)} images checked")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List near-duplicate images by perceptual hash.")
+    parser.add_argument("folders", nargs="+", type=Path)
+    parser.add_argument("--distance", type=int, default=PHASH_DISTANCE,
+                        help=f"max pHash bits apart (default: {PHASH_DISTANCE})")
+    args = parser.parse_args()
+    _groups(args.folders, args.distance)
@@ -0,0 +1,185 @@
+"""The PNG encoding stage shared by every bottle script: zeroed transparent RGB, a gated RGBA palette, no metadata.
+
+Usage (from wini-app/scripts): python -m bottle_pipeline.encode [DIR] [--write]
+"""
+import argparse
+import io
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+PNG_OPTIONS = {
+    "optimize": True,  # picks filters and zlib settings per file; ~4x the time of level 6
+    "compress_level": 9,  # zlib level used when optimize is off
+    "quantize": True,  # try a 256-colour RGBA palette
+    "max_mean_delta_e": 2.3,  # mean CIE76 delta E allowed for the palette (~1 just noticeable difference)
+    "max_p99_delta_e": 8.0,  # and at the 99th percentile of visible pixels, so local banding is refused
+}
+PALETTE_COLORS = 256
+KMEANS_ITERATIONS = 4  # refinement passes over the octree palette; more gains little
+KMEANS_SAMPLE = 32768  # visible pixels the refinement is fitted on
+
+_SRGB_TO_XYZ = np.array([[0.4124, 0.3576, 0.1805], [0.2126, 0.7152, 0.0722], [0.0193, 0.1192, 0.9505]])
+_D65 = np.array([0.95047, 1.0, 1.08883])
+
+
+def zero_transparent(img: Image.Image) -> Image.Image:
+    """RGBA copy of img with RGB zeroed wherever alpha is 0, and no metadata."""
+    arr = np.array(img.convert("RGBA"))
+    arr[arr[:, :, 3] == 0] = 0
+    return Image.fromarray(arr, "RGBA")
+
+
+def _lab(rgb: np.ndarray) -> np.ndarray:
+    """CIELAB of (N, 3) sRGB values in 0..255."""
+    c = rgb / 255.0
+    c = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = c @ _SRGB_TO_XYZ.T / _D65
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16 / 116)
+    return np.stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])], axis=1)
+
+
+def delta_e(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Per-pixel CIE76 delta E of two (N, 4) RGBA pixel sets, at the worse of white and black backdrops."""
+    a, b = a.astype(np.float64), b.astype(np.float64)
+    worst = np.zeros(len(a))
+    for backdrop in (0.0, 255.0):
+        ca = a[:, :3] * (a[:, 3:] / 255) + backdrop * (1 - a[:, 3:] / 255)
+        cb = b[:, :3] * (b[:, 3:] / 255) + backdrop * (1 - b[:, 3:] / 255)
+        worst = np.maximum(worst, np.linalg.norm(_lab(ca) - _lab(cb), axis=1))
+    return worst
+
+
+def _nearest(points: np.ndarray, centers: np.ndarray, chunk: int = 16384) -> np.ndarray:
+    """Index of the nearest center for every point, in chunks to bound memory."""
+    norms = (centers ** 2).sum(axis=1)
+    out = np.empty(len(points), dtype=np.int32)
+    for i in range(0, len(points), chunk):
+        out[i:i + chunk] = np.argmin(norms - 2 * points[i:i + chunk] @ centers.T, axis=1)
+    return out
+
+
+def _premultiply(rgba: np.ndarray) -> np.ndarray:
+    rgba = rgba.astype(np.float32)
+    return np.concatenate([rgba[:, :3] * rgba[:, 3:] / 255, rgba[:, 3:]], axis=1)
+
+
+def quantize_rgba(img: Image.Image, colors: int = PALETTE_COLORS) -> tuple[np.ndarray, np.ndarray]:
+    """Palette quantization of an RGBA image whose transparent pixels are zeroed.
+
+    Returns (indices as an (H, W) uint8 array, (colors, 4) uint8 RGBA palette).
+    Entry 0 is fully transparent; the others are fitted to the visible pixels.
+    """
+    arr = np.asarray(img)
+    flat = arr.reshape(-1, 4)
+    visible = flat[:, 3] > 0
+    pixels = flat[visible]
+    indices = np.zeros(len(flat), dtype=np.uint8)
+
+    packed = pixels.view(np.uint32).ravel()
+    unique, inverse = np.unique(packed, return_inverse=True)
+    if len(unique) < colors:  # already fits: an exact palette
+        palette = np.concatenate([np.zeros((1, 4), np.uint8), unique.view(np.uint8).reshape(-1, 4)])
+        indices[visible] = inverse.ravel() + 1
+        return indices.reshape(arr.shape[:2]), palette
+
+    seed = img.quantize(colors - 1, method=Image.Quantize.FASTOCTREE)
+    seed_palette = np.array(seed.getpalette("RGBA"), dtype=np.uint8).reshape(-1, 4)
+    centers = _premultiply(seed_palette[np.unique(np.asarray(seed).ravel()[visible])])
+    points = _premultiply(pixels)
+    # Fit on a fixed subsample, so the cost stays flat however much of the canvas is visible
+    sample = points
+    if len(points) > KMEANS_SAMPLE:
+        sample = points[np.random.default_rng(0).choice(len(points), KMEANS_SAMPLE, replace=False)]
+    for _ in range(KMEANS_ITERATIONS):
+        nearest = _nearest(sample, centers)
+        counts = np.bincount(nearest, minlength=len(centers))
+        sums = np.stack([np.bincount(nearest, sample[:, k], minlength=len(centers)) for k in range(4)], axis=1)
+        used = counts > 0
+        centers[used] = sums[used] / counts[used, None]
+    indices[visible] = _nearest(points, centers) + 1
+
+    alpha = np.clip(np.rint(centers[:, 3]), 1, 255)
+    rgb = np.clip(np.rint(centers[:, :3] * 255 / alpha[:, None]), 0, 255)
+    palette = np.concatenate([np.zeros((1, 4)), np.concatenate([rgb, alpha[:, None]], axis=1)]).astype(np.uint8)
+    return indices.reshape(arr.shape[:2]), palette
+
+
+def _palette_image(indices: np.ndarray, palette: np.ndarray) -> Image.Image:
+    img = Image.fromarray(indices, "P")
+    img.putpalette(palette[:, :3].tobytes())
+    img.info["transparency"] = palette[:, 3].tobytes()
+    return img
+
+
+def prepare_png(img: Image.Image, options: dict | None = None) -> tuple[Image.Image, tuple[float, float] | None]:
+    """The image encode_png() will write: (RGBA or palette image, its mean and p99 delta E if quantized)."""
+    opts = {**PNG_OPTIONS, **(options or {})}
+    clean = zero_transparent(img)
+    if not opts["quantize"]:
+        return clean, None
+    indices, palette = quantize_rgba(clean)
+    flat = np.asarray(clean).reshape(-1, 4)
+    visible = flat[:, 3] > 0
+    errors = delta_e(flat[visible], palette[indices.ravel()[visible]])
+    error = (float(errors.mean()), float(np.percentile(errors, 99))) if len(errors) else (0.0, 0.0)
+    if error[0] > opts["max_mean_delta_e"] or error[1] > opts["max_p99_delta_e"]:
+        return clean, error
+    return _palette_image(indices, palette), error
+
+
+def _write_png(prepared: Image.Image, opts: dict) -> bytes:
+    buf = io.BytesIO()
+    prepared.save(buf, "PNG", optimize=opts["optimize"], compress_level=opts["compress_level"], icc_profile=None)
+    return buf.getvalue()
+
+
+def encode_png(img: Image.Image, options: dict | None = None) -> bytes:
+    """PNG bytes of img using PNG_OPTIONS, overridden by options."""
+    opts = {**PNG_OPTIONS, **(options or {})}
+    return _write_png(prepare_png(img, opts)[0], opts)
+
+
+def save_png(img: Image.Image, path: Path, options: dict | None = None) -> int:
+    """Encode img and write it to path; returns the bytes written."""
+    data = encode_png(img, options)
+    Path(path).write_bytes(data)
+    return len(data)
+
+
+def _report(folder: Path, write: bool) -> None:
+    files = sorted(folder.glob("*.png"))
+    before = after = palettes = 0
+    start = time.perf_counter()
+    for png in files:
+        size = png.stat().st_size
+        with Image.open(png) as img:
+            prepared, error = prepare_png(img)
+        data = _write_png(prepared, PNG_OPTIONS)
+        if len(data) >= size:  # never grow a file that is already smaller
+            data = None
+        kept = size if data is None else len(data)
+        before += size
+        after += kept
+        palettes += prepared.mode == "P" and data is not None
+        mode = "palette" if prepared.mode == "P" else "rgba"
+        note = "" if error is None else f"  dE mean {error[0]:.2f}, p99 {error[1]:.2f}"
+        print(f"  {png.name:40s} {size / 1024:7.1f} -> {kept / 1024:7.1f} KiB  {mode}{note}")
+        if write and data is not None:
+            png.write_bytes(data)
+
+    saved = before - after
+    pct = 100 * saved / before if before else 0
+    print(f"{len(files)} PNGs in {folder} ({palettes} as palette, {time.perf_counter() - start:.1f}s)")
+    print(f"  {before / 1024:.1f} KiB -> {after / 1024:.1f} KiB, saved {saved / 1024:.1f} KiB ({pct:.0f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report bytes saved by the PNG encoding stage.")
+    parser.add_argument("folder", nargs="?", type=Path,
+                        default=Path(__file__).resolve().parents[2] / "public" / "bottles" / "normalized")
+    parser.add_argument("--write", action="store_true", help="re-encode the files in place")
+    args = parser.parse_args()
+    _report(args.folder, args.write)
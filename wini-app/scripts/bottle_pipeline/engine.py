@@ -0,0 +1,229 @@
+"""Background removal with one warm rembg session per process.
+
+rembg.remove(img) without a session builds a new ONNX session on every call,
+so model setup dominates a run over a few hundred bottles. BackgroundRemover
+opens the session once and records per-image latency so the first-image
+(cold) cost can be told apart from steady state. remove_file() consults the
+content-addressed RembgCache first, so unchanged sources skip inference.
+With work_size set, masks are predicted on a downscaled copy (see mask.py).
+With batch_size above 1, masks come from a BatchSegmenter instead, N
+images per onnxruntime run (see batch.py): remove_batch() takes a list, and
+remove_file() batches the cache misses among the paths given to expect().
+
+rembg (and with it onnxruntime, numba and pymatting, ~1.3 s) is imported
+when the first session is created, so runs that find every output up to
+date never pay for it. load_rembg() raises an ImportError saying what to
+install when it is missing.
+"""
+import time
+from pathlib import Path
+from statistics import mean, median
+
+from PIL import Image, ImageOps
+
+from .cache import RembgCache, file_digest
+from .mask import apply_mask, cutout, full_mask, work_copy
+
+# CLI name -> rembg model name
+MODELS = {
+    "u2net": "u2net",
+    "u2netp": "u2netp",
+    "isnet": "isnet-general-use",
+    "silueta": "silueta",
+}
+DEFAULT_MODEL = "u2net"
+INSTALL_HINT = "pip install rembg[cpu]"
+
+
+def load_rembg():
+    """Import rembg on first use; an ImportError names what to install."""
+    try:
+        import rembg
+        import rembg.bg
+    except ImportError as e:
+        raise ImportError(f"background removal needs rembg ({e}). Run: {INSTALL_HINT}") from e
+    return rembg
+
+
+class BackgroundRemover:
+    """A single rembg session plus latency bookkeeping."""
+
+    def __init__(self, model: str = DEFAULT_MODEL, cache: RembgCache | None = None, work_size: int | None = None,
+                 batch_size: int = 1, threads: int | None = None):
+        if model not in MODELS:
+            raise ValueError(f"Unknown model {model!r} (choose from {', '.join(MODELS)})")
+        self.model = model
+        self.cache = cache
+        self.work_size = work_size
+        self.batch_size = max(1, batch_size)
+        self.threads = threads
+        self._session = None
+        self._segmenter = None
+        self.session_load_s = 0.0
+        self.timings: list[float] = []
+        self._upcoming: list[Path] = []
+        self._keys: dict[Path, str | None] = {}  # cache keys expect() was given, so they are not hashed again
+        self._ready: dict[Path, Image.Image] = {}  # batched ahead of their remove_file() call
+
+    @property
+    def session(self):
+        """The rembg session, created on first use."""
+        if self._session is None:
+            start = time.perf_counter()
+            self._session = load_rembg().new_session(MODELS[self.model])
+            self.session_load_s = time.perf_counter() - start
+        return self._session
+
+    @property
+    def segmenter(self):
+        """The BatchSegmenter, created on first use."""
+        if self._segmenter is None:
+            start = time.perf_counter()  # like the session's, this includes importing rembg
+            load_rembg()
+            from .batch import BatchSegmenter
+
+            self._segmenter = BatchSegmenter(MODELS[self.model], self.batch_size, self.threads)
+            self.session_load_s = time.perf_counter() - start
+        return self._segmenter
+
+    def warm_up(self) -> None:
+        """Load the model now instead of on the first image."""
+        _ = self.segmenter if self.batch_size > 1 else self.session
+
+    @property
+    def cache_tag(self) -> str:
+        """What the cached output depends on besides the source bytes."""
+        return self.model if self.work_size is None else f"{self.model}@{self.work_size}"
+
+    def remove(self, img: Image.Image) -> Image.Image:
+        """Remove the background from an RGBA image."""
+        if self.batch_size > 1:
+            return self.remove_batch([img])[0]
+        session = self.session  # a first load is reported as session load, not image time
+        start = time.perf_counter()
+        if self.work_size is None:
+            result = load_rembg().remove(img, session=session)
+        else:
+            result = cutout(img, session, self.work_size)
+        self.timings.append(time.perf_counter() - start)
+        return result
+
+    def remove_batch(self, imgs: list[Image.Image]) -> list[Image.Image]:
+        """Remove the background from several RGBA images, batch_size per inference run.
+
+        Gives what remove() gives for each image; each is timed at its
+        share of the batch.
+        """
+        if self.batch_size <= 1:
+            return [self.remove(img) for img in imgs]
+        segmenter = self.segmenter
+        start = time.perf_counter()
+        oriented = [ImageOps.exif_transpose(img) for img in imgs]  # as rembg.remove and cutout() do
+        if self.work_size is None:
+            naive_cutout = load_rembg().bg.naive_cutout
+            results = [naive_cutout(img, mask) for img, mask in zip(oriented, segmenter.masks(oriented))]
+        else:
+            smalls = [work_copy(img, self.work_size) for img in oriented]
+            masks = segmenter.masks(smalls)
+            results = [apply_mask(img, full_mask(img, small, mask)) for img, small, mask in zip(oriented, smalls, masks)]
+        self.timings.extend([(time.perf_counter() - start) / len(imgs)] * len(imgs))
+        return results
+
+    def key(self, path: Path, digest: str | None = None) -> str | None:
+        """Cache key of a source file, from its sha256 digest when the caller has it; None with the cache off."""
+        if self.cache is None:
+            return None
+        return self.cache.key(digest or file_digest(path), self.cache_tag)
+
+    def lookup(self, path: Path, key: str | None = None) -> tuple[str | None, Image.Image | None]:
+        """Cache key and cached output for a source file; (None, None) with the cache off."""
+        key = key or self.key(path)
+        if key is None:
+            return None, None
+        return key, self.cache.get(key)
+
+    def expect(self, paths: list[Path], keys: list[str | None] | None = None) -> None:
+        """Announce the files remove_file() will be asked for next, in order, with their cache keys if known.
+
+        With batch_size above 1, a cache miss is then inferred together with
+        the next misses among them; at most batch_size - 1 results wait in
+        memory for their own call.
+        """
+        self._upcoming = [Path(p) for p in paths]
+        self._keys = dict(zip(self._upcoming, keys or []))
+        self._ready.clear()
+
+    def _ahead(self, path: Path) -> list[tuple[Path, str | None, Image.Image]]:
+        """(path, cache key, decoded source) of the uncached files expected right after path."""
+        if path not in self._upcoming:
+            return []
+        self._upcoming = self._upcoming[self._upcoming.index(path) + 1:]
+        ahead = []
+        for other in list(self._upcoming):
+            if len(ahead) + len(self._ready) >= self.batch_size - 1:
+                break
+            if other in self._ready:
+                continue
+            key, cached = self.lookup(other, self._keys.get(other))
+            if cached is not None:
+                self._ready[other] = cached
+                continue
+            try:
+                ahead.append((other, key, Image.open(other).convert("RGBA")))
+            except OSError:  # left for its own remove_file() call to report
+                self._upcoming.remove(other)
+        return ahead
+
+    def remove_file(self, path: Path, key: str | None = None) -> Image.Image:
+        """Remove the background from an image file, using the cache (under key, if given) when enabled."""
+        path = Path(path)
+        if path in self._ready:
+            return self._ready.pop(path)
+        key, cached = self.lookup(path, key)
+        if cached is not None:
+            return cached
+
+        batch = [(path, key, Image.open(path).convert("RGBA"))]
+        if self.batch_size > 1:
+            batch += self._ahead(path)
+        results = self.remove_batch([img for _, _, img in batch])
+        for (other, other_key, _), result in zip(batch, results):
+            if other_key is not None:
+                self.cache.put(other_key, result)
+            if other != path:
+                self._ready[other] = result
+        return results[0]
+
+    def report(self) -> str:
+        """Summarize session load, first-image and steady-state latency."""
+        mode = "" if self.work_size is None else f", masks at {self.work_size}px"
+        if self.batch_size > 1:
+            threads = self._segmenter.threads if self._segmenter else (self.threads, 1)
+            mode += f", batches of {self.batch_size}, threads {threads[0]}/{threads[1]}"
+        lines = [f"  Model: {self.model} (session load {self.session_load_s * 1000:.0f} ms{mode})"]
+        if self.cache is not None:
+            lines.append(f"  Cache: {self.cache.hits} hits, {self.cache.misses} misses")
+        if not self.timings:
+            lines.append("  No images processed")
+            return "\n".join(lines)
+
+        lines.append(f"  First image: {self.timings[0] * 1000:.0f} ms")
+        steady = self.timings[1:]
+        if steady:
+            lines.append(
+                f"  Steady state: median {median(steady) * 1000:.0f} ms, "
+                f"mean {mean(steady) * 1000:.0f} ms over {len(steady)} images"
+            )
+        return "\n".join(lines)
+
+
+_REMOVERS: dict[tuple[str, bool, int | None, int, int | None], BackgroundRemover] = {}
+
+
+def get_remover(model: str = DEFAULT_MODEL, use_cache: bool = True, work_size: int | None = None,
+                batch_size: int = 1, threads: int | None = None) -> BackgroundRemover:
+    """Return the process-wide remover for a model, creating it once."""
+    key = (model, use_cache, work_size, batch_size, threads)
+    if key not in _REMOVERS:
+        _REMOVERS[key] = BackgroundRemover(model, RembgCache() if use_cache else None, work_size, batch_size, threads)
+    return _REMOVERS[key]
@@ -0,0 +1,254 @@
+"""Uncompressed store of alpha-cleaned cutouts under .cache/frames/<script>/<slug>.rgba, read back with numpy.memmap.
+
+Usage (from wini-app/scripts): python -m bottle_pipeline.frames [--fill F ...] [--canvas WxH ...] [--threshold T ...]
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import struct
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+from PIL import Image
+
+from .alpha import ALPHA_THRESHOLD, clean_alpha_array
+
+APP_ROOT = Path(__file__).resolve().parents[2]
+FRAMES_DIR = APP_ROOT / ".cache" / "frames"
+MAGIC = b"WINIRGBA"
+VERSION = 1
+# magic, version, threshold, feather, height, width, bbox (x1, y1, x2, y2), key
+HEADER = struct.Struct("<8sHHfII4I64s")
+HEADER_BYTES = 128  # HEADER padded, so the pixels start on a 128-byte boundary
+
+
+def fit_size(width: int, height: int, canvas: tuple[int, int], fill: float) -> tuple[int, int]:
+    """Size normalize_bottle() scales a width x height crop to: fill of the canvas height, capped at its width."""
+    canvas_w, canvas_h = canvas
+    new_h = int(canvas_h * fill)
+    new_w = int(width * (new_h / height))
+    if new_w > canvas_w:
+        new_w = canvas_w
+        new_h = int(height * (canvas_w / width))
+    return new_w, new_h
+
+
+def fit_canvas(bottle: Image.Image, canvas: tuple[int, int], fill: float) -> Image.Image:
+    """normalize_bottle() of a crop already tight to its bbox, with canvas and fill as arguments."""
+    new_w, new_h = fit_size(bottle.width, bottle.height, canvas, fill)
+    resized = bottle.resize((new_w, new_h), Image.LANCZOS)
+    out = Image.new("RGBA", canvas, (0, 0, 0, 0))
+    out.paste(resized, ((canvas[0] - new_w) // 2, (canvas[1] - new_h) // 2), resized)
+    return out
+
+
+class FrameHeader(NamedTuple):
+    threshold: int
+    feather: float
+    height: int
+    width: int
+    bbox: tuple[int, int, int, int] | None
+    key: str
+
+
+class Frame:
+    """One stored cutout: header fields plus its pixels, mapped read-only."""
+
+    def __init__(self, name: str, pixels: np.ndarray, bbox: tuple[int, int, int, int] | None,
+                 threshold: int, feather: float, key: str):
+        self.name = name
+        self.pixels = pixels
+        self.size = pixels.shape[1], pixels.shape[0]
+        self.bbox = bbox
+        self.threshold = threshold
+        self.feather = feather
+        self.key = key
+
+    def __enter__(self) -> "Frame":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmap the file, so the store can replace or delete it. Copies made from the frame stay valid."""
+        mm = getattr(self.pixels, "_mmap", None)
+        self.pixels = None  # drops the array's hold on the map before it is closed
+        if mm is not None:
+            mm.close()
+
+    def crop(self) -> np.ndarray:
+        """The bbox region, as a view of the map (no copy)."""
+        if self.bbox is None:
+            raise ValueError(f"Frame {self.name} is empty after background removal")
+        x1, y1, x2, y2 = self.bbox
+        return self.pixels[y1:y2, x1:x2]
+
+    def bottle(self) -> Image.Image:
+        """The bbox region as an RGBA image; the only copy made is of that region."""
+        # Always a copy: Image.fromarray() would otherwise share a contiguous crop with the map
+        return Image.fromarray(np.array(self.crop()), "RGBA")
+
+
+class FrameStore:
+    """<name>.rgba files under root/namespace, one per bottle, written atomically."""
+
+    def __init__(self, namespace: str, root: Path = FRAMES_DIR):
+        self.root = Path(root) / namespace
+
+    @classmethod
+    def all(cls, root: Path = FRAMES_DIR) -> list["FrameStore"]:
+        """One store per namespace folder under root."""
+        if not Path(root).is_dir():
+            return []
+        return [cls(folder.name, root) for folder in sorted(Path(root).iterdir()) if folder.is_dir()]
+
+    @staticmethod
+    def key(source_key: str, **params) -> str:
+        """Frame key from the rembg cache key of its source and the cleanup/split settings."""
+        return hashlib.sha256(f"{source_key}:{json.dumps(params, sort_keys=True)}".encode()).hexdigest()
+
+    def path(self, name: str) -> Path:
+        return self.root / f"{name}.rgba"
+
+    def names(self) -> list[str]:
+        return sorted(p.stem for p in self.root.glob("*.rgba"))
+
+    def put(self, name: str, img: Image.Image, key: str, threshold: int = ALPHA_THRESHOLD,
+            feather: float = 0.0) -> Path:
+        """Store a cleaned cutout with its alpha bbox; returns the file written."""
+        if img.mode != "RGBA":
+            img = img.convert("RGBA")
+        bbox = img.getchannel("A").getbbox() or (0, 0, 0, 0)
+        header = HEADER.pack(MAGIC, VERSION, threshold, feather, img.height, img.width, *bbox, key.encode("ascii"))
+        path = self.path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(header.ljust(HEADER_BYTES, b"\0"))
+            f.write(img.tobytes())
+        try:
+            os.replace(tmp, path)
+        except PermissionError:  # Windows: another process (e.g. a sweep) has the old frame mapped
+            tmp.unlink(missing_ok=True)
+            print(f"    Frame {name} is in use; kept the old one, it is rebuilt on the next run")
+        return path
+
+    def header(self, name: str) -> FrameHeader | None:
+        """The unpacked header of name's frame, or None if it is missing or unreadable."""
+        path = self.path(name)
+        try:
+            with open(path, "rb") as f:
+                head = f.read(HEADER.size)
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return None
+        if len(head) < HEADER.size:
+            return None
+        magic, version, threshold, feather, height, width, x1, y1, x2, y2, stored = HEADER.unpack(head)
+        if magic != MAGIC or version != VERSION or size != HEADER_BYTES + height * width * 4:
+            return None
+        bbox = (x1, y1, x2, y2) if x2 > x1 and y2 > y1 else None
+        return FrameHeader(threshold, feather, height, width, bbox, stored.rstrip(b"\0").decode("ascii"))
+
+    def has(self, name: str, key: str) -> bool:
+        """Whether name has a stored frame with this key; reads the header only and maps nothing."""
+        header = self.header(name)
+        return header is not None and header.key == key
+
+    def get(self, name: str, key: str | None = None) -> Frame | None:
+        """The stored frame of name, or None if it is missing, unreadable or (given key) stale.
+
+        The frame holds the file mapped until it is closed.
+        """
+        header = self.header(name)
+        if header is None or (key is not None and header.key != key):
+            return None
+        pixels = np.memmap(self.path(name), np.uint8, "r", HEADER_BYTES, (header.height, header.width, 4))
+        return Frame(name, pixels, header.bbox, header.threshold, header.feather, header.key)
+
+
+def recleaned(frame: Frame, threshold: int) -> Image.Image | None:
+    """frame.bottle() cleaned again at a higher threshold and re-cropped; None if nothing is left."""
+    if threshold <= frame.threshold:
+        return frame.bottle()
+    arr = clean_alpha_array(np.array(frame.crop()), threshold)
+    bottle = Image.fromarray(arr, "RGBA")
+    bbox = bottle.getchannel("A").getbbox()
+    return bottle.crop(bbox) if bbox else None
+
+
+def sweep(stores: list[FrameStore], fills: list[float], canvases: list[tuple[int, int]], thresholds: list[int],
+          out: Path | None = None) -> None:
+    """Normalize every frame with every (threshold, canvas, fill) and print a row per combination.
+
+    Frames are mapped one at a time and closed before the next, so a pipeline run can rebuild them meanwhile.
+    """
+    headers = {(store, name): store.header(name) for store in stores for name in store.names()}
+    names = [pair for pair, header in headers.items() if header is not None and header.bbox is not None]
+    if not names:
+        print(f"No frames in {FRAMES_DIR}; run process-bottles.py or process-uploaded-bottles.py first")
+        return
+    floor = max(headers[pair].threshold for pair in names)
+    if min(thresholds) < floor:
+        print(f"  Frames were cleaned at alpha threshold {floor}; lower thresholds are skipped")
+        thresholds = [t for t in thresholds if t >= floor] or [floor]
+
+    combos = list(itertools.product(thresholds, canvases, fills))
+    rows = {combo: {"seconds": 0.0, "capped": 0, "fill": 0.0, "bottles": 0} for combo in combos}
+    for store, name in names:
+        frame = store.get(name)
+        if frame is None or frame.bbox is None:  # replaced meanwhile by an empty or unreadable one
+            continue
+        with frame:
+            bottles = {}
+            for threshold in thresholds:
+                start = time.perf_counter()
+                bottles[threshold] = recleaned(frame, threshold), time.perf_counter() - start
+        for threshold, (bottle, prepared) in bottles.items():
+            if bottle is None:
+                continue
+            for canvas, fill in itertools.product(canvases, fills):
+                row = rows[threshold, canvas, fill]
+                start = time.perf_counter()
+                result = fit_canvas(bottle, canvas, fill)
+                row["seconds"] += time.perf_counter() - start + prepared / (len(canvases) * len(fills))
+                new_w, new_h = fit_size(bottle.width, bottle.height, canvas, fill)
+                row["capped"] += new_w == canvas[0] and new_h < int(canvas[1] * fill)
+                row["fill"] += new_h / canvas[1]
+                row["bottles"] += 1
+                if out is not None:
+                    folder = out / f"t{threshold}-{canvas[0]}x{canvas[1]}-fill{fill:g}" / store.root.name
+                    folder.mkdir(parents=True, exist_ok=True)
+                    result.save(folder / f"{name}.png", compress_level=1)
+
+    print(f"{len(names)} frames, {len(combos)} combinations")
+    print(f"  {'threshold':>9s} {'canvas':>9s} {'fill':>5s} {'ms/bottle':>10s} {'mean fill':>10s} {'width-capped':>13s}")
+    for (threshold, canvas, fill), row in rows.items():
+        n = max(row["bottles"], 1)
+        print(f"  {threshold:9d} {canvas[0]:>4d}x{canvas[1]:<4d} {fill:5.2f} {row['seconds'] / n * 1000:10.1f} "
+              f"{row['fill'] / n:10.1%} {row['capped']:9d}/{row['bottles']}")
+    if out is not None:
+        print(f"  Canvases written under {out}")
+
+
+def _canvas(value: str) -> tuple[int, int]:
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep normalization settings over every stored frame.")
+    parser.add_argument("--fill", type=float, nargs="+", default=[0.72], help="fractions of canvas height")
+    parser.add_argument("--canvas", type=_canvas, nargs="+", default=[(400, 800)], metavar="WxH")
+    parser.add_argument("--threshold", type=int, nargs="+", default=[ALPHA_THRESHOLD],
+                        help=f"alpha thresholds, at least the frames' own (default: {ALPHA_THRESHOLD})")
+    parser.add_argument("--frames", type=Path, default=FRAMES_DIR,
+                        help=f"frame store, one folder per script (default: {FRAMES_DIR})")
+    parser.add_argument("--out", type=Path, help="also write every canvas under this folder")
+    args = parser.parse_args()
+    sweep(FrameStore.all(args.frames), args.fill, args.canvas, args.threshold, args.out)
@@ -0,0 +1,204 @@
+"""rembg masks predicted at a bounded working resolution.
+
+rembg runs its network at a fixed input size (320px, 1024px for isnet)
+whatever the source size. The work and memory that grow with the source sit
+around the network: an RGB copy and a LANCZOS downscale of the full frame on
+the way in, and a full-frame LANCZOS upsample and composite on the way out.
+The normalized bottle is never taller than 576px, so cutout() does this
+instead:
+
+- gives rembg a BOX-downscaled copy at most WORK_SIZE px on its long side
+  and asks for the mask only;
+- refines the soft edge band of that mask with a fast guided filter
+  (He & Sun, 2015) against the copy's luminance;
+- LANCZOS-upsamples only the mask's bounding box to source resolution and
+  writes it into the alpha channel.
+
+Run `python -m bottle_pipeline.mask IMAGE... [--work-size N]` from
+wini-app/scripts to compare both modes on real sources: latency, peak RSS
+(where the platform reports it) and the IoU of each mask against the
+full-resolution one.
+"""
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageChops, ImageOps
+
+try:  # not available on Windows
+    import resource
+except ImportError:
+    resource = None
+
+WORK_SIZE = 1024  # long side handed to rembg; isnet's own input size
+GUIDE_RADIUS = 2  # guided filter window radius, in half-working-resolution px
+GUIDE_EPS = 1e-3  # guided filter regularization; lower follows the guide more closely
+QUALITY_IOU = 0.99  # the quality check warns below this
+
+
+def box_mean(x: np.ndarray, r: int) -> np.ndarray:
+    """Mean over a (2r+1)^2 window, shrunk at the borders; separable running sums."""
+    out = x
+    for axis in (0, 1):
+        n = out.shape[axis]
+        c = np.concatenate((np.zeros_like(out.take([0], axis)), out.cumsum(axis=axis)), axis=axis)
+        lo = np.maximum(np.arange(n) - r, 0)
+        hi = np.minimum(np.arange(n) + r + 1, n)
+        shape = [1, 1]
+        shape[axis] = n
+        out = (c.take(hi, axis) - c.take(lo, axis)) / (hi - lo).reshape(shape).astype(np.float32)
+    return out
+
+
+def refine_edges(mask: Image.Image, guide: Image.Image) -> Image.Image:
+    """Re-estimate the soft edge band of a mask with a fast guided filter.
+
+    The linear model alpha = a * luminance + b is fitted at half resolution,
+    and its smoothed coefficients are applied at full resolution. Only
+    pixels strictly between 0 and 255 change, so texture inside the bottle
+    or in a busy background cannot leak into the solid parts of the mask.
+    """
+    half = ((mask.width + 1) // 2, (mask.height + 1) // 2)
+    p = np.asarray(mask.resize(half, Image.BOX), dtype=np.float32) / 255
+    i = np.asarray(guide.resize(half, Image.BOX), dtype=np.float32) / 255
+    mean_i, mean_p = box_mean(i, GUIDE_RADIUS), box_mean(p, GUIDE_RADIUS)
+    cov_ip = box_mean(i * p, GUIDE_RADIUS) - mean_i * mean_p
+    var_i = box_mean(i * i, GUIDE_RADIUS) - mean_i * mean_i
+    a = cov_ip / (var_i + GUIDE_EPS)
+    b = mean_p - a * mean_i
+    a, b = (
+        np.asarray(Image.fromarray(box_mean(c, GUIDE_RADIUS), "F").resize(mask.size, Image.BILINEAR))
+        for c in (a, b)
+    )
+
+    out = np.array(mask)
+    band = (out > 0) & (out < 255)
+    q = a[band] * (np.asarray(guide)[band] / np.float32(255)) + b[band]
+    out[band] = (np.clip(q, 0, 1) * 255 + 0.5).astype(np.uint8)
+    return Image.fromarray(out, "L")
+
+
+def work_copy(img: Image.Image, work_size: int) -> Image.Image:
+    """What rembg is given: img itself, or a copy at most work_size px on its long side."""
+    if max(img.size) <= work_size:
+        return img
+    scale = work_size / max(img.size)
+    # BOX is an exact area average; the network input is resized again by rembg anyway
+    return img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.BOX)
+
+
+def _upsample_bbox(mask: Image.Image, size: tuple[int, int]) -> tuple[tuple[int, int, int, int], Image.Image] | None:
+    """Upsample only the non-zero part of mask to size; returns (box, mask crop)."""
+    bbox = mask.getbbox()
+    if bbox is None:
+        return None
+    fx, fy = size[0] / mask.width, size[1] / mask.height
+    # Widen by the LANCZOS support so the crop matches a whole-frame resize
+    box = (
+        max(0, int((bbox[0] - 3) * fx)),
+        max(0, int((bbox[1] - 3) * fy)),
+        min(size[0], int((bbox[2] + 3) * fx) + 1),
+        min(size[1], int((bbox[3] + 3) * fy) + 1),
+    )
+    src = (box[0] / fx, box[1] / fy, box[2] / fx, box[3] / fy)
+    return box, mask.resize((box[2] - box[0], box[3] - box[1]), Image.LANCZOS, box=src)
+
+
+def full_mask(img: Image.Image, small: Image.Image, small_mask: Image.Image) -> Image.Image:
+    """Full-resolution L mask of img from the mask rembg predicted for work_copy() small."""
+    if small is img:
+        return small_mask
+    refined = refine_edges(small_mask, small.convert("L"))
+    full = Image.new("L", img.size, 0)
+    upsampled = _upsample_bbox(refined, img.size)
+    if upsampled is not None:
+        full.paste(upsampled[1], upsampled[0][:2])
+    return full
+
+
+def predict_mask(img: Image.Image, session, work_size: int = WORK_SIZE) -> Image.Image:
+    """Full-resolution L mask of img, with rembg run on a copy at most work_size px."""
+    from rembg import remove
+
+    small = work_copy(img, work_size)
+    return full_mask(img, small, remove(small, session=session, only_mask=True))
+
+
+def apply_mask(result: Image.Image, mask: Image.Image) -> Image.Image:
+    """Put mask into the alpha channel of RGBA result, in place, as compositing would."""
+    alpha = result.getchannel("A")
+    if alpha.getextrema() != (255, 255):
+        mask = ImageChops.multiply(alpha, mask)  # what compositing does to a transparent source
+    result.putalpha(mask)
+    return result
+
+
+def cutout(img: Image.Image, session, work_size: int = WORK_SIZE) -> Image.Image:
+    """Background-removed RGBA copy of img.
+
+    Unlike rembg.remove, the colour under transparent pixels is not zeroed
+    here, which saves two full-frame buffers; clean_alpha() zeroes it anyway.
+    """
+    result = ImageOps.exif_transpose(img)  # a copy, oriented the way rembg.remove would
+    return apply_mask(result, predict_mask(result, session, work_size))
+
+
+def mask_iou(a: Image.Image, b: Image.Image, threshold: int = 128) -> float:
+    """Intersection over union of two L masks binarized at threshold."""
+    fa = np.asarray(a) >= threshold
+    fb = np.asarray(b) >= threshold
+    union = np.count_nonzero(fa | fb)
+    return np.count_nonzero(fa & fb) / union if union else 1.0
+
+
+def _run_mode(paths: list[Path], model: str, work_size: int | None) -> tuple[list[float], int | None, list]:
+    """Cut out every image; returns (seconds, peak RSS in KiB on Linux, alpha masks)."""
+    from .engine import MODELS
+    from rembg import new_session, remove
+
+    session = new_session(MODELS[model])
+    remove(Image.new("RGBA", (64, 64)), session=session)  # keep model load out of the timings
+    times, masks = [], []
+    for path in paths:
+        img = Image.open(path).convert("RGBA")
+        start = time.perf_counter()
+        result = remove(img, session=session) if work_size is None else cutout(img, session, work_size)
+        times.append(time.perf_counter() - start)
+        masks.append(result.getchannel("A"))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+    return times, peak, masks
+
+
+def _compare(paths: list[Path], model: str, work_size: int) -> None:
+    runs = {}
+    for label, size in (("full", None), (f"{work_size}px", work_size)):
+        # One fresh process per mode so each peak RSS is that mode's alone;
+        # spawn, because forking after onnxruntime has started threads can hang
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            runs[label] = pool.submit(_run_mode, paths, model, size).result()
+
+    (full_t, full_rss, full_m), (work_t, work_rss, work_m) = runs.values()
+    print(f"{'image':40s} {'full':>8s} {work_size:>6d}px {'IoU':>7s}")
+    worst = 1.0
+    for path, ft, wt, fm, wm in zip(paths, full_t, work_t, full_m, work_m):
+        iou = mask_iou(fm, wm)
+        worst = min(worst, iou)
+        flag = "  WARNING" if iou < QUALITY_IOU else ""
+        print(f"{path.name[:40]:40s} {ft * 1000:6.0f}ms {wt * 1000:6.0f}ms {iou:7.4f}{flag}")
+    print(f"{'total':40s} {sum(full_t) * 1000:6.0f}ms {sum(work_t) * 1000:6.0f}ms {worst:7.4f} (worst)")
+    if full_rss is not None:
+        print(f"Peak RSS: full {full_rss / 1024:.0f} MiB, {work_size}px {work_rss / 1024:.0f} MiB")
+
+
+if __name__ == "__main__":
+    from .engine import DEFAULT_MODEL, MODELS
+
+    parser = argparse.ArgumentParser(description="Compare full-resolution and working-resolution masks.")
+    parser.add_argument("images", nargs="+", type=Path)
+    parser.add_argument("--model", choices=MODELS, default=DEFAULT_MODEL, help="rembg model")
+    parser.add_argument("--work-size", type=int, default=WORK_SIZE, help=f"long side for inference (default: {WORK_SIZE})")
+    args = parser.parse_args()
+    _compare(args.images, args.model, args.work_size)
@@ -0,0 +1,157 @@
+"""The generated bottle metadata index, src/lib/bottle-index.json.
+
+bottles.ts imports this file. Every normalized bottle gets an entry keyed
+by its src, e.g. "/bottles/normalized/chardonnay-full.png":
+
+    {"width": 400, "height": 800, "bbox": [133, 113, 267, 687], "dominant": "#5a2a31",
+     "placeholder": "data:image/webp;base64,...",
+     "bytes": {"png": {"400": 24210}, "webp": {"400": 8123, ...}}}
+
+bbox is the alpha bounding box (left, top, right, bottom), so the frontend
+can reserve layout without measuring images at runtime. placeholder is a
+blurred 16x32 WebP of the whole canvas (~450 bytes) that the UI can draw
+until the full image has loaded. describe() takes all of these but the
+byte sizes from an in-memory canvas, so process-bottles.py measures each
+bottle right after normalizing it instead of decoding its PNG again. Bottles that
+process-bottles.py adds from the manifest also carry "name", "type" and
+"order", their position in the manifest; bottles.ts lists those after its
+hand-written entries, sorted by order.
+
+The file is rewritten atomically with sorted keys, so reruns give stable diffs.
+Run `python -m bottle_pipeline.metadata` from wini-app/scripts to (re)index
+every *-full.png in public/bottles/normalized/.
+"""
+import argparse
+import base64
+import io
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from .variants import FORMAT_OPTIONS, VARIANT_SIZES, variant_path
+
+APP_ROOT = Path(__file__).resolve().parents[2]
+INDEX_PATH = APP_ROOT / "src" / "lib" / "bottle-index.json"
+NORM_DIR = APP_ROOT / "public" / "bottles" / "normalized"
+SRC_BASE = "/bottles/normalized"
+DOMINANT_SAMPLE = (100, 200)  # the dominant colour is taken from a copy this size
+DOMINANT_MIN_ALPHA = 128  # pixels at least this opaque count towards it
+PLACEHOLDER_SIZE = (16, 32)
+PLACEHOLDER_BLUR = 1.0  # Gaussian radius at placeholder size; hides blockiness when scaled up
+PLACEHOLDER_OPTIONS = {"format": "WEBP", "quality": 60, "method": 0}
+
+
+def bottle_src(png: Path) -> str:
+    return f"{SRC_BASE}/{png.name}"
+
+
+def dominant_colour(img: Image.Image) -> str | None:
+    """Hex colour of the largest cluster among the visible pixels, or None if there are none."""
+    small = np.asarray(img.convert("RGBA").resize(DOMINANT_SAMPLE, Image.BOX))
+    pixels = small[small[:, :, 3] >= DOMINANT_MIN_ALPHA][:, :3]
+    if not len(pixels):
+        return None
+    strip = Image.fromarray(np.ascontiguousarray(pixels[None]), "RGB")
+    quantized = strip.quantize(8, method=Image.Quantize.MEDIANCUT)
+    _, index = max(quantized.getcolors())
+    r, g, b = quantized.getpalette()[index * 3:index * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def placeholder(canvas: Image.Image) -> str:
+    """Blurred PLACEHOLDER_SIZE WebP of canvas, as a data URI."""
+    tiny = canvas.convert("RGBA").resize(PLACEHOLDER_SIZE, Image.BOX).filter(ImageFilter.GaussianBlur(PLACEHOLDER_BLUR))
+    buf = io.BytesIO()
+    tiny.save(buf, **PLACEHOLDER_OPTIONS)
+    return "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def describe(canvas: Image.Image) -> dict:
+    """Size, alpha bbox, dominant colour and placeholder of a normalized canvas."""
+    bbox = canvas.getchannel("A").getbbox()
+    return {
+        "width": canvas.width,
+        "height": canvas.height,
+        "bbox": list(bbox) if bbox else None,
+        "dominant": dominant_colour(canvas),
+        "placeholder": placeholder(canvas),
+    }
+
+
+def byte_sizes(png: Path, width: int) -> dict[str, dict[str, int]]:
+    """{format: {width: bytes}} of the PNG and whichever WebP/AVIF variants exist next to it."""
+    sizes = {"png": {str(width): png.stat().st_size}}
+    for fmt in FORMAT_OPTIONS:
+        for variant_width, _ in VARIANT_SIZES:
+            path = variant_path(png, fmt, variant_width)
+            if path.exists():
+                sizes.setdefault(fmt, {})[str(variant_width)] = path.stat().st_size
+    return sizes
+
+
+def bottle_metadata(png: Path) -> dict:
+    """describe() of one normalized PNG plus its byte sizes."""
+    with Image.open(png) as img:
+        rgba = img.convert("RGBA")
+    return {**describe(rgba), "bytes": byte_sizes(png, rgba.width)}
+
+
+class BottleIndex:
+    """{src -> metadata}, plus name, type and order for pipeline-added bottles."""
+
+    def __init__(self, path: Path = INDEX_PATH):
+        self.path = Path(path)
+        self.bottles: dict[str, dict] = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                self.bottles = json.load(f).get("bottles", {})
+
+    def update(self, png: Path, name: str | None = None, bottle_type: str | None = None,
+               measure: bool = True, described: dict | None = None, order: int | None = None) -> dict:
+        """Index png; name and type, when given, list it in BOTTLES at position order. Returns its entry.
+
+        described is describe() of the canvas png was written from, which
+        saves decoding it. With measure unset, an entry that already has
+        metadata keeps it.
+        """
+        src = bottle_src(png)
+        entry = dict(self.bottles.get(src, {}))
+        if name is not None:
+            entry["name"] = name
+        if bottle_type is not None:
+            entry["type"] = bottle_type
+        if order is not None:
+            entry["order"] = order
+        if described is not None:
+            entry.update(described, bytes=byte_sizes(png, described["width"]))
+        elif measure or "width" not in entry:
+            entry.update(bottle_metadata(png))
+        self.bottles[src] = entry
+        return entry
+
+    def save(self) -> None:
+        """Write the index atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"bottles": self.bottles}, f, indent=2, sort_keys=True, ensure_ascii=False)
+            f.write("\n")
+        os.replace(tmp, self.path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the bottle metadata index.")
+    parser.add_argument("folder", nargs="?", type=Path, default=NORM_DIR)
+    parser.add_argument("--index", type=Path, default=INDEX_PATH, help=f"index file (default: {INDEX_PATH})")
+    args = parser.parse_args()
+
+    index = BottleIndex(args.index)
+    files = sorted(args.folder.glob("*-full.png"))
+    for png in files:
+        entry = index.update(png)
+        print(f"  {png.name:40s} bbox={entry['bbox']}  {entry['dominant']}")
+    index.save()
+    print(f"{len(files)} bottles indexed in {args.index}")
@@ -0,0 +1,24 @@
+"""The hyphenated scripts in wini-app/scripts/, loaded as modules.
+
+normalize_bottle(), split_bottles() and friends live in the scripts
+themselves. Tools that reuse them load a script by path, which runs its
+imports and constants but not its main().
+"""
+import importlib.util
+from pathlib import Path
+from types import ModuleType
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+
+_LOADED: dict[str, ModuleType] = {}
+
+
+def load_script(filename: str) -> ModuleType:
+    """Import SCRIPTS_DIR/filename once per process, e.g. "process-uploaded-bottles.py"."""
+    if filename not in _LOADED:
+        name = filename.removesuffix(".py").replace("-", "_")
+        spec = importlib.util.spec_from_file_location(name, SCRIPTS_DIR / filename)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _LOADED[filename] = module
+    return _LOADED[filename]
@@ -0,0 +1,162 @@
+"""Column-projection segmentation of multi-bottle images, with valley splits for touching bottles."""
+import heapq
+from functools import partial
+from typing import Callable
+
+import numpy as np
+
+GAP_FRACTION = 0.02  # columns below this share of the peak column are gaps
+ROW_FRACTION = 0.01  # rows below this share of the region's peak row are empty
+ROW_PADDING = 5
+VALLEY_MARGIN = 0.2  # never split within this fraction of a region's edges
+VALLEY_TOLERANCE = 0.05  # columns this close to the minimum (share of the range) tie
+
+
+def column_runs(col_sum: np.ndarray, min_width: int) -> list[tuple[int, int]]:
+    """Contiguous [start, end) column ranges above the gap threshold."""
+    is_content = col_sum > col_sum.max() * GAP_FRACTION
+    edges = np.diff(np.concatenate(([0], is_content.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    keep = ends - starts >= min_width
+    return list(zip(starts[keep].tolist(), ends[keep].tolist()))
+
+
+def merge_smallest_gaps(runs: list[tuple[int, int]], target: int) -> list[tuple[int, int]]:
+    """Merge adjacent runs across the narrowest gaps until target remain."""
+    n = len(runs)
+    starts = [s for s, _ in runs]
+    ends = [e for _, e in runs]
+    nxt = list(range(1, n + 1))
+    alive = [True] * n
+    heap = [(starts[i + 1] - ends[i], i) for i in range(n - 1)]
+    heapq.heapify(heap)
+
+    count = n
+    while count > max(target, 1) and heap:
+        gap, i = heapq.heappop(heap)
+        j = nxt[i]
+        # Entries go stale once either side has been merged
+        if not alive[i] or j >= n or starts[j] - ends[i] != gap:
+            continue
+        ends[i] = ends[j]
+        alive[j] = False
+        nxt[i] = nxt[j]
+        count -= 1
+        if nxt[i] < n:
+            heapq.heappush(heap, (starts[nxt[i]] - ends[i], i))
+
+    return [(starts[i], ends[i]) for i in range(n) if alive[i]]
+
+
+def valley_split(col_sum: np.ndarray, start: int, end: int, smooth: int) -> tuple[int, float]:
+    """Lowest point of the smoothed profile inside [start, end), and its depth.
+
+    Depth is 1 - valley/peak, so 1.0 means a clean gap and 0.0 means no dip.
+    """
+    profile = col_sum[start:end].astype(np.float64)
+    if smooth > 1:
+        profile = np.convolve(profile, np.ones(smooth) / smooth, mode="same")
+    peak = profile.max()
+    mid = len(profile) // 2
+    margin = max(1, int((end - start) * VALLEY_MARGIN))
+    lo, hi = margin, len(profile) - margin
+    if hi > lo:
+        # Near-minimal columns form one or more valley floors; take the centre
+        # of the floor nearest the middle, so a flat profile degrades to the
+        # old midpoint split
+        window = profile[lo:hi]
+        floor = window.min() + VALLEY_TOLERANCE * (window.max() - window.min())
+        candidates = lo + np.flatnonzero(window <= floor)
+        floors = np.split(candidates, np.flatnonzero(np.diff(candidates) > 1) + 1)
+        centres = np.array([(f[0] + f[-1]) // 2 for f in floors])
+        x = int(centres[np.argmin(np.abs(centres - mid))])
+    else:
+        x = mid
+    depth = 1.0 - profile[x] / peak if peak > 0 else 0.0
+    return start + x, depth
+
+
+def split_widest(
+    col_sum: np.ndarray, regions: list[tuple[int, int]], target: int, smooth: int
+) -> tuple[list[tuple[int, int]], dict[int, float]]:
+    """Split the widest regions at their valleys until target regions exist.
+
+    Returns the regions and {split column: valley depth}.
+    """
+    heap = [(-(e - s), s, e) for s, e in regions]
+    heapq.heapify(heap)
+    depths = {}
+    while len(heap) < target:
+        _, s, e = heapq.heappop(heap)
+        if e - s < 2:
+            heapq.heappush(heap, (-(e - s), s, e))
+            break
+        x, depth = valley_split(col_sum, s, e, smooth)
+        depths[x] = depth
+        heapq.heappush(heap, (-(x - s), s, x))
+        heapq.heappush(heap, (-(e - x), x, e))
+    return sorted((s, e) for _, s, e in heap), depths
+
+
+def region_row_sums(alpha: np.ndarray, regions: list[tuple[int, int]]) -> np.ndarray:
+    """(rows, regions) alpha sums over each region's columns, in one pass over alpha."""
+    # reduceat sums columns idx[k]:idx[k+1]; even slots are the regions
+    idx = np.array([c for s, e in regions for c in (s, e)])
+    if idx[-1] >= alpha.shape[1]:
+        idx = idx[:-1]  # the last slot already runs to the right edge
+    return np.add.reduceat(alpha, idx, axis=1, dtype=np.uint32)[:, ::2]
+
+
+def row_bounds(sums: np.ndarray, pad: int = ROW_PADDING) -> list[tuple[int, int] | None]:
+    """Vertical [y0, y1) bounds of every region from its region_row_sums() column."""
+    h = len(sums)
+    mask = sums > sums.max(axis=0) * ROW_FRACTION
+    has_rows = mask.any(axis=0)
+    first = mask.argmax(axis=0)
+    last = h - 1 - mask[::-1].argmax(axis=0)
+    return [
+        (max(0, int(first[k]) - pad), min(h, int(last[k]) + pad)) if has_rows[k] else None
+        for k in range(sums.shape[1])
+    ]
+
+
+def segment_columns(alpha: np.ndarray, expected: int, min_width: int) -> tuple[list[dict], int]:
+    """Find expected bottle boxes in an alpha channel.
+
+    Returns ([{"box": (x0, y0, x1, y1), "confidence": c}, ...], raw run count).
+    """
+    return segment_profile(alpha.sum(axis=0, dtype=np.uint64), partial(region_row_sums, alpha), expected, min_width)
+
+
+def segment_profile(
+    col_sum: np.ndarray,
+    row_sums: Callable[[list[tuple[int, int]]], np.ndarray],
+    expected: int,
+    min_width: int,
+) -> tuple[list[dict], int]:
+    """segment_columns() from the column sums of an alpha channel.
+
+    row_sums(regions) gives region_row_sums() of the same channel.
+    """
+    if not col_sum.any():
+        return [], 0
+    runs = column_runs(col_sum, min_width)
+    found = len(runs)
+
+    regions = merge_smallest_gaps(runs, expected) if len(runs) > expected else runs
+    depths = {}
+    if regions and len(regions) < expected:
+        regions, depths = split_widest(col_sum, regions, expected, max(1, min_width // 3))
+
+    widths = np.array([e - s for s, e in regions], dtype=np.float64)
+    median = float(np.median(widths)) if len(widths) else 0.0
+    results = []
+    for (s, e), rows in zip(regions, row_bounds(row_sums(regions)) if regions else []):
+        if rows is None:
+            continue
+        # Real gaps are fully clear; valley splits are as clear as the dip is deep
+        edge = min(depths.get(s, 1.0), depths.get(e, 1.0))
+        width_score = min(e - s, median) / max(e - s, median) if median else 0.0
+        results.append({"box": (s, rows[0], e, rows[1]), "confidence": round(float(edge * width_score), 3)})
+    return results, found
@@ -0,0 +1,205 @@
+"""Alpha cleanup, splitting profiles and bbox of very large frames, band by band, identical to the whole-frame helpers.
+
+Usage (from wini-app/scripts): python -m bottle_pipeline.strips [IMAGE] [--tile-mb N]
+"""
+import argparse
+import hashlib
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+from PIL import Image, ImageChops, ImageDraw, ImageFilter
+
+from .alpha import ALPHA_THRESHOLD, clean_alpha, drop_lut
+from .components import block_reduce, segment_blocks, segment_components, work_factor
+from .segment import region_row_sums, segment_columns, segment_profile
+
+try:  # not available on Windows
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_TILE_BYTES = 32 * 2**20  # RGBA bytes per band
+BLUR_PASSES = 3  # box blurs Pillow's GaussianBlur is made of
+
+
+def band_rows(width: int, tile_bytes: int = DEFAULT_TILE_BYTES, align: int = 1) -> int:
+    """Rows per band so that a band's RGBA fits tile_bytes; a multiple of align, at least align."""
+    rows = max(1, tile_bytes // (4 * max(width, 1)))
+    return max(align, rows // align * align)
+
+
+def blur_reach(radius: float) -> int:
+    """Rows beyond which a GaussianBlur(radius) result no longer depends on a pixel."""
+    return BLUR_PASSES * (int(radius) + 2)
+
+
+def clean_alpha_strips(img: Image.Image, threshold: int = ALPHA_THRESHOLD, feather: float = 0.0,
+                       tile_bytes: int = DEFAULT_TILE_BYTES) -> Image.Image:
+    """clean_alpha(), in place, one band of at most tile_bytes at a time."""
+    if img.mode != "RGBA":
+        img = img.convert("RGBA")
+    width, height = img.size
+    step = band_rows(width, tile_bytes)
+    lut = drop_lut(threshold)
+    for y0 in range(0, height, step):
+        box = (0, y0, width, min(height, y0 + step))
+        drop = img.crop(box).getchannel("A").point(lut, "1")
+        img.paste((0, 0, 0, 0), box, drop)
+
+    if feather > 0:
+        reach = blur_reach(feather)
+        above = Image.new("L", (width, 0))  # unfeathered alpha of the rows just above the band
+        for y0 in range(0, height, step):
+            y1 = min(height, y0 + step)
+            band = img.crop((0, y0, width, y1))
+            below = img.crop((0, y1, width, min(height, y1 + reach))).getchannel("A")
+            context = Image.new("L", (width, above.height + band.height + below.height))
+            context.paste(above, (0, 0))
+            context.paste(band.getchannel("A"), (0, above.height))
+            context.paste(below, (0, above.height + band.height))
+            soft = context.filter(ImageFilter.GaussianBlur(feather))
+
+            top, bottom = above.height, above.height + band.height
+            alpha = context.crop((0, top, width, bottom))
+            above = context.crop((0, max(0, bottom - reach), width, bottom))
+            band.putalpha(ImageChops.darker(alpha, soft.crop((0, top, width, bottom))))
+            img.paste(band, (0, y0))
+    return img
+
+
+class AlphaStrips:
+    """Alpha of an RGBA image or (H, W, 4) array (e.g. a mapped frame), read in bands of at most tile_bytes."""
+
+    def __init__(self, src: Image.Image | np.ndarray, tile_bytes: int = DEFAULT_TILE_BYTES):
+        if isinstance(src, Image.Image):
+            if src.mode != "RGBA":
+                src = src.convert("RGBA")
+            self.shape = (src.height, src.width)
+        else:
+            self.shape = src.shape[:2]
+        self.src = src
+        self.tile_bytes = tile_bytes
+
+    def box(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        """Alpha of one box; a view for arrays, a copy of just the box for images."""
+        if isinstance(self.src, np.ndarray):
+            return self.src[y0:y1, x0:x1, 3]
+        return np.asarray(self.src.crop((x0, y0, x1, y1)).getchannel("A"))
+
+    def bands(self, align: int = 1) -> Iterator[tuple[int, np.ndarray]]:
+        """(first row, alpha) of every band, top to bottom; band heights are multiples of align."""
+        height, width = self.shape
+        step = band_rows(width, self.tile_bytes, align)
+        for y0 in range(0, height, step):
+            yield y0, self.box(0, y0, width, min(height, y0 + step))
+
+    def column_sums(self) -> np.ndarray:
+        """alpha.sum(axis=0): the projection segment_columns() splits on."""
+        total = np.zeros(self.shape[1], dtype=np.uint64)
+        for _, band in self.bands():
+            total += band.sum(axis=0, dtype=np.uint64)
+        return total
+
+    def region_row_sums(self, regions: list[tuple[int, int]]) -> np.ndarray:
+        """segment.region_row_sums() of the whole channel: (rows, regions), a few bytes per row."""
+        return np.concatenate([region_row_sums(band, regions) for _, band in self.bands()])
+
+    def block_any(self, factor: int) -> np.ndarray:
+        """components.block_reduce(alpha > 0, factor)."""
+        return np.concatenate([block_reduce(band > 0, factor) for _, band in self.bands(factor)])
+
+    def bbox(self) -> tuple[int, int, int, int] | None:
+        """Bounding box of the nonzero alpha, as Image.getbbox() gives it."""
+        cols = np.zeros(self.shape[1], dtype=bool)
+        rows = []
+        for y0, band in self.bands():
+            cols |= band.any(axis=0)
+            rows.extend(y0 + np.flatnonzero(band.any(axis=1))[[0, -1]] if band.any() else [])
+        if not rows:
+            return None
+        xs = np.flatnonzero(cols)
+        return int(xs[0]), int(rows[0]), int(xs[-1]) + 1, int(rows[-1]) + 1
+
+
+def segment_columns_strips(alpha: AlphaStrips, expected: int, min_width: int) -> tuple[list[dict], int]:
+    """segment.segment_columns() without holding the whole alpha channel."""
+    return segment_profile(alpha.column_sums(), alpha.region_row_sums, expected, min_width)
+
+
+def segment_components_strips(alpha: AlphaStrips, expected: int, min_width: int) -> tuple[list[dict], int]:
+    """components.segment_components() without holding the whole alpha channel."""
+    factor = work_factor(alpha.shape)
+    return segment_blocks(alpha.block_any(factor), factor, alpha.shape, alpha.box, expected, min_width)
+
+
+def _synthetic(width: int = 8000, height: int = 6000, count: int = 3) -> Image.Image:
+    """A large frame of count soft-edged bottles, drawn without full-frame temporaries."""
+    # White under zero alpha, as rembg leaves it; also makes every page resident up front
+    img = Image.new("RGBA", (width, height), (255, 255, 255, 0))
+    draw = ImageDraw.Draw(img)
+    slot = width // count
+    for i in range(count):
+        x0, x1 = i * slot + slot // 4, (i + 1) * slot - slot // 4
+        draw.rectangle((x0 - 12, height // 8 - 12, x1 + 12, height - height // 10 + 12), fill=(40, 40, 40, 6))
+        draw.rectangle((x0, height // 4, x1, height - height // 10), fill=(90, 20, 40, 255))
+        neck = (x1 - x0) // 3
+        draw.rectangle((x0 + neck, height // 8, x1 - neck, height // 4), fill=(90, 20, 40, 255))
+    return img
+
+
+def _run_mode(path: Path | None, tiled: bool, tile_bytes: int, count: int, feather: float) -> tuple:
+    """Clean and split one frame; returns (seconds, peak RSS growth in KiB or None, results)."""
+    img = Image.open(path).convert("RGBA") if path else _synthetic(count=count)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+    start = time.perf_counter()
+    if tiled:
+        clean = clean_alpha_strips(img, ALPHA_THRESHOLD, feather, tile_bytes)
+        alpha = AlphaStrips(clean, tile_bytes)
+        bbox = alpha.bbox()
+        columns = segment_columns_strips(alpha, count, 30)
+        components = segment_components_strips(alpha, count, 30)
+    else:
+        clean = clean_alpha(img, ALPHA_THRESHOLD, feather)
+        bbox = clean.getchannel("A").getbbox()
+        alpha = np.asarray(clean.getchannel("A"))
+        columns = segment_columns(alpha, count, 30)
+        components = segment_components(alpha, count, 30)
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before if resource else None
+    # Digests only: a parent holding big results would pass its peak RSS on to the next child
+    regions = [(r["box"], r["confidence"], hashlib.sha256(r["mask"].tobytes()).hexdigest()) for r in components[0]]
+    return seconds, peak, (hashlib.sha256(clean.tobytes()).hexdigest(), bbox, columns, regions, components[1])
+
+
+def _compare(path: Path | None, tile_bytes: int, count: int, feather: float) -> None:
+    runs = {}
+    for label, tiled in (("whole frame", False), ("strips", True)):
+        # One fresh process per mode, so each peak RSS is that mode's alone
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            runs[label] = pool.submit(_run_mode, path, tiled, tile_bytes, count, feather).result()
+
+    (whole_s, whole_rss, whole), (strip_s, strip_rss, strips) = runs.values()
+    print(f"{path.name if path else 'synthetic 8000x6000'}, {tile_bytes / 2**20:g} MiB tiles, feather {feather:g}")
+    for label, (seconds, rss, _) in runs.items():
+        peak = f", peak RSS +{rss / 1024:.0f} MiB over the loaded frame" if rss is not None else ""
+        print(f"  {label:12s} {seconds * 1000:8.0f} ms{peak}")
+    names = ["cleaned pixels", "bbox", "column split", "component split", "component count"]
+    differ = [name for name, a, b in zip(names, whole, strips) if a != b]
+    if differ:
+        raise SystemExit(f"FAIL: strips differ from the whole frame in {', '.join(differ)}")
+    print("  identical: " + ", ".join(names))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare whole-frame and band-by-band cleanup and splitting.")
+    parser.add_argument("image", nargs="?", type=Path)
+    parser.add_argument("--tile-mb", type=float, default=DEFAULT_TILE_BYTES / 2**20,
+                        help=f"RGBA MiB per band (default: {DEFAULT_TILE_BYTES // 2**20})")
+    parser.add_argument("--count", type=int, default=3, help="bottles to split into (default: 3)")
+    parser.add_argument("--feather", type=float, default=0.0, help="edge feather radius (default: 0)")
+    args = parser.parse_args()
+    _compare(args.image, int(args.tile_mb * 2**20), args.count, args.feather)
@@ -0,0 +1,173 @@
+"""Per-stage events and optional profiling for the bottle scripts.
+
+Every stage of every bottle becomes one event holding its duration, the
+pixel size of what went in and what came out, and the bytes it wrote.
+Events are appended as JSON lines to a run report, by default
+wini-app/.cache/runs.jsonl. Runs accumulate there, so ingestion cost per
+bottle can be graphed over time:
+
+    {"run": "20261016-231502-8812", "script": "process-bottles", "ts": 1792192502.113,
+     "item": "chardonnay", "stage": "rembg", "seconds": 0.412,
+     "in": [1920, 2880], "out": [1920, 2880], "bytes": null}
+
+Every run ends with a "run" event holding its total time and item count.
+
+profiled("cpu") wraps a run in cProfile and profiled("mem") in tracemalloc.
+Both print the hottest entries when the run ends. Under tracemalloc every
+event also gets "peak_kib", and the report lists the stages that peaked
+highest, then the allocation sites still live at the end. tracemalloc sees
+Python and numpy allocations, but not Pillow's image buffers.
+"""
+import cProfile
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+APP_ROOT = Path(__file__).resolve().parents[2]
+RUN_LOG = APP_ROOT / ".cache" / "runs.jsonl"
+PROFILE_MODES = ("cpu", "mem")
+PROFILE_TOP = 25  # entries printed by profiled()
+
+# (peak bytes, stage, item) of every stage traced in this process under profiled("mem")
+_stage_peaks: list[tuple[int, str, str | None]] = []
+
+
+def _size(img) -> list[int] | None:
+    return list(img.size) if img is not None else None
+
+
+class Event:
+    """One stage of one item, filled in while the stage runs."""
+
+    def __init__(self, stage: str, item: str | None, src=None):
+        self.data = {"ts": round(time.time(), 3), "item": item, "stage": stage,
+                     "seconds": None, "in": _size(src), "out": None, "bytes": None}
+
+    def output(self, img) -> None:
+        """Record the pixel size of the stage's result."""
+        self.data["out"] = _size(img)
+
+    def wrote(self, *sizes: int | Path) -> None:
+        """Add written bytes, given as counts or as paths of files just written."""
+        total = sum(s if isinstance(s, int) else Path(s).stat().st_size for s in sizes)
+        self.data["bytes"] = (self.data["bytes"] or 0) + total
+
+
+class Tracer:
+    """Collects the events of one run and appends them to the run report."""
+
+    def __init__(self, script: str):
+        self.script = script
+        self.run = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.events: list[dict] = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, item: str | None = None, src=None) -> Iterator[Event]:
+        """Time the enclosed block as stage name of item; src is the input image."""
+        event = Event(name, item, src)
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield event
+        except BaseException as e:
+            event.data["error"] = type(e).__name__
+            raise
+        finally:
+            event.data["seconds"] = round(time.perf_counter() - start, 4)
+            if tracemalloc.is_tracing():
+                peak = tracemalloc.get_traced_memory()[1]
+                event.data["peak_kib"] = peak // 1024
+                _stage_peaks.append((peak, name, item))
+            self.events.append(event.data)
+
+    def extend(self, events: list[dict]) -> None:
+        """Adopt events recorded elsewhere, e.g. by a Tracer in a pool worker."""
+        self.events.extend(events)
+
+    def completed(self, stage: str) -> list[str]:
+        """Items whose stage finished without an error, in the order they ran."""
+        return [e["item"] for e in self.events if e["stage"] == stage and "error" not in e]
+
+    def summary(self) -> str:
+        """Total time, calls and bytes written per stage."""
+        stages: dict[str, list] = {}
+        for event in self.events:
+            row = stages.setdefault(event["stage"], [0.0, 0, 0])
+            row[0] += event["seconds"]
+            row[1] += 1
+            row[2] += event["bytes"] or 0
+        lines = [f"  {'stage':18s} {'total':>9s} {'calls':>6s} {'written':>10s}"]
+        for name, (seconds, calls, written) in stages.items():
+            lines.append(f"  {name:18s} {seconds:8.2f}s {calls:6d} {written / 1024:8.0f}KB")
+        return "\n".join(lines)
+
+    def write(self, path: Path = RUN_LOG) -> None:
+        """Append this run's events, then a closing "run" event, as JSON lines."""
+        items = {e["item"] for e in self.events if e["item"] is not None}
+        closing = {"ts": round(time.time(), 3), "item": None, "stage": "run",
+                   "seconds": round(time.perf_counter() - self._start, 4), "items": len(items)}
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines = [json.dumps({"run": self.run, "script": self.script, **e}) + "\n" for e in [*self.events, closing]]
+        # One write per run, so concurrent runs (pool threads, parallel scripts) don't interleave lines
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+
+
+@contextmanager
+def profiled(mode: str | None, dump: Path | None = None, top: int = PROFILE_TOP) -> Iterator[None]:
+    """Run the enclosed block under cProfile ("cpu") or tracemalloc ("mem"), or plainly (None).
+
+    With dump set, cProfile stats are also saved there for snakeviz/pstats.
+    """
+    if mode is None:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode {mode!r} (choose from {', '.join(PROFILE_MODES)})")
+
+    if mode == "cpu":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            print(f"\n=== Hottest functions (cProfile, by own time, top {top}) ===")
+            pstats.Stats(profiler).sort_stats("tottime").print_stats(top)
+            if dump is not None:
+                dump.parent.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(dump)
+                print(f"  Profile saved to {dump}")
+        return
+
+    _stage_peaks.clear()
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ])
+        # Stages reset the peak, so the run's is the highest of theirs and what followed
+        peak = max([tracemalloc.get_traced_memory()[1], *(p for p, _, _ in _stage_peaks)])
+        tracemalloc.stop()
+        _print_allocations(snapshot, peak, top)
+
+
+def _print_allocations(snapshot: tracemalloc.Snapshot, peak: int, top: int) -> None:
+    print(f"\n=== Highest stage peaks (tracemalloc, top {top}; run peak {peak / 2**20:.1f} MiB) ===")
+    for stage_peak, name, item in sorted(_stage_peaks, key=lambda p: p[0], reverse=True)[:top]:
+        print(f"  {stage_peak / 2**20:10.1f} MiB  {name:14s} {item or ''}")
+    print(f"\n=== Largest allocations still live at the end (top {top}) ===")
+    for stat in snapshot.statistics("lineno")[:top]:
+        frame = stat.traceback[0]
+        print(f"  {stat.size / 1024:10.0f} KB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}")
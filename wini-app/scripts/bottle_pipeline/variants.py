@@ -0,0 +1,109 @@
+"""WebP/AVIF copies of a normalized bottle at several sizes.
+
+All sizes come from one in-memory resize pyramid built from the normalized
+400x800 canvas (each level is resampled from the previous one), so the
+source is never re-decoded. Files are named <stem>-<width>w.<ext> next to the
+PNG, e.g. chardonnay-full-200w.webp.
+
+Run `python -m bottle_pipeline.variants [DIR] [--write]` from
+wini-app/scripts for a byte-size comparison per format over a directory of
+*-full.png files (default public/bottles/normalized/).
+"""
+import argparse
+import io
+from pathlib import Path
+
+from PIL import Image, features
+
+try:  # Pillow < 11.2 needs the plugin for AVIF
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+VARIANT_SIZES = [(400, 800), (200, 400), (100, 200)]
+
+# WebP is lossless (quality is compression effort there). AVIF at quality 100
+# without chroma subsampling is near-lossless: colour is off by at most 1 level
+# from the RGB->YUV round trip and alpha is exact. At 400w both come to ~60% of
+# the committed PNGs. Lossy quality 90 would halve that again, but moves edge
+# pixels by up to ~50 levels and blurs the alpha edge.
+# WebP method 6 saves ~3% more bytes at ~30x the time.
+FORMAT_OPTIONS = {
+    "webp": {"format": "WEBP", "lossless": True, "quality": 80, "method": 4},
+    "avif": {"format": "AVIF", "quality": 100, "subsampling": "4:4:4", "speed": 8},
+}
+
+
+def available_formats() -> list[str]:
+    """Variant formats the installed Pillow can encode."""
+    return [fmt for fmt in FORMAT_OPTIONS if features.check(fmt)]
+
+
+def pyramid(canvas: Image.Image, sizes: list[tuple[int, int]] = VARIANT_SIZES) -> list[Image.Image]:
+    """Resize levels from largest to smallest, each derived from the previous level."""
+    levels = []
+    current = canvas
+    for size in sorted(sizes, reverse=True):
+        if current.size != size:
+            current = current.resize(size, Image.LANCZOS)
+        levels.append(current)
+    return levels
+
+
+def encode_variants(canvas: Image.Image, formats: list[str] | None = None) -> dict[tuple[str, int], bytes]:
+    """Encode every size x format in memory, keyed by (format, width)."""
+    formats = available_formats() if formats is None else formats
+    encoded = {}
+    for level in pyramid(canvas):
+        for fmt in formats:
+            buf = io.BytesIO()
+            level.save(buf, **FORMAT_OPTIONS[fmt])
+            encoded[(fmt, level.width)] = buf.getvalue()
+    return encoded
+
+
+def variant_path(out_png: Path, fmt: str, width: int) -> Path:
+    return out_png.with_name(f"{out_png.stem}-{width}w.{fmt}")
+
+
+def write_variants(canvas: Image.Image, out_png: Path, formats: list[str] | None = None) -> dict[str, int]:
+    """Write all variants next to out_png; returns {filename: bytes}."""
+    written = {}
+    for (fmt, width), data in encode_variants(canvas, formats).items():
+        path = variant_path(out_png, fmt, width)
+        path.write_bytes(data)
+        written[path.name] = len(data)
+    return written
+
+
+def _report(folder: Path, write: bool) -> None:
+    formats = available_formats()
+    totals: dict[tuple[str, int], int] = {}
+    png_total = 0
+    files = sorted(folder.glob("*-full.png"))
+    for png in files:
+        png_total += png.stat().st_size
+        canvas = Image.open(png).convert("RGBA")
+        encoded = encode_variants(canvas, formats)
+        for key, data in encoded.items():
+            totals[key] = totals.get(key, 0) + len(data)
+            if write:
+                variant_path(png, *key).write_bytes(data)
+
+    print(f"{len(files)} bottles in {folder}")
+    print(f"  {'png':5s} {VARIANT_SIZES[0][0]:4d}w  {png_total / 1024:9.1f} KiB  (baseline)")
+    for (fmt, width), size in sorted(totals.items(), key=lambda kv: (kv[0][0], -kv[0][1])):
+        pct = 100 * size / png_total if png_total else 0
+        print(f"  {fmt:5s} {width:4d}w  {size / 1024:9.1f} KiB  ({pct:.0f}% of PNG)")
+    missing = set(FORMAT_OPTIONS) - set(formats)
+    if missing:
+        print(f"  (not available in this Pillow build: {', '.join(sorted(missing))})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare variant sizes against the normalized PNGs.")
+    parser.add_argument("folder", nargs="?", type=Path,
+                        default=Path(__file__).resolve().parents[2] / "public" / "bottles" / "normalized")
+    parser.add_argument("--write", action="store_true", help="also write the variant files")
+    args = parser.parse_args()
+    _report(args.folder, args.write)
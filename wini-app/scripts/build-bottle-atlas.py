@@ -0,0 +1,133 @@
+"""Pack the carousel bottles into sprite atlases.
+
+Run after normalization. Reads the bottles listed in src/lib/bottles.ts
+(its own entries plus the pipeline-added ones in src/lib/bottle-index.json)
+from public/bottles/normalized/, trims each to its alpha bbox, packs them
+into public/bottles/atlas/bottles-<n>.webp and writes the coordinate map to
+src/lib/bottle-atlas.ts, keyed by each bottle's existing src. The first
+LEAD_BOTTLES bottles (the ones useBottlePreload fetches straight away) get
+the first sheet to themselves, so the carousel needs 2 requests instead of
+one per bottle and the above-the-fold ones do not wait for the rest.
+
+The sheets and bottle-atlas.ts are generated but committed, like the
+normalized PNGs they are built from: the app imports the map and serves the
+sheets as static files, and `next build` runs no Python. Rerun this and
+commit both whenever the normalized bottles or the encoder settings change;
+the ?v= hash in each sheet's src changes with its bytes, so caches are
+busted.
+
+Dependencies: pip install Pillow
+
+Usage: python build-bottle-atlas.py
+"""
+import hashlib
+import io
+import json
+import re
+import sys
+from pathlib import Path
+
+try:
+    from bottle_pipeline.atlas import SHEET_OPTIONS, build_atlas
+    from bottle_pipeline.metadata import BottleIndex
+except ImportError:
+    print("ERROR: Pillow not installed. Run: pip install Pillow")
+    sys.exit(1)
+
+ROOT = Path(__file__).resolve().parent.parent
+NORM_DIR = ROOT / "public" / "bottles" / "normalized"
+ATLAS_DIR = ROOT / "public" / "bottles" / "atlas"
+BOTTLES_TS = ROOT / "src" / "lib" / "bottles.ts"
+BOTTLE_INDEX = ROOT / "src" / "lib" / "bottle-index.json"
+ATLAS_TS = ROOT / "src" / "lib" / "bottle-atlas.ts"
+
+SRC_BASE = "/bottles/normalized"
+ATLAS_BASE = "/bottles/atlas"
+LEAD_BOTTLES = 4  # preloaded immediately by src/hooks/useBottlePreload.ts
+
+
+def listed_bottles() -> list[str]:
+    """Filenames in the BOTTLES array, in order: bottles.ts entries, then the index's."""
+    content = BOTTLES_TS.read_text(encoding="utf-8")
+    names = re.findall(r"\$\{BASE\}/([\w-]+-full\.png)", content)
+    generated = [(entry.get("order", sys.maxsize), src) for src, entry in BottleIndex(BOTTLE_INDEX).bottles.items()
+                 if "name" in entry and "type" in entry]
+    names += [src.rsplit("/", 1)[1] for _, src in sorted(generated)]
+    return list(dict.fromkeys(names))
+
+
+def render_ts(sheets: list[dict], sprites: dict[str, dict], canvas: tuple[int, int]) -> str:
+    lines = [
+        "// Generated by scripts/build-bottle-atlas.py — do not edit by hand.",
+        "",
+        "export type BottleSprite = {",
+        "  sheet: number;",
+        "  x: number;",
+        "  y: number;",
+        "  w: number;",
+        "  h: number;",
+        "  offsetX: number;",
+        "  offsetY: number;",
+        "};",
+        "",
+        "export type AtlasSheet = { src: string; w: number; h: number };",
+        "",
+        f"export const ATLAS_CANVAS = {{ w: {canvas[0]}, h: {canvas[1]} }};",
+        "",
+        "export const ATLAS_SHEETS: AtlasSheet[] = [",
+    ]
+    for sheet in sheets:
+        lines.append(f'  {{ src: {json.dumps(sheet["src"])}, w: {sheet["w"]}, h: {sheet["h"]} }},')
+    lines += ["];", "", "export const BOTTLE_SPRITES: Record<string, BottleSprite> = {"]
+    for name, s in sprites.items():
+        lines.append(
+            f'  "{SRC_BASE}/{name}": {{ sheet: {s["sheet"]}, x: {s["x"]}, y: {s["y"]}, w: {s["w"]}, h: {s["h"]}, '
+            f'offsetX: {s["offsetX"]}, offsetY: {s["offsetY"]} }},'
+        )
+    lines += ["};", ""]
+    return "\n".join(lines)
+
+
+def main() -> None:
+    names = [n for n in listed_bottles() if (NORM_DIR / n).exists()]
+    if not names:
+        print(f"No listed bottles found in {NORM_DIR}")
+        return
+
+    print(f"=== Packing {len(names)} bottles ===")
+    sheets, sprites = build_atlas([NORM_DIR / n for n in names], lead=LEAD_BOTTLES)
+    canvases = {(s["canvasW"], s["canvasH"]) for s in sprites.values()}
+    if len(canvases) != 1:
+        print(f"ERROR: bottles have mixed canvas sizes {sorted(canvases)} — normalize first")
+        sys.exit(1)
+
+    ATLAS_DIR.mkdir(parents=True, exist_ok=True)
+    for old in ATLAS_DIR.glob("bottles-*.webp"):
+        old.unlink()
+
+    sheet_meta = []
+    atlas_bytes = 0
+    for i, sheet in enumerate(sheets):
+        buf = io.BytesIO()
+        sheet.save(buf, **SHEET_OPTIONS)
+        data = buf.getvalue()
+        (ATLAS_DIR / f"bottles-{i}.webp").write_bytes(data)
+        atlas_bytes += len(data)
+        version = hashlib.sha256(data).hexdigest()[:8]
+        sheet_meta.append({"src": f"{ATLAS_BASE}/bottles-{i}.webp?v={version}", "w": sheet.width, "h": sheet.height})
+        print(f"  bottles-{i}.webp  {sheet.width}x{sheet.height}  {len(data) / 1024:.0f} KiB")
+
+    ATLAS_TS.write_text(render_ts(sheet_meta, sprites, canvases.pop()), encoding="utf-8")
+    print(f"  Wrote {ATLAS_TS.relative_to(ROOT)}")
+
+    png_bytes = sum((NORM_DIR / n).stat().st_size for n in names)
+    canvas_px = sum(s["canvasW"] * s["canvasH"] for s in sprites.values())
+    sprite_px = sum(s["w"] * s["h"] for s in sprites.values())
+    print("\n=== Summary ===")
+    print(f"  Requests: {len(names)} -> {len(sheets)}")
+    print(f"  Bytes: {png_bytes / 1024:.0f} KiB PNG -> {atlas_bytes / 1024:.0f} KiB atlas")
+    print(f"  Pixels: {canvas_px:,} canvas -> {sprite_px:,} trimmed ({100 * sprite_px / canvas_px:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
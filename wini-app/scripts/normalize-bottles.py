@@ -1,50 +1,68 @@
-"""Analyze and normalize bottle images to consistent visual sizes."""
-from PIL import Image
-import os
+"""Analyze and normalize bottle images to consistent visual sizes.
+
+Each file is decoded once: the bbox comes from its alpha channel and the
+normalized canvas is written straight away, so memory stays flat however
+many bottles there are.
+
+Usage: python normalize-bottles.py [INPUT ...] [--out DIR] [--report analysis.json]
+                                   [--trace PATH] [--profile cpu|mem]
+
+INPUT is a directory (its *-left/-right/-full.png files are used) or a glob;
+it defaults to public/bottles/processed/. Stage timings go to
+.cache/runs.jsonl (--trace); see bottle_pipeline/trace.py.
+"""
+import argparse
 import glob
+import json
+import os
+from pathlib import Path
+from typing import Iterator
+
+from PIL import Image
 
-BASE = "C:/Dev/Wini/wini-app/public/bottles/processed"
-OUT = "C:/Dev/Wini/wini-app/public/bottles/normalized"
+from bottle_pipeline.encode import save_png
+from bottle_pipeline.metadata import BottleIndex, describe
+from bottle_pipeline.trace import PROFILE_MODES, RUN_LOG, Tracer, profiled
+
+ROOT = Path(__file__).resolve().parent.parent
+BASE = ROOT / "public" / "bottles" / "processed"
+OUT = ROOT / "public" / "bottles" / "normalized"
 HALF_CANVAS_W, CANVAS_H = 200, 800
 FULL_CANVAS_W = 400
 TARGET_FILL = 0.72  # bottles should fill 72% of canvas height
 
-os.makedirs(OUT, exist_ok=True)
-
-half_files = sorted(
-    glob.glob(os.path.join(BASE, "*-left.png"))
-    + glob.glob(os.path.join(BASE, "*-right.png"))
-)
 
-full_files = sorted(glob.glob(os.path.join(BASE, "*-full.png")))
-
-# Phase 1: Analyze all bounding boxes
-print("=== ANALYSIS ===")
-infos = []
-for f in half_files + full_files:
-    img = Image.open(f).convert("RGBA")
-    bbox = img.getbbox()
-    name = os.path.basename(f)
+def expand_inputs(inputs: list[str]) -> list[str]:
+    """Resolve directories and globs to a sorted file list: halves first, then fulls."""
+    halves, fulls = set(), set()
+    for spec in inputs:
+        if os.path.isdir(spec):
+            patterns = [os.path.join(spec, p) for p in ("*-left.png", "*-right.png", "*-full.png")]
+        else:
+            patterns = [spec]
+        for pattern in patterns:
+            for f in glob.iglob(pattern):
+                (fulls if "-full" in os.path.basename(f) else halves).add(f)
+    return sorted(halves) + sorted(fulls)
+
+
+def analyze(paths: list[str], tracer: Tracer) -> Iterator[tuple[str, Image.Image, tuple[int, int, int, int] | None]]:
+    """Decode each file once and yield (path, RGBA image, alpha bbox)."""
+    for f in paths:
+        with tracer.stage("decode", os.path.basename(f)) as event:
+            img = Image.open(f).convert("RGBA")
+            bbox = img.getchannel("A").getbbox()
+            event.output(img)
+        yield f, img, bbox
+
+
+def normalize(img: Image.Image, bbox: tuple[int, int, int, int], name: str) -> Image.Image:
+    """Crop to bbox, scale to TARGET_FILL of canvas height and align on a new canvas."""
     is_full = "-full" in name
     canvas_w = FULL_CANVAS_W if is_full else HALF_CANVAS_W
-    if bbox:
-        x1, y1, x2, y2 = bbox
-        w, h = x2 - x1, y2 - y1
-        fill = h / CANVAS_H
-        infos.append({"name": name, "path": f, "bbox": bbox, "fill": fill, "is_full": is_full, "canvas_w": canvas_w})
-        print(f"  {name:35s} fill={fill*100:.0f}%  bbox=({x1},{y1},{x2},{y2})  {'full' if is_full else 'half'}")
-    else:
-        print(f"  {name:35s} EMPTY")
-
-# Phase 2: Normalize each bottle
-print(f"\n=== NORMALIZING to {TARGET_FILL*100:.0f}% fill ===")
-for info in infos:
-    img = Image.open(info["path"]).convert("RGBA")
-    x1, y1, x2, y2 = info["bbox"]
-    canvas_w = info["canvas_w"]
 
     # Crop to bounding box
-    cropped = img.crop((x1, y1, x2, y2))
+    cropped = img.crop(bbox)
     cw, ch = cropped.size
 
     # Scale so bottle height = TARGET_FILL * CANVAS_H
@@ -67,8 +85,7 @@ for info in infos:
     paste_y = (CANVAS_H - new_h) // 2
 
     # Horizontal alignment
-    name = info["name"]
-    if info["is_full"]:
+    if is_full:
         paste_x = (canvas_w - new_w) // 2  # center-aligned
     elif "-left" in name:
         paste_x = canvas_w - new_w  # right-aligned
@@ -76,10 +93,66 @@ for info in infos:
         paste_x = 0  # left-aligned
 
     canvas.paste(resized, (paste_x, paste_y), resized)
-
-    out_path = os.path.join(OUT, name)
-    canvas.save(out_path, "PNG")
-    old_fill = info["fill"] * 100
-    print(f"  {name:35s} {old_fill:.0f}% -> {TARGET_FILL*100:.0f}%  saved")
-
-print(f"\nDone! Normalized images saved to: {OUT}")
+    return canvas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Normalize bottle images to a consistent fill.")
+    parser.add_argument("inputs", nargs="*", default=[str(BASE)], help="directories or globs")
+    parser.add_argument("--out", type=Path, default=OUT, help="output directory")
+    parser.add_argument("--report", type=Path, help="write the fill analysis as JSON")
+    parser.add_argument("--trace", type=Path, default=RUN_LOG, help=f"run report to append to (default: {RUN_LOG})")
+    parser.add_argument("--profile", choices=PROFILE_MODES,
+                        help="profile the run with cProfile (cpu) or tracemalloc (mem)")
+    args = parser.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    paths = expand_inputs(args.inputs)
+    tracer = Tracer("normalize-bottles")
+
+    print(f"=== NORMALIZING {len(paths)} files to {TARGET_FILL*100:.0f}% fill ===")
+    indexed = args.out.resolve() == OUT.resolve()
+    analysis = []
+    described = {}  # describe() of each full canvas written, by file name, for the bottle index
+    with profiled(args.profile, args.trace.with_name(f"profile-{tracer.run}.prof")):
+        for path, img, bbox in analyze(paths, tracer):
+            name = os.path.basename(path)
+            if not bbox:
+                print(f"  {name:35s} EMPTY")
+                analysis.append({"name": name, "bbox": None, "fill": None})
+                continue
+
+            x1, y1, x2, y2 = bbox
+            fill = (y2 - y1) / CANVAS_H
+            analysis.append({"name": name, "bbox": list(bbox), "fill": round(fill, 4), "is_full": "-full" in name})
+
+            with tracer.stage("normalize", name, img) as event:
+                result = normalize(img, bbox, name)
+                event.output(result)
+            with tracer.stage("save_png", name, result) as event:
+                event.wrote(save_png(result, args.out / name))
+            if indexed and name.endswith("-full.png"):
+                with tracer.stage("describe", name, result):
+                    described[name] = describe(result)
+            print(f"  {name:35s} {fill*100:.0f}% -> {TARGET_FILL*100:.0f}%  bbox=({x1},{y1},{x2},{y2})  saved")
+    tracer.write(args.trace)
+
+    if indexed:
+        bottle_index = BottleIndex()
+        for name, metadata in described.items():
+            bottle_index.update(args.out / name, described=metadata)
+        bottle_index.save()
+        print(f"Bottle index updated: {bottle_index.path}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"target_fill": TARGET_FILL, "canvas_h": CANVAS_H, "files": analysis}, f, indent=2)
+        print(f"\nAnalysis written to: {args.report}")
+
+    print(f"\n{tracer.summary()}")
+    print(f"  Run report appended to {args.trace}")
+    print(f"\nDone! Normalized images saved to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
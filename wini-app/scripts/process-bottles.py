@@ -4,15 +4,46 @@ Pipeline: assets/stock-photos/ + assets/manifest.json
        -> remove background (rembg)
        -> clean alpha edges
        -> normalize to 400x800 at 72% fill, centered
-       -> save to public/bottles/normalized/
-       -> auto-append to src/lib/bottles.ts
+       -> save to public/bottles/normalized/ (PNG + WebP/AVIF size variants)
+       -> record size, alpha bbox, colour, a blurred placeholder and bytes in
+          src/lib/bottle-index.json, which bottles.ts imports (see bottle_pipeline/metadata.py)
 
 Dependencies: pip install rembg[cpu] Pillow
+
+Usage: python process-bottles.py [--model u2net|u2netp|isnet|silueta] [--jobs N] [--no-pipeline]
+                                 [--work-size PX] [--batch N] [--threads N] [--force] [--no-cache] [--dry-run] [--allow-duplicates]
+                                 [--trace PATH] [--profile cpu|mem]
+
+Only stale outputs are rebuilt: assets/build-state.json records the source
+hash, parameters and PIPELINE_VERSION behind every output, so a new source
+photo or a changed constant rebuilds just the affected bottles. --dry-run
+lists them without processing. rembg output is cached in .cache/rembg/, so
+re-normalizing never re-runs inference for an unchanged source, and each
+alpha-cleaned cutout is kept uncompressed in .cache/frames/process-bottles/,
+so it does not decode or clean one either (see bottle_pipeline/frames.py).
+--work-size runs rembg on a copy at most PX on its long side and upsamples
+only the mask (see bottle_pipeline/mask.py).
+With --jobs 1, decoding and PNG/variant encoding run on I/O threads while
+inference runs in a lane of its own, so they overlap instead of queueing
+behind each other; --no-pipeline restores the one-image-at-a-time loop.
+--batch N runs background removal on up to N decoded sources per
+onnxruntime run, with --threads intra-op threads (see
+bottle_pipeline/batch.py); with --jobs above 1 it only sets the session
+each worker uses.
+New bottles whose photo near-duplicates another source (by perceptual
+hash, see bottle_pipeline/dedupe.py) are skipped before inference.
+Every stage of every bottle is logged as a JSON line to .cache/runs.jsonl
+(--trace); --profile runs under cProfile or tracemalloc and prints the
+hottest entries (see bottle_pipeline/trace.py).
 """
+import argparse
+import asyncio
 import json
 import os
 import shutil
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 try:
@@ -22,33 +53,38 @@ except ImportError:
     sys.exit(1)
 
 try:
-    from rembg import remove
-except ImportError:
-    print("ERROR: rembg not installed. Run: pip install rembg[cpu]")
+    from bottle_pipeline.alpha import ALPHA_THRESHOLD, clean_alpha
+    from bottle_pipeline.buildstate import BuildState, make_record
+    from bottle_pipeline.cache import file_digest
+    from bottle_pipeline.dedupe import HashIndex
+    from bottle_pipeline.encode import PNG_OPTIONS, save_png
+    from bottle_pipeline.engine import DEFAULT_MODEL, MODELS, BackgroundRemover, get_remover
+    from bottle_pipeline.frames import Frame, FrameStore
+    from bottle_pipeline.metadata import BottleIndex, describe
+    from bottle_pipeline.trace import PROFILE_MODES, RUN_LOG, Tracer, profiled
+    from bottle_pipeline.variants import FORMAT_OPTIONS, VARIANT_SIZES, available_formats, write_variants
+except ImportError as e:
+    print(f"Missing dependency: {e}")
+    print("Run: pip install rembg[cpu] Pillow numpy")
     sys.exit(1)
 
-ROOT = Path("C:/Dev/Wini/wini-app")
+ROOT = Path(__file__).resolve().parent.parent
 STOCK_DIR = ROOT / "assets" / "stock-photos"
 ARCHIVE_DIR = ROOT / "assets" / "archive"
 MANIFEST = ROOT / "assets" / "manifest.json"
 OUT_DIR = ROOT / "public" / "bottles" / "normalized"
-BOTTLES_TS = ROOT / "src" / "lib" / "bottles.ts"
+BOTTLE_INDEX = ROOT / "src" / "lib" / "bottle-index.json"
+BUILD_STATE = ROOT / "assets" / "build-state.json"
+FRAMES = FrameStore("process-bottles")
 
 CANVAS_W, CANVAS_H = 400, 800
 TARGET_FILL = 0.72
-ALPHA_THRESHOLD = 10
-
-
-def clean_alpha(img: Image.Image, threshold: int = ALPHA_THRESHOLD) -> Image.Image:
-    """Remove near-transparent edge pixels."""
-    data = img.load()
-    w, h = img.size
-    for y in range(h):
-        for x in range(w):
-            r, g, b, a = data[x, y]
-            if a < threshold:
-                data[x, y] = (0, 0, 0, 0)
-    return img
+FEATHER_RADIUS = 0.0  # px of Gaussian edge feathering after alpha cleanup (0 = off)
+WRITE_VARIANTS = True  # also emit WebP/AVIF copies at VARIANT_SIZES next to each PNG
+PIPELINE_VERSION = 1  # bump when a code change alters output pixels
+PIPELINE_THREADS = 2  # decode/encode threads beside the inference lane (--jobs 1)
+PIPELINE_DEPTH = 2  # images allowed to wait between stages; each may be a full-size frame
+                    # (with --batch N, up to N wait to be inferred together)
 
 
 def normalize_bottle(img: Image.Image) -> Image.Image:
@@ -79,47 +115,345 @@ def normalize_bottle(img: Image.Image) -> Image.Image:
     return canvas
 
 
-def append_to_bottles_ts(entries: list[dict]) -> None:
-    """Append new bottle entries to the BOTTLES array in bottles.ts."""
-    if not entries:
-        return
-
-    content = BOTTLES_TS.read_text(encoding="utf-8")
+def update_bottle_index(entries: list[dict], described: dict[str, dict], manifest: list[dict]) -> None:
+    """List manifest bottles in the metadata index that bottles.ts imports, in manifest order.
 
-    # Find the closing ]; of the BOTTLES array
-    marker = "export const BOTTLES: Bottle[] = ["
-    if marker not in content:
-        print("  WARNING: Could not find BOTTLES array in bottles.ts — manual update needed")
-        return
-
-    # Build new entries
-    new_lines = []
+    described holds describe() of every output written this run, by slug;
+    the others keep the metadata they have.
+    """
+    bottle_index = BottleIndex(BOTTLE_INDEX)
+    order = {entry["slug"]: i for i, entry in enumerate(manifest)}
+    count = 0
     for entry in entries:
-        existing_check = f'"{entry["slug"]}-full.png"'
-        if existing_check in content:
-            print(f"  SKIP {entry['slug']} — already in bottles.ts")
+        out_path = OUT_DIR / f"{entry['slug']}-full.png"
+        if not out_path.exists():
+            print(f"  WARNING: {out_path.name} missing — not indexed")
             continue
-        new_lines.append(
-            f'  {{ name: "{entry["name"]}", src: `${{BASE}}/{entry["slug"]}-full.png`, type: "{entry["type"]}" }},'
-        )
-
-    if not new_lines:
-        return
-
-    # Insert before the closing ];
-    # Find the last ]; that ends the BOTTLES array
-    idx = content.rfind("];")
-    if idx == -1:
-        print("  WARNING: Could not find end of BOTTLES array")
-        return
-
-    insert = "\n".join(new_lines) + "\n"
-    content = content[:idx] + insert + content[idx:]
-    BOTTLES_TS.write_text(content, encoding="utf-8")
-    print(f"  Added {len(new_lines)} entries to bottles.ts")
+        bottle_index.update(out_path, entry["name"], entry["type"], measure=False,
+                            described=described.get(entry["slug"]), order=order[entry["slug"]])
+        count += 1
+    bottle_index.save()
+    print(f"  Indexed {count} bottles in {BOTTLE_INDEX.name}")
+
+
+def find_source(filename: str) -> Path | None:
+    """Locate a manifest source in the intake folder or, once processed, the archive."""
+    for folder in (STOCK_DIR, ARCHIVE_DIR):
+        if (folder / filename).exists():
+            return folder / filename
+    return None
+
+
+def build_params(model: str, work_size: int | None = None) -> dict:
+    """Every setting that affects output pixels, for the build state."""
+    variants = [{fmt: FORMAT_OPTIONS[fmt] for fmt in available_formats()}, [list(size) for size in VARIANT_SIZES]]
+    return {
+        "canvas": [CANVAS_W, CANVAS_H],
+        "target_fill": TARGET_FILL,
+        "alpha_threshold": ALPHA_THRESHOLD,
+        "feather": FEATHER_RADIUS,
+        "png": PNG_OPTIONS,
+        "variants": variants if WRITE_VARIANTS else None,
+        "model": model,
+        "work_size": work_size,
+    }
+
+
+def frame_key(source_key: str) -> str:
+    """Frame store key of a cleaned cutout, from its source's rembg cache key."""
+    return FrameStore.key(source_key, threshold=ALPHA_THRESHOLD, feather=FEATHER_RADIUS, version=PIPELINE_VERSION)
+
+
+def stored_frame(slug: str, key: str | None) -> Frame | None:
+    """The stored cleaned cutout of slug, if it was made from the source and model behind key."""
+    return FRAMES.get(slug, frame_key(key)) if key is not None else None
+
+
+def has_frame(slug: str, key: str | None) -> bool:
+    """Whether stored_frame() would find slug's cutout; reads the header only, so nothing stays mapped."""
+    return key is not None and FRAMES.has(slug, frame_key(key))
+
+
+def load_frame(frame: Frame, tracer: Tracer) -> Image.Image:
+    """A stored cutout's bbox region, read from the frame store without decoding; the frame is closed after."""
+    with frame, tracer.stage("load_frame", frame.name) as event:
+        bottle = frame.bottle()
+        event.output(bottle)
+    return bottle
+
+
+def clean_entry(slug: str, img_nobg: Image.Image, tracer: Tracer, key: str | None) -> Image.Image:
+    """Clean the alpha edges of a background-removed bottle and, given its cache key, store the frame."""
+    with tracer.stage("clean_alpha", slug, img_nobg) as event:
+        img_clean = clean_alpha(img_nobg, ALPHA_THRESHOLD, FEATHER_RADIUS)
+        event.output(img_clean)
+    if key is not None:
+        with tracer.stage("frame_put", slug, img_clean) as event:
+            event.wrote(FRAMES.put(slug, img_clean, frame_key(key), ALPHA_THRESHOLD, FEATHER_RADIUS))
+    return img_clean
+
+
+def finish_entry(slug: str, bottle: Image.Image, tracer: Tracer) -> tuple[Path, dict]:
+    """Normalize and write one cleaned bottle.
+
+    Returns the PNG path and describe() of the canvas for the bottle index.
+    """
+    out_path = OUT_DIR / f"{slug}-full.png"
+
+    # Normalize to canvas
+    with tracer.stage("normalize", slug, bottle) as event:
+        result = normalize_bottle(bottle)
+        event.output(result)
+    # bbox, dominant colour and LQIP placeholder, from the canvas while it is in memory
+    with tracer.stage("describe", slug, result):
+        described = describe(result)
+    with tracer.stage("save_png", slug, result) as event:
+        event.wrote(save_png(result, out_path))
+    if WRITE_VARIANTS:
+        with tracer.stage("variants", slug, result) as event:
+            event.wrote(*write_variants(result, out_path).values())
+    return out_path, described
+
+
+def archive_source(entry: dict) -> Path | None:
+    """Move a processed original from the intake folder to the archive; returns where to."""
+    src_path = STOCK_DIR / entry["file"]
+    archive_path = ARCHIVE_DIR / entry["file"]
+    if src_path.exists() and not archive_path.exists():
+        shutil.move(str(src_path), str(archive_path))
+        return archive_path
+    return None
+
+
+def process_entry(entry: dict, model: str, use_cache: bool = True, work_size: int | None = None,
+                  batch_size: int = 1, threads: int | None = None, digest: str | None = None) -> dict:
+    """Remove background, clean and normalize one manifest entry.
+
+    Runs in the main process or in a pool worker; archiving is left to the
+    caller so it happens in manifest order. digest is the source's sha256
+    when the caller has already hashed it.
+    """
+    slug = entry["slug"]
+    src_path = find_source(entry["file"])
+    remover = get_remover(model, use_cache, work_size, batch_size, threads)
+    tracer = Tracer("process-bottles")
+    start = time.perf_counter()
+
+    key = remover.key(src_path, digest)
+    frame = stored_frame(slug, key)
+    if frame is not None:
+        bottle = load_frame(frame, tracer)
+        original_size = frame.size
+    else:
+        # Remove background (cached by source content + model)
+        with tracer.stage("rembg", slug) as event:
+            img_nobg = remover.remove_file(src_path, key)
+            event.output(img_nobg)
+        bottle = clean_entry(slug, img_nobg, tracer, key)
+        original_size = img_nobg.size
+
+    out_path, described = finish_entry(slug, bottle, tracer)
+    return {
+        "slug": slug,
+        "original_size": original_size,
+        "out_path": out_path,
+        "described": described,
+        "seconds": time.perf_counter() - start,
+        "events": tracer.events,
+    }
+
+
+def _load(entry: dict, remover: BackgroundRemover, tracer: Tracer, digest: str | None = None) -> dict:
+    """Pipeline stage 1 (I/O thread): a stored frame, a cached cutout, or else the decoded source."""
+    start = time.perf_counter()
+    src_path = find_source(entry["file"])
+    key = remover.key(src_path, digest)
+    frame = stored_frame(entry["slug"], key)
+    if frame is not None:
+        return {"entry": entry, "key": key, "img": None, "nobg": None, "fresh": False, "start": start,
+                "bottle": load_frame(frame, tracer), "size": frame.size}
+    with tracer.stage("load", entry["slug"]) as event:
+        key, img_nobg = remover.lookup(src_path, key)
+        img = Image.open(src_path).convert("RGBA") if img_nobg is None else None
+        event.output(img or img_nobg)
+    return {"entry": entry, "key": key, "img": img, "nobg": img_nobg, "fresh": img_nobg is None, "start": start,
+            "bottle": None, "size": None}
+
+
+def _infer(items: list[dict], remover: BackgroundRemover, tracer: Tracer) -> None:
+    """Pipeline stage 2 (inference lane): background removal of decoded sources, as one batch."""
+    name = "+".join(item["entry"]["slug"] for item in items)
+    with tracer.stage("rembg", name, items[0]["img"] if len(items) == 1 else None) as event:
+        results = remover.remove_batch([item.pop("img") for item in items])
+        for item, nobg in zip(items, results):
+            item["nobg"] = nobg
+        event.output(results[0] if len(results) == 1 else None)
+
+
+def _finish(item: dict, remover: BackgroundRemover, tracer: Tracer) -> dict:
+    """Pipeline stage 3 (I/O thread): cache and clean the cutout, write every output."""
+    slug = item["entry"]["slug"]
+    if item["fresh"] and item["key"] is not None:
+        with tracer.stage("cache_put", slug, item["nobg"]):
+            remover.cache.put(item["key"], item["nobg"])
+    if item["bottle"] is None:
+        item["size"] = item["nobg"].size
+        item["bottle"] = clean_entry(slug, item.pop("nobg"), tracer, item["key"])
+    out_path, described = finish_entry(slug, item["bottle"], tracer)
+    return {
+        "slug": slug,
+        "original_size": item["size"],
+        "out_path": out_path,
+        "described": described,
+        "seconds": time.perf_counter() - item["start"],
+        "events": [],
+    }
+
+
+async def _run_pipeline(todo: list[dict], remover: BackgroundRemover, tracer: Tracer, report, threads: int,
+                        digests: dict[str, str]) -> None:
+    """Decode, infer and encode concurrently, with bounded queues between the stages.
+
+    Decoding and writing share `threads` I/O threads; inference has a lane of
+    its own, so disk I/O and compression overlap model time instead of
+    waiting for it. At most PIPELINE_DEPTH images wait in each queue, or
+    the batch size when that is larger: the inference lane takes whatever
+    has been decoded by the time it is free, up to one batch.
+    """
+    loop = asyncio.get_running_loop()
+    decoded: asyncio.Queue = asyncio.Queue(max(PIPELINE_DEPTH, remover.batch_size))
+    inferred: asyncio.Queue = asyncio.Queue(PIPELINE_DEPTH)
+    entries = iter(todo)
+
+    with ThreadPoolExecutor(threads, thread_name_prefix="io") as io_pool, \
+            ThreadPoolExecutor(1, thread_name_prefix="infer") as infer_lane:
+
+        async def load() -> None:
+            for entry in entries:  # shared iterator: each loader takes the next entry
+                await decoded.put(await loop.run_in_executor(io_pool, _load, entry, remover, tracer,
+                                                             digests.get(entry["slug"])))
+
+        async def feed() -> None:
+            await asyncio.gather(*(load() for _ in range(threads)))
+            await decoded.put(None)
+
+        async def infer() -> None:
+            ended = False
+            while not ended and (item := await decoded.get()) is not None:
+                batch = [item]
+                while len(batch) < remover.batch_size and not decoded.empty():
+                    if (item := decoded.get_nowait()) is None:
+                        ended = True
+                        break
+                    batch.append(item)
+                fresh = [item for item in batch if item["fresh"]]
+                if fresh:
+                    # Load rembg here, on the main thread, and only once a source needs it:
+                    # imported on a worker thread, it leaves the interpreter hanging at exit
+                    remover.warm_up()
+                    await loop.run_in_executor(infer_lane, _infer, fresh, remover, tracer)
+                for item in batch:
+                    await inferred.put(item)
+            for _ in range(threads):
+                await inferred.put(None)
+
+        async def finish() -> None:
+            while (item := await inferred.get()) is not None:
+                report(await loop.run_in_executor(io_pool, _finish, item, remover, tracer))
+
+        tasks = [asyncio.ensure_future(c) for c in (feed(), infer(), *(finish() for _ in range(threads)))]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+
+def run_entries(
+    todo: list[dict],
+    model: str,
+    jobs: int,
+    tracer: Tracer,
+    use_cache: bool = True,
+    work_size: int | None = None,
+    pipeline: bool = True,
+    batch_size: int = 1,
+    threads: int | None = None,
+    digests: dict[str, str] | None = None,
+) -> dict[str, dict]:
+    """Process entries pipelined, serially or across a process pool, printing as each finishes.
+
+    digests holds the sha256 of sources main() already hashed, by slug, so
+    they are not read again. Returns describe() of every written output, by slug.
+    """
+    digests = digests or {}
+    described = {}
+
+    def report(result: dict) -> None:
+        tracer.extend(result["events"])
+        described[result["slug"]] = result["described"]
+        print(f"  Done {result['slug']}: {result['original_size']} -> {result['out_path'].name} "
+              f"({result['seconds']:.1f}s)")
+
+    if jobs <= 1 and pipeline:
+        remover = get_remover(model, use_cache, work_size, batch_size, threads)
+        lane = "inference lane" if batch_size <= 1 else f"inference lane, batches of up to {batch_size}"
+        print(f"  Processing {len(todo)} bottles, pipelined ({PIPELINE_THREADS} I/O threads + {lane}) ...")
+        asyncio.run(_run_pipeline(todo, remover, tracer, report, PIPELINE_THREADS, digests))
+        return described
+
+    if jobs <= 1:
+        remover = get_remover(model, use_cache, work_size, batch_size, threads)
+        if batch_size > 1:
+            # Lets remove_file() infer each cache miss together with the next ones needing rembg
+            sources = [(find_source(e["file"]), e["slug"]) for e in todo]
+            keys = {slug: remover.key(src, digests.get(slug)) for src, slug in sources}
+            misses = [(src, keys[slug]) for src, slug in sources if not has_frame(slug, keys[slug])]
+            remover.expect([src for src, _ in misses], [key for _, key in misses])
+        for entry in todo:
+            print(f"  Processing {entry['file']} -> {entry['slug']}-full.png ...")
+            report(process_entry(entry, model, use_cache, work_size, batch_size, threads,
+                                 digests.get(entry["slug"])))
+        return described
+
+    print(f"  Processing {len(todo)} bottles on {jobs} workers ...")
+    # Each worker loads its session on its first cache miss (get_remover keeps it per process)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(process_entry, entry, model, use_cache, work_size, batch_size, threads,
+                               digests.get(entry["slug"]))
+                   for entry in todo]
+        for future in as_completed(futures):
+            report(future.result())
+    return described
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Process stock bottle photos into carousel images.")
+    parser.add_argument("--model", choices=MODELS, default=DEFAULT_MODEL, help="rembg model")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="worker processes (default: 1)")
+    parser.add_argument("--no-pipeline", action="store_true",
+                        help="with --jobs 1, process one image at a time instead of overlapping stages")
+    parser.add_argument("--work-size", type=int, metavar="PX",
+                        help="run rembg on a copy at most PX on its long side, upsampling only the mask")
+    parser.add_argument("--batch", type=int, default=1, metavar="N",
+                        help="sources per onnxruntime run (default: 1, rembg's own path)")
+    parser.add_argument("--threads", type=int, metavar="N",
+                        help="onnxruntime intra-op threads for --batch (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="rebuild every output, stale or not")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the rembg output cache and frame store")
+    parser.add_argument("--dry-run", action="store_true", help="list stale outputs and exit")
+    parser.add_argument("--allow-duplicates", action="store_true",
+                        help="process new bottles even if their photo near-duplicates another source")
+    parser.add_argument("--trace", type=Path, default=RUN_LOG, help=f"run report to append to (default: {RUN_LOG})")
+    parser.add_argument("--profile", choices=PROFILE_MODES,
+                        help="profile the run with cProfile (cpu) or tracemalloc (mem); implies --jobs 1")
+    args = parser.parse_args()
+    if args.profile and (args.jobs > 1 or not args.no_pipeline):
+        print("  --profile only sees the main thread; running with --jobs 1 --no-pipeline")
+        args.jobs = 1
+        args.no_pipeline = True
+
     if not MANIFEST.exists():
         print(f"ERROR: Manifest not found at {MANIFEST}")
         sys.exit(1)
@@ -132,53 +466,91 @@ def main() -> None:
         print("No bottles in manifest")
         return
 
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
-    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    state = BuildState(BUILD_STATE)
+    params = build_params(args.model, args.work_size)
+    index = HashIndex()
 
     processed = []
+    todo = []
+    records = {}
+    digests = {}  # sha256 of every source to process, hashed once here
     for entry in bottles:
         filename = entry["file"]
         slug = entry["slug"]
-        src_path = STOCK_DIR / filename
+        src_path = find_source(filename)
         out_path = OUT_DIR / f"{slug}-full.png"
 
-        if not src_path.exists():
+        if src_path is None:
             print(f"  SKIP {filename} — not found in {STOCK_DIR}")
             continue
 
-        if out_path.exists():
-            print(f"  SKIP {slug} — already processed")
-            processed.append(entry)
+        digest = file_digest(src_path)
+        # Only a bottle without an output yet can be turned away as a duplicate
+        is_new = not out_path.exists()
+        duplicate = index.admit_source(src_path, digest, slug, check=is_new and not args.allow_duplicates)
+        if duplicate is not None:
+            print(f"  SKIP {slug} — {filename} near-duplicates the source of {duplicate[0]} "
+                  f"({duplicate[1]} bits apart; --allow-duplicates to keep it)")
             continue
 
-        print(f"  Processing {filename} -> {slug}-full.png ...")
-
-        img = Image.open(src_path).convert("RGBA")
-        print(f"    Original: {img.size}")
-
-        # Remove background
-        img_nobg = remove(img)
-        print(f"    Background removed")
-
-        # Clean alpha edges
-        img_clean = clean_alpha(img_nobg)
-
-        # Normalize to canvas
-        result = normalize_bottle(img_clean)
-        result.save(out_path, "PNG")
-        print(f"    Saved: {out_path}")
+        record = make_record(digest, params, "process-bottles", PIPELINE_VERSION)
+        if args.force or state.is_stale(out_path, record):
+            todo.append(entry)
+            records[slug] = record
+            digests[slug] = digest
+        else:
+            print(f"  SKIP {slug} — up to date")
+        processed.append(entry)
 
-        # Archive original
-        archive_path = ARCHIVE_DIR / filename
-        if not archive_path.exists():
-            shutil.move(str(src_path), str(archive_path))
-            print(f"    Archived original to {archive_path}")
+    if args.dry_run:
+        print(f"\n{len(todo)} stale output(s):")
+        for entry in todo:
+            print(f"  {entry['slug']}-full.png  <- {entry['file']}")
+        return
 
-        processed.append(entry)
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
 
-    # Auto-append to bottles.ts
-    print("\n=== Updating bottles.ts ===")
-    append_to_bottles_ts(processed)
+    tracer = Tracer("process-bottles")
+    start = time.perf_counter()
+    described = {}
+    if todo:
+        with profiled(args.profile, args.trace.with_name(f"profile-{tracer.run}.prof")):
+            try:
+                described = run_entries(todo, args.model, max(1, args.jobs), tracer, not args.no_cache,
+                                        args.work_size, not args.no_pipeline, max(1, args.batch), args.threads,
+                                        digests)
+            except ImportError as e:  # rembg is imported only once a source needs segmenting
+                print(f"ERROR: {e}")
+                sys.exit(1)
+    elapsed = time.perf_counter() - start
+    tracer.write(args.trace)
+
+    for entry in todo:
+        out_path = OUT_DIR / f"{entry['slug']}-full.png"
+        state.record(out_path, records[entry["slug"]])
+        duplicate = index.add_output(out_path, entry["slug"])
+        if duplicate is not None:
+            print(f"  WARNING: {out_path.name} looks like {duplicate[0]}-full.png ({duplicate[1]} bits apart)")
+    state.save()
+    index.save()
+
+    # Archive originals in manifest order, after every output is written
+    for entry in todo:
+        archived = archive_source(entry)
+        if archived:
+            print(f"    Archived original to {archived}")
+
+    print("\n=== Updating bottle index ===")
+    update_bottle_index(processed, described, bottles)
+
+    if todo:
+        print("\n=== Run summary ===")
+        print(f"  {len(todo)} images in {elapsed:.1f}s ({len(todo) / elapsed:.2f} images/sec, jobs={args.jobs})")
+        if args.jobs <= 1:
+            print(get_remover(args.model, not args.no_cache, args.work_size, max(1, args.batch), args.threads).report())
+        print(tracer.summary())
+        print(f"  Run report appended to {args.trace}")
 
     print(f"\nDone! Processed {len(processed)} bottles.")
 
@@ -2,29 +2,76 @@
 
 Handles:
 - Single-bottle PNGs: rembg background removal + normalize
-- Multi-bottle JPGs/PNGs: rembg + column-split into individual bottles + normalize
-
-Dependencies: pip install rembg[cpu] Pillow numpy
+- Multi-bottle JPGs/PNGs: rembg + column-split into individual bottles + normalize,
+  falling back to connected components when bottles overlap or touch; a photo
+  whose split does not give one trusted region per slug is skipped with an error
+
+Dependencies: pip install rembg[cpu] Pillow numpy (scipy optional, speeds up splitting)
+
+Usage: python process-uploaded-bottles.py [--model u2net|u2netp|isnet|silueta] [--work-size PX]
+                                          [--batch N] [--threads N] [--force] [--no-cache] [--dry-run] [--cleanup]
+                                          [--allow-duplicates] [--trace PATH] [--profile cpu|mem]
+
+Only stale outputs are rebuilt (see assets/build-state.json); --dry-run lists
+them. A new upload whose photo near-duplicates another source (by perceptual
+hash, see bottle_pipeline/dedupe.py) is skipped before inference, so SKIP
+only needs files that should never be processed. --cleanup moves raw uploads to assets/archive/uploads/ so they remain
+available for later rebuilds. --work-size runs rembg on a copy at most PX on
+its long side and upsamples only the mask (see bottle_pipeline/mask.py).
+--batch N infers up to N stale sources per onnxruntime run, with --threads
+intra-op threads (see bottle_pipeline/batch.py).
+Every alpha-cleaned cutout (each split bottle, for multi-bottle photos) is
+kept uncompressed in .cache/frames/process-uploaded-bottles/, so a rerun
+that only changes the canvas or fill skips rembg, alpha cleanup and
+splitting (see bottle_pipeline/frames.py).
+Alpha cleanup and splitting read the frame in bands of at most TILE_BYTES,
+so a very large photo does not need several full-frame copies (see
+bottle_pipeline/strips.py); the results are the same as whole-frame ones.
+Stage timings go to .cache/runs.jsonl (--trace); --profile prints the
+hottest functions or allocations (see bottle_pipeline/trace.py). Written
+outputs are measured from their in-memory canvas into
+src/lib/bottle-index.json (see bottle_pipeline/metadata.py).
 """
+import argparse
+import shutil
 import sys
 from pathlib import Path
 
 try:
     from PIL import Image
     import numpy as np
-    from rembg import remove
+    from bottle_pipeline.alpha import ALPHA_THRESHOLD
+    from bottle_pipeline.buildstate import BuildState, make_record
+    from bottle_pipeline.cache import file_digest
+    from bottle_pipeline.dedupe import HashIndex
+    from bottle_pipeline.encode import PNG_OPTIONS, save_png
+    from bottle_pipeline.engine import DEFAULT_MODEL, MODELS, BackgroundRemover, get_remover
+    from bottle_pipeline.frames import FrameStore
+    from bottle_pipeline.metadata import BottleIndex, describe
+    from bottle_pipeline.strips import AlphaStrips, clean_alpha_strips, segment_columns_strips, segment_components_strips
+    from bottle_pipeline.trace import PROFILE_MODES, RUN_LOG, Tracer, profiled
+    from bottle_pipeline.variants import FORMAT_OPTIONS, VARIANT_SIZES, available_formats, write_variants
 except ImportError as e:
     print(f"Missing dependency: {e}")
-    print("Run: pip install rembg[cpu] Pillow numpy")
+    print("Run: pip install Pillow numpy")
     sys.exit(1)
 
-ROOT = Path("C:/Dev/Wini/wini-app")
+ROOT = Path(__file__).resolve().parent.parent
 NORM_DIR = ROOT / "public" / "bottles" / "normalized"
+ARCHIVE_DIR = ROOT / "assets" / "archive" / "uploads"
+BUILD_STATE = ROOT / "assets" / "build-state.json"
+BOTTLE_INDEX = ROOT / "src" / "lib" / "bottle-index.json"
+FRAMES = FrameStore("process-uploaded-bottles")
 
 CANVAS_W, CANVAS_H = 400, 800
 TARGET_FILL = 0.72
-ALPHA_THRESHOLD = 10
+FEATHER_RADIUS = 0.0  # px of Gaussian edge feathering after alpha cleanup (0 = off)
 MIN_BOTTLE_WIDTH = 30  # minimum pixel width to consider a split region a bottle
+TILE_BYTES = 32 * 2**20  # RGBA bytes per band in alpha cleanup and splitting; bounds their working memory
+LOW_CONFIDENCE = 0.5  # warn about split regions scoring below this
+MIN_CONFIDENCE = 0.25  # split regions scoring below this are not trusted to be one bottle
+WRITE_VARIANTS = True  # also emit WebP/AVIF copies at VARIANT_SIZES next to each PNG
+PIPELINE_VERSION = 2  # bump when a code change alters output pixels
 
 # ── Single-bottle files: { source_filename: output_slug } ──
 SINGLES = {
@@ -74,14 +121,6 @@ MULTIS = {
 SKIP = {"Screenshot 2026-02-11 132024.png"}
 
 
-def clean_alpha(img: Image.Image, threshold: int = ALPHA_THRESHOLD) -> Image.Image:
-    """Zero out near-transparent pixels."""
-    arr = np.array(img)
-    mask = arr[:, :, 3] < threshold
-    arr[mask] = [0, 0, 0, 0]
-    return Image.fromarray(arr)
-
-
 def normalize_bottle(img: Image.Image) -> Image.Image:
     """Center bottle on 400x800 canvas at ~72% fill."""
     bbox = img.getbbox()
@@ -111,176 +150,396 @@ def normalize_bottle(img: Image.Image) -> Image.Image:
 
 
 def split_bottles(img: Image.Image, expected_count: int) -> list[Image.Image]:
-    """Split a multi-bottle image into individual bottles by finding vertical gaps."""
-    arr = np.array(img)
-    alpha = arr[:, :, 3]
-
-    # Column presence: sum of alpha per column
-    col_sum = alpha.sum(axis=0)
-
-    # Threshold: columns with very little content are "gaps"
-    threshold = col_sum.max() * 0.02
-    is_content = col_sum > threshold
-
-    # Find contiguous content regions
-    regions = []
-    in_region = False
-    start = 0
-    for x in range(len(is_content)):
-        if is_content[x] and not in_region:
-            start = x
-            in_region = True
-        elif not is_content[x] and in_region:
-            if x - start >= MIN_BOTTLE_WIDTH:
-                regions.append((start, x))
-            in_region = False
-    if in_region and len(is_content) - start >= MIN_BOTTLE_WIDTH:
-        regions.append((start, len(is_content)))
-
-    print(f"    Found {len(regions)} content regions (expected {expected_count})")
-
-    # If we found more regions than expected, merge the smallest gaps
-    while len(regions) > expected_count and len(regions) > 1:
-        # Find the smallest gap between adjacent regions
-        min_gap = float("inf")
-        min_idx = 0
-        for i in range(len(regions) - 1):
-            gap = regions[i + 1][0] - regions[i][1]
-            if gap < min_gap:
-                min_gap = gap
-                min_idx = i
-        # Merge regions[min_idx] and regions[min_idx + 1]
-        merged = (regions[min_idx][0], regions[min_idx + 1][1])
-        regions = regions[:min_idx] + [merged] + regions[min_idx + 2 :]
-
-    # If we found fewer regions than expected, try splitting the widest regions
-    while len(regions) < expected_count:
-        # Find the widest region
-        widths = [(r[1] - r[0], i) for i, r in enumerate(regions)]
-        widths.sort(reverse=True)
-        widest_idx = widths[0][1]
-        r = regions[widest_idx]
-        mid = (r[0] + r[1]) // 2
-        # Split at midpoint
-        left = (r[0], mid)
-        right = (mid, r[1])
-        regions = regions[:widest_idx] + [left, right] + regions[widest_idx + 1 :]
-
-    # Crop each region
+    """Split a multi-bottle image into individual bottles.
+
+    Vertical gaps are tried first. When they do not give one region per bottle
+    (bottles overlap in x or touch), connected components are tried as well,
+    and whichever split scores the higher worst-case confidence is used.
+    Both read the alpha channel band by band, never all of it at once.
+    Regions scoring below MIN_CONFIDENCE are dropped, so the result can
+    hold fewer bottles than expected_count; callers must not match such a
+    split to slugs by position.
+    """
+    alpha = AlphaStrips(img, TILE_BYTES)
+    regions, found = segment_columns_strips(alpha, expected_count, MIN_BOTTLE_WIDTH)
+    print(f"    Found {found} content regions (expected {expected_count})")
+
+    if found != expected_count:
+        components, count = segment_components_strips(alpha, expected_count, MIN_BOTTLE_WIDTH)
+        print(f"    Found {count} connected components (expected {expected_count})")
+        worst = min((r["confidence"] for r in regions), default=0.0)
+        if len(components) == expected_count and min(r["confidence"] for r in components) >= worst:
+            print("    Using connected-component split")
+            regions = components
+
     bottles = []
-    h = img.height
-    for x_start, x_end in regions:
-        # Find vertical bounds for this column range
-        region_alpha = alpha[:, x_start:x_end]
-        row_sum = region_alpha.sum(axis=1)
-        row_thresh = row_sum.max() * 0.01
-        rows_with_content = np.where(row_sum > row_thresh)[0]
-        if len(rows_with_content) == 0:
+    for region in regions:
+        if region["confidence"] < MIN_CONFIDENCE:
+            print(f"    Dropped region at x={region['box'][0]} (split confidence {region['confidence']:.2f})")
             continue
-        y_start = max(0, rows_with_content[0] - 5)
-        y_end = min(h, rows_with_content[-1] + 5)
-        crop = img.crop((x_start, y_start, x_end, y_end))
-        bottles.append(crop)
-
+        if region["confidence"] < LOW_CONFIDENCE:
+            print(f"    WARNING: low split confidence {region['confidence']:.2f} at x={region['box'][0]}")
+        bottle = img.crop(region["box"])
+        if "mask" in region:
+            # Drop any neighbour that reaches into this bottle's box
+            cut = np.where(region["mask"], np.asarray(bottle.getchannel("A")), 0).astype(np.uint8)
+            bottle.putalpha(Image.fromarray(cut))
+        bottles.append(bottle)
     return bottles
 
 
-def process_single(filename: str, slug: str) -> bool:
-    """Process a single-bottle image."""
-    src = NORM_DIR / filename
-    out = NORM_DIR / f"{slug}-full.png"
-
-    if out.exists():
-        print(f"  SKIP {slug} — already exists")
-        return True
+def find_source(filename: str) -> Path | None:
+    """Locate a raw upload in the normalized dir or, after --cleanup, the archive."""
+    for folder in (NORM_DIR, ARCHIVE_DIR):
+        if (folder / filename).exists():
+            return folder / filename
+    return None
+
+
+def build_params(model: str, work_size: int | None = None) -> dict:
+    """Every setting that affects output pixels, for the build state."""
+    variants = [{fmt: FORMAT_OPTIONS[fmt] for fmt in available_formats()}, [list(size) for size in VARIANT_SIZES]]
+    return {
+        "canvas": [CANVAS_W, CANVAS_H],
+        "target_fill": TARGET_FILL,
+        "alpha_threshold": ALPHA_THRESHOLD,
+        "feather": FEATHER_RADIUS,
+        "png": PNG_OPTIONS,
+        "variants": variants if WRITE_VARIANTS else None,
+        "min_bottle_width": MIN_BOTTLE_WIDTH,
+        "model": model,
+        "work_size": work_size,
+    }
+
+
+def output_records(digest: str, params: dict, slugs: list[str], multi: bool) -> dict[str, dict]:
+    """Build-state record of every output of one source, by slug."""
+    if not multi:
+        return {slugs[0]: make_record(digest, params, "process-uploaded-bottles", PIPELINE_VERSION)}
+    # Each output also depends on its position in the split, and on which splits are trusted
+    split_params = {**params, "min_confidence": MIN_CONFIDENCE}
+    return {
+        slug: make_record(digest, {**split_params, "split": [i, len(slugs)]}, "process-uploaded-bottles",
+                          PIPELINE_VERSION)
+        for i, slug in enumerate(slugs)
+    }
+
+
+def frame_keys(remover: BackgroundRemover, digest: str, slugs: list[str], multi: bool) -> dict[str, str] | None:
+    """Frame store key of every cleaned cutout of one source, by slug; None with the rembg cache off."""
+    if remover.cache is None:
+        return None
+    source_key = remover.cache.key(digest, remover.cache_tag)
+    params = {"threshold": ALPHA_THRESHOLD, "feather": FEATHER_RADIUS, "version": PIPELINE_VERSION}
+    if not multi:
+        return {slugs[0]: FrameStore.key(source_key, **params)}
+    return {
+        slug: FrameStore.key(source_key, **params, min_bottle_width=MIN_BOTTLE_WIDTH, min_confidence=MIN_CONFIDENCE,
+                             split=[i, len(slugs)])
+        for i, slug in enumerate(slugs)
+    }
+
+
+def load_frames(keys: dict[str, str] | None, slugs: list[str], tracer: Tracer) -> dict[str, Image.Image] | None:
+    """Stored cutouts of slugs cropped to their bbox, or None unless every one matches its key."""
+    if keys is None:
+        return None
+    if not all(FRAMES.has(slug, keys[slug]) for slug in slugs):
+        return None
+    bottles = {}
+    for slug in slugs:
+        frame = FRAMES.get(slug, keys[slug])
+        if frame is None:  # replaced since the check
+            return None
+        # Copied out and unmapped at once, so store_frame() can replace the file later in the run
+        with frame, tracer.stage("load_frame", frame.name) as event:
+            bottles[frame.name] = frame.bottle()
+            event.output(bottles[frame.name])
+    return bottles
 
-    if not src.exists():
-        print(f"  SKIP {filename} — source not found")
-        return False
 
-    print(f"  Processing {filename} -> {slug}-full.png ...")
-    img = Image.open(src).convert("RGBA")
-    print(f"    Original: {img.size}")
+def store_frame(slug: str, img: Image.Image, keys: dict[str, str] | None, tracer: Tracer) -> None:
+    """Keep a cleaned cutout in the frame store for later runs."""
+    if keys is None:
+        return
+    with tracer.stage("frame_put", slug, img) as event:
+        event.wrote(FRAMES.put(slug, img, keys[slug], ALPHA_THRESHOLD, FEATHER_RADIUS))
 
-    img_nobg = remove(img)
-    print("    Background removed")
 
-    img_clean = clean_alpha(img_nobg)
-    result = normalize_bottle(img_clean)
-    result.save(out, "PNG")
-    print(f"    Saved: {out.name}")
-    return True
+def stale_sources(state: BuildState, params: dict, force: bool = False) -> list[Path]:
+    """Sources with at least one stale output, in processing order.
 
+    Announced to the remover, so --batch can infer them together. Duplicate
+    checks come later; a near-duplicate upload here costs one wasted mask.
+    """
+    sources = [(f, [slug], False) for f, slug in SINGLES.items()] + [(f, slugs, True) for f, slugs in MULTIS.items()]
+    found = []
+    for filename, slugs, multi in sources:
+        src = find_source(filename)
+        if src is None:
+            continue
+        records = output_records(file_digest(src), params, slugs, multi)
+        if force or any(state.is_stale(NORM_DIR / f"{slug}-full.png", records[slug]) for slug in slugs):
+            found.append(src)
+    return found
+
+
+def process_single(
+    filename: str,
+    slug: str,
+    remover: BackgroundRemover,
+    state: BuildState,
+    params: dict,
+    tracer: Tracer,
+    index: HashIndex,
+    force: bool = False,
+    dry_run: bool = False,
+    allow_duplicates: bool = False,
+) -> tuple[bool, dict[str, dict]]:
+    """Process a single-bottle image if its output is stale and it is not a duplicate.
+
+    Returns whether slug has an output, and describe() of the canvas written this run, by slug.
+    """
+    src = find_source(filename)
+    out = NORM_DIR / f"{slug}-full.png"
 
-def process_multi(filename: str, slugs: list[str]) -> int:
-    """Process a multi-bottle image, splitting into individual bottles."""
-    src = NORM_DIR / filename
-    if not src.exists():
+    if src is None:
+        if out.exists():
+            print(f"  SKIP {slug} — source not found, keeping existing output")
+            return True, {}
         print(f"  SKIP {filename} — source not found")
-        return 0
+        return False, {}
 
-    # Check if all outputs already exist
-    all_exist = all((NORM_DIR / f"{s}-full.png").exists() for s in slugs)
-    if all_exist:
-        print(f"  SKIP {filename} — all {len(slugs)} bottles already processed")
-        return len(slugs)
+    digest = file_digest(src)
+    duplicate = index.admit_source(src, digest, slug, check=not out.exists() and not allow_duplicates)
+    if duplicate is not None:
+        print(f"  SKIP {slug} — near-duplicate of {duplicate[0]} ({duplicate[1]} bits apart)")
+        return False, {}
 
-    print(f"  Processing {filename} -> {len(slugs)} bottles ...")
-    img = Image.open(src).convert("RGBA")
-    print(f"    Original: {img.size}")
+    record = output_records(digest, params, [slug], multi=False)[slug]
+    if not force and not state.is_stale(out, record):
+        print(f"  SKIP {slug} — up to date")
+        return True, {}
 
-    img_nobg = remove(img)
-    print("    Background removed")
+    if dry_run:
+        print(f"  STALE {slug}-full.png  <- {filename}")
+        return True, {}
 
-    img_clean = clean_alpha(img_nobg)
+    print(f"  Processing {filename} -> {slug}-full.png ...")
+    keys = frame_keys(remover, digest, [slug], multi=False)
+    stored = load_frames(keys, [slug], tracer)
+    if stored is not None:
+        img_clean = stored[slug]
+        print(f"    Cleaned cutout read from the frame store: {img_clean.size}")
+    else:
+        with tracer.stage("rembg", slug) as event:
+            img_nobg = remover.remove_file(src, remover.key(src, digest))
+            event.output(img_nobg)
+        print(f"    Background removed: {img_nobg.size}")
+
+        with tracer.stage("clean_alpha", slug, img_nobg) as event:
+            img_clean = clean_alpha_strips(img_nobg, ALPHA_THRESHOLD, FEATHER_RADIUS, TILE_BYTES)
+            event.output(img_clean)
+        store_frame(slug, img_clean, keys, tracer)
+    with tracer.stage("normalize", slug, img_clean) as event:
+        result = normalize_bottle(img_clean)
+        event.output(result)
+    described = finish_output(slug, result, out, tracer)
+    state.record(out, record)
+    print(f"    Saved: {out.name}")
+    warn_duplicate_output(index, out, slug)
+    return True, {slug: described}
+
+
+def process_multi(
+    filename: str,
+    slugs: list[str],
+    remover: BackgroundRemover,
+    state: BuildState,
+    params: dict,
+    tracer: Tracer,
+    index: HashIndex,
+    force: bool = False,
+    dry_run: bool = False,
+    allow_duplicates: bool = False,
+) -> tuple[int, dict[str, dict]]:
+    """Process a multi-bottle image, splitting into individual bottles, if any output is stale.
+
+    Returns how many of its slugs have an output, and describe() of the canvases written this run, by slug.
+    """
+    src = find_source(filename)
+    if src is None:
+        print(f"  SKIP {filename} — source not found")
+        return 0, {}
+
+    digest = file_digest(src)
+    is_new = not any((NORM_DIR / f"{slug}-full.png").exists() for slug in slugs)
+    duplicate = index.admit_source(src, digest, "+".join(slugs), check=is_new and not allow_duplicates)
+    if duplicate is not None:
+        print(f"  SKIP {filename} — near-duplicate of {duplicate[0]} ({duplicate[1]} bits apart)")
+        return 0, {}
+
+    records = output_records(digest, params, slugs, multi=True)
+    stale = {slug for slug in slugs if force or state.is_stale(NORM_DIR / f"{slug}-full.png", records[slug])}
+    if not stale:
+        print(f"  SKIP {filename} — all {len(slugs)} bottles up to date")
+        return len(slugs), {}
+
+    if dry_run:
+        for slug in slugs:
+            if slug in stale:
+                print(f"  STALE {slug}-full.png  <- {filename}")
+        return len(slugs), {}
 
-    bottles = split_bottles(img_clean, len(slugs))
+    print(f"  Processing {filename} -> {len(slugs)} bottles ...")
+    keys = frame_keys(remover, digest, slugs, multi=True)
+    bottles = load_frames(keys, sorted(stale), tracer)
+    if bottles is not None:
+        print(f"    {len(bottles)} split bottles read from the frame store")
+    else:
+        # Stages shared by the bottles of one source are logged under the source name
+        with tracer.stage("rembg", filename) as event:
+            img_nobg = remover.remove_file(src, remover.key(src, digest))
+            event.output(img_nobg)
+        print(f"    Background removed: {img_nobg.size}")
+
+        with tracer.stage("clean_alpha", filename, img_nobg) as event:
+            img_clean = clean_alpha_strips(img_nobg, ALPHA_THRESHOLD, FEATHER_RADIUS, TILE_BYTES)
+            event.output(img_clean)
+
+        with tracer.stage("split", filename, img_clean):
+            split = split_bottles(img_clean, len(slugs))
+        if len(split) != len(slugs):
+            # Cutouts matched to slugs by position would be mislabelled; write nothing
+            print(f"  ERROR {filename} — split found {len(split)} bottles, expected {len(slugs)}; "
+                  f"nothing written, check MULTIS or the photo")
+            return len(slugs) - len(stale), {}
+        bottles = dict(zip(slugs, split))
+        for slug, bottle_img in bottles.items():
+            store_frame(slug, bottle_img, keys, tracer)
 
     count = 0
-    for i, (slug, bottle_img) in enumerate(zip(slugs, bottles)):
+    described = {}
+    for slug in slugs:
         out = NORM_DIR / f"{slug}-full.png"
-        if out.exists():
-            print(f"    SKIP {slug} — already exists")
+        if slug not in stale:
+            print(f"    SKIP {slug} — up to date")
             count += 1
             continue
 
-        result = normalize_bottle(bottle_img)
-        result.save(out, "PNG")
+        with tracer.stage("normalize", slug, bottles[slug]) as event:
+            result = normalize_bottle(bottles[slug])
+            event.output(result)
+        described[slug] = finish_output(slug, result, out, tracer)
+        state.record(out, records[slug])
         print(f"    Saved: {slug}-full.png")
+        warn_duplicate_output(index, out, slug)
         count += 1
 
-    return count
+    return count, described
+
+
+def finish_output(slug: str, result: Image.Image, out: Path, tracer: Tracer) -> dict:
+    """Write a normalized canvas and its variants; returns describe() of it for the bottle index."""
+    with tracer.stage("save_png", slug, result) as event:
+        event.wrote(save_png(result, out))
+    if WRITE_VARIANTS:
+        with tracer.stage("variants", slug, result) as event:
+            event.wrote(*write_variants(result, out).values())
+    with tracer.stage("describe", slug, result):
+        return describe(result)
+
+
+def warn_duplicate_output(index: HashIndex, out: Path, slug: str) -> None:
+    """Index a written output and warn if another bottle's output looks the same."""
+    duplicate = index.add_output(out, slug)
+    if duplicate is not None:
+        print(f"    WARNING: looks like {duplicate[0]}-full.png ({duplicate[1]} bits apart)")
 
 
 def cleanup_raw_files() -> None:
-    """Delete raw uploaded files from normalized directory."""
+    """Move raw uploaded files out of the normalized directory into the archive."""
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
     raw_files = set(SINGLES.keys()) | set(MULTIS.keys()) | SKIP
     for filename in raw_files:
         path = NORM_DIR / filename
         if path.exists():
-            path.unlink()
-            print(f"  Deleted: {filename}")
+            shutil.move(str(path), str(ARCHIVE_DIR / filename))
+            print(f"  Archived: {filename}")
 
 
 def main() -> None:
-    print("=== Processing Single-Bottle Images ===")
-    single_count = 0
-    for filename, slug in SINGLES.items():
-        if process_single(filename, slug):
-            single_count += 1
-
-    print(f"\n=== Processing Multi-Bottle Images ===")
-    multi_count = 0
-    for filename, slugs in MULTIS.items():
-        multi_count += process_multi(filename, slugs)
+    parser = argparse.ArgumentParser(description="Process uploaded bottle images.")
+    parser.add_argument("--model", choices=MODELS, default=DEFAULT_MODEL, help="rembg model")
+    parser.add_argument("--work-size", type=int, metavar="PX",
+                        help="run rembg on a copy at most PX on its long side, upsampling only the mask")
+    parser.add_argument("--batch", type=int, default=1, metavar="N",
+                        help="sources per onnxruntime run (default: 1, rembg's own path)")
+    parser.add_argument("--threads", type=int, metavar="N",
+                        help="onnxruntime intra-op threads for --batch (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="rebuild every output, stale or not")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the rembg output cache and frame store")
+    parser.add_argument("--dry-run", action="store_true", help="list stale outputs without processing")
+    parser.add_argument("--cleanup", action="store_true", help="archive raw uploads afterwards")
+    parser.add_argument("--allow-duplicates", action="store_true",
+                        help="process new uploads even if they near-duplicate another source")
+    parser.add_argument("--trace", type=Path, default=RUN_LOG, help=f"run report to append to (default: {RUN_LOG})")
+    parser.add_argument("--profile", choices=PROFILE_MODES,
+                        help="profile the run with cProfile (cpu) or tracemalloc (mem)")
+    args = parser.parse_args()
+
+    remover = get_remover(args.model, not args.no_cache, args.work_size, max(1, args.batch), args.threads)
+    state = BuildState(BUILD_STATE)
+    params = build_params(args.model, args.work_size)
+    if remover.batch_size > 1 and not args.dry_run:
+        remover.expect(stale_sources(state, params, args.force))
+    tracer = Tracer("process-uploaded-bottles")
+    index = HashIndex()
+
+    with profiled(args.profile, args.trace.with_name(f"profile-{tracer.run}.prof")):
+        try:
+            print("=== Processing Single-Bottle Images ===")
+            single_count = 0
+            described = {}
+            for filename, slug in SINGLES.items():
+                ok, written = process_single(filename, slug, remover, state, params, tracer, index,
+                                             args.force, args.dry_run, args.allow_duplicates)
+                single_count += ok
+                described.update(written)
+
+            print(f"\n=== Processing Multi-Bottle Images ===")
+            multi_count = 0
+            for filename, slugs in MULTIS.items():
+                count, written = process_multi(filename, slugs, remover, state, params, tracer, index,
+                                               args.force, args.dry_run, args.allow_duplicates)
+                multi_count += count
+                described.update(written)
+        except ImportError as e:  # rembg is imported only once a source needs segmenting
+            print(f"ERROR: {e}")
+            sys.exit(1)
+
+    if args.dry_run:
+        return
+    state.save()
+    index.save()
+    tracer.write(args.trace)
+
+    # Index what was written; these bottles are listed in bottles.ts by hand
+    bottle_index = BottleIndex(BOTTLE_INDEX)
+    for slug, metadata in described.items():
+        bottle_index.update(NORM_DIR / f"{slug}-full.png", described=metadata)
+    bottle_index.save()
 
     print(f"\n=== Summary ===")
     print(f"  Singles: {single_count}/{len(SINGLES)}")
     print(f"  Multi-splits: {multi_count}")
     total = single_count + multi_count
     print(f"  Total: {total} bottles processed")
+    print(remover.report())
+    print(tracer.summary())
+    print(f"  Run report appended to {args.trace}")
 
-    if "--cleanup" in sys.argv:
+    if args.cleanup:
         print(f"\n=== Cleaning Up Raw Files ===")
         cleanup_raw_files()
 
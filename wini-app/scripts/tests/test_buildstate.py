@@ -0,0 +1,49 @@
+"""buildstate.py's stale-output detection, in a temporary folder.
+
+Usage (from wini-app/scripts): python -m unittest discover tests
+"""
+import tempfile
+import unittest
+from pathlib import Path
+
+from bottle_pipeline.buildstate import BuildState, make_record
+
+PARAMS = {"target_fill": 0.72, "canvas": [400, 800]}
+
+
+class BuildStateTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.output = self.root / "rioja-full.png"
+        self.record = make_record("digest", PARAMS, "process-bottles", 1)
+
+    def test_missing_output_is_stale(self):
+        state = BuildState(self.root / "state.json")
+        state.record(self.output, self.record)
+        self.assertTrue(state.is_stale(self.output, self.record))
+
+    def test_any_changed_input_makes_it_stale(self):
+        self.output.write_bytes(b"png")
+        state = BuildState(self.root / "state.json")
+        self.assertTrue(state.is_stale(self.output, self.record))  # never recorded
+        state.record(self.output, self.record)
+        self.assertFalse(state.is_stale(self.output, self.record))
+        for changed in (make_record("other digest", PARAMS, "process-bottles", 1),
+                        make_record("digest", {**PARAMS, "target_fill": 0.7}, "process-bottles", 1),
+                        make_record("digest", PARAMS, "process-uploaded-bottles", 1),
+                        make_record("digest", PARAMS, "process-bottles", 2)):
+            self.assertTrue(state.is_stale(self.output, changed))
+
+    def test_saved_state_reloads(self):
+        self.output.write_bytes(b"png")
+        state = BuildState(self.root / "nested" / "state.json")
+        state.record(self.output, self.record)
+        state.save()
+        self.assertFalse(BuildState(state.path).is_stale(self.output, self.record))
+        self.assertEqual([p.name for p in state.path.parent.iterdir()], ["state.json"])  # no temp file left
+
+
+if __name__ == "__main__":
+    unittest.main()
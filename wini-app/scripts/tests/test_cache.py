@@ -0,0 +1,73 @@
+"""cache.py's rembg cache: hits, misses, the eviction race and LRU eviction, in a temporary folder.
+
+Usage (from wini-app/scripts): python -m unittest discover tests
+"""
+import hashlib
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+
+from bottle_pipeline import cache
+from bottle_pipeline.cache import RembgCache, file_digest
+
+
+def noise(seed: int) -> Image.Image:
+    """A 64x64 RGBA image that PNG cannot compress, so every entry is about the same size."""
+    return Image.fromarray(np.random.default_rng(seed).integers(0, 256, (64, 64, 4), dtype=np.uint8), "RGBA")
+
+
+class RembgCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.cache = RembgCache(self.root)
+
+    def test_put_then_get(self):
+        key = RembgCache.key("digest", "u2net")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, noise(0))
+        self.assertTrue(np.array_equal(np.asarray(self.cache.get(key)), np.asarray(noise(0))))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertNotEqual(key, RembgCache.key("digest", "isnet-general-use"))
+
+    def test_entry_evicted_during_lookup_is_a_miss(self):
+        key = RembgCache.key("digest", "u2net")
+        self.cache.put(key, noise(0))
+        # Another process deletes the entry between the utime and the open
+        with mock.patch.object(cache.Image, "open", side_effect=FileNotFoundError):
+            self.assertIsNone(self.cache.get(key))
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+    def test_eviction_drops_least_recently_used(self):
+        keys = [RembgCache.key(f"digest{i}", "u2net") for i in range(4)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, noise(i))
+            os.utime(self.cache._path(key), (1000 + i, 1000 + i))
+        self.cache.get(keys[0])  # now the most recently used
+
+        entry = self.cache._path(keys[0]).stat().st_size
+        self.cache.max_bytes = int(entry * 3.5)  # EVICT_TO of that holds three entries
+        self.cache.put(RembgCache.key("digest4", "u2net"), noise(4))
+        self.assertEqual([self.cache.get(key) is not None for key in keys], [True, False, False, True])
+        self.assertEqual(self.cache._total, self.cache.size())
+
+    def test_running_total_follows_puts(self):
+        self.cache.put(RembgCache.key("a", "u2net"), noise(0))
+        self.cache.put(RembgCache.key("a", "u2net"), noise(1))  # replaces, so counted once
+        self.cache.put(RembgCache.key("b", "u2net"), noise(2))
+        self.assertEqual(self.cache._total, self.cache.size())
+
+    def test_file_digest(self):
+        path = self.root / "source.bin"
+        path.write_bytes(b"bottle")
+        self.assertEqual(file_digest(path), hashlib.sha256(b"bottle").hexdigest())
+
+
+if __name__ == "__main__":
+    unittest.main()
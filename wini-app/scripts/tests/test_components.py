@@ -0,0 +1,66 @@
+"""components.py's labelling and watershed splitting, with and without scipy.
+
+Usage (from wini-app/scripts): python -m unittest discover tests
+"""
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from bottle_pipeline import components
+from bottle_pipeline.components import block_reduce, label, segment_components
+
+
+def discs(centres: list[tuple[int, int]], radius: int = 40, size: tuple[int, int] = (300, 200)) -> np.ndarray:
+    """A (height, width) alpha channel with an opaque disc at each (x, y) centre."""
+    ys, xs = np.mgrid[:size[1], :size[0]]
+    alpha = np.zeros((size[1], size[0]), dtype=np.uint8)
+    for cx, cy in centres:
+        alpha[(xs - cx) ** 2 + (ys - cy) ** 2 <= radius ** 2] = 255
+    return alpha
+
+
+class ComponentsTest(unittest.TestCase):
+    def test_block_reduce_keeps_any_set_pixel(self):
+        mask = np.zeros((5, 5), dtype=bool)
+        mask[4, 4] = True
+        self.assertEqual(block_reduce(mask, 2).tolist(), [[False] * 3, [False] * 3, [False, False, True]])
+
+    def test_discs_overlapping_in_x_are_separate_components(self):
+        alpha = discs([(100, 50), (150, 150)], radius=40, size=(300, 200))
+        regions, found = segment_components(alpha, 2, 10)
+        self.assertEqual(found, 2)
+        self.assertEqual([r["box"][0] for r in regions], [60, 110])
+        self.assertEqual([r["confidence"] for r in regions], [1.0, 1.0])
+
+    def test_touching_discs_are_split(self):
+        alpha = discs([(100, 100), (170, 100)])
+        regions, found = segment_components(alpha, 2, 10)
+        self.assertEqual(found, 1)
+        self.assertEqual([r["box"] for r in regions], [(60, 60, 136, 141), (136, 60, 211, 141)])
+        # The two masks share no pixel and together cover the whole blob
+        left, right = (np.zeros(alpha.shape, dtype=bool) for _ in range(2))
+        for region, full in zip(regions, (left, right)):
+            x0, y0, x1, y1 = region["box"]
+            full[y0:y1, x0:x1] = region["mask"]
+        self.assertFalse((left & right).any())
+        self.assertTrue(np.array_equal(left | right, alpha > 0))
+        self.assertTrue(all(0 < r["confidence"] < 1 for r in regions))
+
+
+@mock.patch.object(components, "_ndimage", return_value=None)
+class NumpyFallbackTest(unittest.TestCase):
+    def test_run_labelling_counts_diagonal_contact(self, _):
+        mask = np.array([[1, 0, 0, 1], [0, 1, 0, 1], [0, 0, 0, 0], [1, 1, 0, 0]], dtype=bool)
+        labels, n = label(mask)
+        self.assertEqual(n, 3)
+        self.assertEqual(labels[0, 0], labels[1, 1])
+        self.assertNotEqual(labels[0, 0], labels[0, 3])
+
+    def test_touching_discs_split_at_the_same_column(self, _):
+        regions, _ = segment_components(discs([(100, 100), (170, 100)]), 2, 10)
+        self.assertEqual([r["box"] for r in regions], [(60, 60, 136, 141), (136, 60, 211, 141)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""dedupe.py's multi-index lookup and near-duplicate checks, on synthetic hashes and images.
+
+Usage (from wini-app/scripts): python -m unittest discover tests
+"""
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from bottle_pipeline.dedupe import DHASH_DISTANCE, PHASH_DISTANCE, HashIndex, MultiIndex, distance, image_hashes
+
+BASE_HASH = 0x0123_4567_89AB_CDEF
+
+
+def flip(h: int, bits: int) -> int:
+    """h with its lowest `bits` bits inverted, so distance(h, flip(h, bits)) == bits."""
+    return h ^ ((1 << bits) - 1)
+
+
+def bottle(width: int, label: tuple[int, int, int]) -> Image.Image:
+    """A width x 2*width photo of a dark bottle with a label of the given colour, on white."""
+    img = Image.new("RGB", (width, width * 2), "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((width * 0.4, width * 0.2, width * 0.6, width * 0.6), fill=(40, 20, 30))
+    draw.rounded_rectangle((width * 0.25, width * 0.55, width * 0.75, width * 1.9), radius=width // 10,
+                           fill=(40, 20, 30))
+    draw.rectangle((width * 0.3, width * 1.0, width * 0.7, width * 1.4), fill=label)
+    return img
+
+
+class MultiIndexTest(unittest.TestCase):
+    def test_finds_every_entry_within_radius(self):
+        lookup = MultiIndex(PHASH_DISTANCE)
+        for bits in range(PHASH_DISTANCE + 3):
+            lookup.add(f"flip{bits}", flip(BASE_HASH, bits))
+        found = lookup.query(BASE_HASH)
+        self.assertEqual(found, [(bits, f"flip{bits}") for bits in range(PHASH_DISTANCE + 1)])
+
+    def test_spread_out_flips_are_still_found(self):
+        # One flipped bit in each of radius + 1 slices would defeat a single-slice lookup
+        lookup = MultiIndex(3)
+        spread = BASE_HASH ^ (1 << 2) ^ (1 << 20) ^ (1 << 40)
+        lookup.add("spread", spread)
+        self.assertEqual(distance(BASE_HASH, spread), 3)
+        self.assertEqual(lookup.query(BASE_HASH), [(3, "spread")])
+
+    def test_removed_entries_are_not_found(self):
+        lookup = MultiIndex(PHASH_DISTANCE)
+        lookup.add("a", BASE_HASH)
+        lookup.add("a", flip(BASE_HASH, 40))  # re-adding a key replaces its hash
+        self.assertEqual(lookup.query(BASE_HASH), [])
+        lookup.remove("a")
+        self.assertEqual(lookup.query(flip(BASE_HASH, 40)), [])
+
+
+class HashIndexTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.index = HashIndex(Path(tmp.name) / "phash-index.json")
+
+    def test_dhash_gate_rejects_chance_phash_matches(self):
+        self.index.add("source", "a", "digest-a", {"a": 0, "d": BASE_HASH, "p": BASE_HASH})
+        near = {"a": 0, "d": flip(BASE_HASH, DHASH_DISTANCE), "p": flip(BASE_HASH, 2)}
+        self.assertEqual(self.index.find_duplicate(near, "source", "b"), ("a", 2))
+        far = {**near, "d": flip(BASE_HASH, DHASH_DISTANCE + 1)}
+        self.assertIsNone(self.index.find_duplicate(far, "source", "b"))
+        self.assertIsNone(self.index.find_duplicate(near, "output", "b"))  # other kinds never match
+
+    def test_rescaled_photo_is_a_duplicate_and_another_bottle_is_not(self):
+        original = image_hashes(bottle(200, (230, 200, 60)))
+        self.index.add("source", "original", "digest", original)
+        rescaled = image_hashes(bottle(120, (230, 200, 60)))
+        self.assertEqual(self.index.find_duplicate(rescaled, "source", "rescaled")[0], "original")
+        other = image_hashes(bottle(200, (230, 200, 60)).transpose(Image.Transpose.FLIP_TOP_BOTTOM))
+        self.assertIsNone(self.index.find_duplicate(other, "source", "other"))
+
+    def test_saved_index_reloads_its_lookup(self):
+        self.index.add("source", "a", "digest-a", {"a": 1, "d": 2, "p": BASE_HASH})
+        self.index.save()
+        reloaded = HashIndex(self.index.path)
+        self.assertEqual(reloaded.lookup.query(flip(BASE_HASH, 1)), [(1, "source:a")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""encode.py's palette gate and PNG output, on synthetic RGBA canvases.
+
+Usage (from wini-app/scripts): python -m unittest discover tests
+"""
+import io
+import unittest
+
+import numpy as np
+from PIL import Image
+
+from bottle_pipeline.encode import PNG_OPTIONS, encode_png, prepare_png, zero_transparent
+
+WINE = (90, 42, 49, 255)
+
+
+def noisy_label(rows: int = 24) -> Image.Image:
+    """A flat bottle with a small patch of random colour: palette error confined to the patch."""
+    arr = np.zeros((200, 100, 4), dtype=np.uint8)
+    arr[20:180, 20:80] = WINE
+    arr[60:60 + rows, 30:70, :3] = np.random.default_rng(1).integers(0, 256, (rows, 40, 3))
+    return Image.fromarray(arr, "RGBA")
+
+
+class PaletteGateTest(unittest.TestCase):
+    def test_palette_rejected_above_the_p99_gate(self):
+        prepared, (mean, p99) = prepare_png(noisy_label())
+        # The mean over the whole bottle would have let the banded patch through
+        self.assertLess(mean, PNG_OPTIONS["max_mean_delta_e"])
+        self.assertGreater(p99, PNG_OPTIONS["max_p99_delta_e"])
+        self.assertEqual(prepared.mode, "RGBA")
+
+    def test_palette_kept_when_the_p99_gate_allows_it(self):
+        prepared, _ = prepare_png(noisy_label(), {"max_p99_delta_e": 100.0})
+        self.assertEqual(prepared.mode, "P")
+
+    def test_few_colours_get_an_exact_palette(self):
+        arr = np.zeros((64, 64, 4), dtype=np.uint8)
+        arr[8:56, 8:56] = (10, 200, 30, 128)
+        prepared, error = prepare_png(Image.fromarray(arr, "RGBA"))
+        self.assertEqual((prepared.mode, error), ("P", (0.0, 0.0)))
+
+
+class EncodePngTest(unittest.TestCase):
+    def test_transparent_pixels_are_zeroed(self):
+        arr = np.full((4, 4, 4), 200, dtype=np.uint8)
+        arr[0, 0, 3] = 0
+        clean = np.asarray(zero_transparent(Image.fromarray(arr, "RGBA")))
+        self.assertEqual(clean[0, 0].tolist(), [0, 0, 0, 0])
+        self.assertEqual(clean[1, 1].tolist(), [200] * 4)
+
+    def test_round_trip_without_metadata(self):
+        img = noisy_label()
+        img.info["icc_profile"] = b"not a real profile"
+        with Image.open(io.BytesIO(encode_png(img, {"quantize": False}))) as png:
+            self.assertNotIn("icc_profile", png.info)
+            self.assertTrue(np.array_equal(np.asarray(png.convert("RGBA")), np.asarray(zero_transparent(img))))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""frames.py's memory-mapped frame store, on synthetic cutouts in a temporary folder.
+
+Usage (from wini-app/scripts): python -m unittest discover tests
+"""
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from bottle_pipeline.frames import FrameStore, fit_size
+
+
+def cutout(box: tuple[int, int, int, int] = (10, 20, 30, 70)) -> Image.Image:
+    """A 40x80 RGBA cutout with noisy RGB everywhere and an opaque box."""
+    arr = np.random.default_rng(4).integers(0, 256, (80, 40, 4), dtype=np.uint8)
+    arr[:, :, 3] = 0
+    x1, y1, x2, y2 = box
+    arr[y1:y2, x1:x2, 3] = 255
+    return Image.fromarray(arr, "RGBA")
+
+
+class FrameStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.store = FrameStore("process-bottles", self.root)
+        self.key = FrameStore.key("source", threshold=10, feather=0.0)
+
+    def test_round_trip(self):
+        img = cutout()
+        self.store.put("rioja", img, self.key, feather=1.5)
+        header = self.store.header("rioja")
+        self.assertEqual((header.threshold, header.feather, header.height, header.width), (10, 1.5, 80, 40))
+        with self.store.get("rioja", self.key) as frame:
+            self.assertEqual(frame.bbox, (10, 20, 30, 70))
+            self.assertTrue(np.array_equal(frame.pixels, np.asarray(img)))
+            bottle = frame.bottle()
+        self.assertEqual(bottle.size, (20, 50))  # a copy, still valid once the frame is closed
+        self.assertTrue(np.array_equal(np.asarray(bottle), np.asarray(img.crop((10, 20, 30, 70)))))
+
+    def test_stale_or_damaged_frames_are_misses(self):
+        self.store.put("rioja", cutout(), self.key)
+        other = FrameStore.key("source", threshold=20, feather=0.0)
+        self.assertTrue(self.store.has("rioja", self.key))
+        self.assertFalse(self.store.has("rioja", other))
+        self.assertIsNone(self.store.get("rioja", other))
+        self.assertIsNone(self.store.get("missing"))
+
+        path = self.store.path("rioja")
+        path.write_bytes(path.read_bytes()[:-1])
+        self.assertIsNone(self.store.header("rioja"))
+
+    def test_closed_frame_can_be_replaced(self):
+        self.store.put("rioja", cutout(), self.key)
+        frame = self.store.get("rioja", self.key)
+        frame.close()
+        self.store.put("rioja", cutout((0, 0, 5, 5)), self.key)
+        with self.store.get("rioja", self.key) as frame:
+            self.assertEqual(frame.bbox, (0, 0, 5, 5))
+
+    def test_empty_cutout_has_no_bbox(self):
+        self.store.put("empty", Image.new("RGBA", (8, 8)), self.key)
+        with self.store.get("empty") as frame:
+            self.assertIsNone(frame.bbox)
+            self.assertRaises(ValueError, frame.crop)
+
+    def test_namespaces_keep_same_slugs_apart(self):
+        uploads = FrameStore("process-uploaded-bottles", self.root)
+        self.store.put("rioja", cutout(), self.key)
+        uploads.put("rioja", cutout((0, 0, 5, 5)), self.key)
+        namespaces = [store.root.name for store in FrameStore.all(self.root)]
+        self.assertEqual(namespaces, ["process-bottles", "process-uploaded-bottles"])
+        self.assertEqual(self.store.header("rioja").bbox, (10, 20, 30, 70))
+        self.assertEqual(uploads.header("rioja").bbox, (0, 0, 5, 5))
+
+
+class FitSizeTest(unittest.TestCase):
+    def test_fills_height_unless_too_wide(self):
+        self.assertEqual(fit_size(100, 400, (400, 800), 0.72), (144, 576))
+        self.assertEqual(fit_size(400, 100, (400, 800), 0.72), (400, 100))
+
+
+if __name__ == "__main__":
+    unittest.main()
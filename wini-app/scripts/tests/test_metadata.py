@@ -0,0 +1,60 @@
+"""metadata.describe() and its LQIP placeholder, on a synthetic normalized canvas.
+
+Usage (from wini-app/scripts): python -m unittest discover tests
+"""
+import base64
+import io
+import time
+import unittest
+
+from PIL import Image, ImageDraw
+
+from bottle_pipeline.metadata import PLACEHOLDER_SIZE, describe, placeholder
+
+PLACEHOLDER_BUDGET_MS = 5.0  # per bottle, so describing every output adds little to a run
+
+
+def bottle_canvas() -> Image.Image:
+    """A 400x800 canvas with a dark red bottle shape in the middle."""
+    canvas = Image.new("RGBA", (400, 800), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(canvas)
+    draw.rectangle((180, 112, 220, 300), fill=(90, 42, 49, 255))
+    draw.rounded_rectangle((140, 280, 260, 688), radius=30, fill=(90, 42, 49, 255))
+    return canvas
+
+
+class PlaceholderTest(unittest.TestCase):
+    def test_placeholder_is_a_small_webp_data_uri(self):
+        uri = placeholder(bottle_canvas())
+        prefix = "data:image/webp;base64,"
+        self.assertTrue(uri.startswith(prefix))
+        data = base64.b64decode(uri[len(prefix):])
+        self.assertLess(len(data), 1024)
+        with Image.open(io.BytesIO(data)) as tiny:
+            self.assertEqual(tiny.format, "WEBP")
+            self.assertEqual(tiny.size, PLACEHOLDER_SIZE)
+
+    def test_placeholder_fits_its_time_budget(self):
+        canvas = bottle_canvas()
+        placeholder(canvas)  # first call pays for the WebP encoder's setup
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            placeholder(canvas)
+            best = min(best, time.perf_counter() - start)
+        self.assertLess(best * 1000, PLACEHOLDER_BUDGET_MS)
+
+    def test_describe_measures_the_canvas(self):
+        described = describe(bottle_canvas())
+        self.assertEqual((described["width"], described["height"]), (400, 800))
+        self.assertEqual(described["bbox"], [140, 112, 261, 689])
+        self.assertEqual(described["dominant"], "#5a2a31")
+
+    def test_describe_of_an_empty_canvas(self):
+        described = describe(Image.new("RGBA", (400, 800), (0, 0, 0, 0)))
+        self.assertIsNone(described["bbox"])
+        self.assertIsNone(described["dominant"])
+
+
+if __name__ == "__main__":
+    unittest.main()
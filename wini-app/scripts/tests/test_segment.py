@@ -0,0 +1,57 @@
+"""segment.py's column-projection splitting, on synthetic alpha channels.
+
+Usage (from wini-app/scripts): python -m unittest discover tests
+"""
+import unittest
+
+import numpy as np
+
+from bottle_pipeline.segment import column_runs, merge_smallest_gaps, segment_columns, valley_split
+
+
+def discs(centres: list[tuple[int, int]], radius: int = 40, size: tuple[int, int] = (300, 200)) -> np.ndarray:
+    """A (height, width) alpha channel with an opaque disc at each (x, y) centre."""
+    ys, xs = np.mgrid[:size[1], :size[0]]
+    alpha = np.zeros((size[1], size[0]), dtype=np.uint8)
+    for cx, cy in centres:
+        alpha[(xs - cx) ** 2 + (ys - cy) ** 2 <= radius ** 2] = 255
+    return alpha
+
+
+class SegmentTest(unittest.TestCase):
+    def test_column_runs_skip_narrow_runs(self):
+        col_sum = np.zeros(50, dtype=np.uint64)
+        col_sum[5:15] = col_sum[20:22] = col_sum[30:45] = 100
+        self.assertEqual(column_runs(col_sum, min_width=5), [(5, 15), (30, 45)])
+
+    def test_merge_smallest_gaps_merges_narrowest_first(self):
+        runs = [(0, 10), (12, 20), (30, 40), (41, 50)]
+        self.assertEqual(merge_smallest_gaps(runs, 2), [(0, 20), (30, 50)])
+        self.assertEqual(merge_smallest_gaps(runs, 1), [(0, 50)])
+
+    def test_separate_discs_are_clear_regions(self):
+        regions, found = segment_columns(discs([(60, 100), (200, 100)]), 2, 10)
+        self.assertEqual(found, 2)
+        self.assertEqual([r["box"] for r in regions], [(21, 55, 100, 145), (161, 55, 240, 145)])
+        self.assertEqual([r["confidence"] for r in regions], [1.0, 1.0])
+
+    def test_touching_discs_split_at_the_neck(self):
+        alpha = discs([(100, 100), (178, 100)])
+        regions, found = segment_columns(alpha, 2, 10)
+        self.assertEqual(found, 1)
+        self.assertEqual([r["box"] for r in regions], [(61, 55, 139, 145), (139, 55, 218, 145)])
+        # A valley split is less certain than a clear gap, but still a real dip
+        self.assertTrue(all(0.5 < r["confidence"] < 1.0 for r in regions))
+
+    def test_valley_split_prefers_the_dip_over_the_midpoint(self):
+        profile = np.array([9, 9, 9, 9, 9, 9, 1, 9, 9, 9, 9, 9, 9, 9, 9, 9, 9, 9, 9, 9], dtype=np.uint64)
+        x, depth = valley_split(profile, 0, len(profile), smooth=1)
+        self.assertEqual(x, 6)
+        self.assertAlmostEqual(depth, 1 - 1 / 9)
+
+    def test_empty_channel(self):
+        self.assertEqual(segment_columns(np.zeros((10, 10), dtype=np.uint8), 2, 1), ([], 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
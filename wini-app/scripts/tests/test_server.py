@@ -0,0 +1,147 @@
+"""bottle-server.py over real HTTP, with a stub in place of the rembg session.
+
+The stub keeps every pixel that is not near-white, so a photo of dark
+shapes on a white background comes back as those shapes cut out. Nothing
+downloads a model, and traces go to a temporary folder.
+
+Usage (from wini-app/scripts): python -m unittest discover tests
+"""
+import base64
+import http.client
+import importlib.util
+import io
+import json
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from bottle_pipeline.trace import Tracer
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+
+
+def load_module(path: Path):
+    spec = importlib.util.spec_from_file_location(path.stem.replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class StubRemover:
+    model = "stub"
+    work_size = None
+    session_load_s = 0.0
+
+    def warm_up(self) -> None:
+        pass
+
+    def remove(self, img: Image.Image) -> Image.Image:
+        arr = np.array(img.convert("RGBA"))
+        arr[:, :, 3] = np.where(arr[:, :, :3].min(axis=2) < 200, 255, 0)
+        return Image.fromarray(arr, "RGBA")
+
+
+def photo(bottles: int) -> bytes:
+    """JPEG bytes of `bottles` dark bottle shapes side by side on white."""
+    img = Image.new("RGB", (240 * bottles, 480), "white")
+    draw = ImageDraw.Draw(img)
+    for i in range(bottles):
+        x = 240 * i + 120
+        draw.rectangle((x - 12, 40, x + 12, 160), fill=(60, 20, 30))
+        draw.rounded_rectangle((x - 45, 140, x + 45, 440), radius=16, fill=(60, 20, 30))
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=95)
+    return buf.getvalue()
+
+
+class ServerTest(unittest.TestCase):
+    JOBS, QUEUE = 1, 1
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        run_log = Path(tmp.name) / "runs.jsonl"
+
+        class QuietTracer(Tracer):
+            def write(self, path: Path = run_log) -> None:
+                super().write(path)
+
+        self.server_module = server = load_module(SCRIPTS_DIR / "bottle-server.py")
+        with mock.patch.object(server, "get_remover", return_value=StubRemover()):
+            self.pipeline = server.Pipeline("stub", None, self.JOBS, self.QUEUE)
+        patcher = mock.patch.object(server, "Tracer", QuietTracer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        handler = type("TestHandler", (server.Handler,), {"pipeline": self.pipeline, "log_message": lambda *a: None})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.pipeline.pool.shutdown, wait=True)
+        self.addCleanup(self.httpd.server_close)
+        self.addCleanup(self.httpd.shutdown)
+
+    def post(self, query: str, body: bytes, length: int | None = None) -> tuple[int, dict, bytes]:
+        conn = http.client.HTTPConnection(*self.httpd.server_address[:2], timeout=30)
+        self.addCleanup(conn.close)
+        conn.putrequest("POST", f"/process{query}")
+        conn.putheader("Content-Length", str(len(body) if length is None else length))
+        conn.endheaders()
+        if body:
+            conn.send(body)
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+
+    def test_one_slug_returns_a_normalized_png(self):
+        status, headers, body = self.post("?slug=rioja", photo(1))
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Type"], "image/png")
+        self.assertEqual(headers["X-Bottle-Slug"], "rioja")
+        with Image.open(io.BytesIO(body)) as img:
+            self.assertEqual(img.size, (self.pipeline.script.CANVAS_W, self.pipeline.script.CANVAS_H))
+
+    def test_several_slugs_return_json(self):
+        status, headers, body = self.post("?slug=left&slug=right", photo(2))
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Type"], "application/json")
+        bottles = json.loads(body)["bottles"]
+        self.assertEqual([b["slug"] for b in bottles], ["left", "right"])
+        for bottle in bottles:
+            with Image.open(io.BytesIO(base64.b64decode(bottle["png"]))) as img:
+                self.assertEqual(img.format, "PNG")
+
+    def test_missing_slug_is_refused(self):
+        status, _, body = self.post("", photo(1))
+        self.assertEqual(status, 400)
+        self.assertIn("slug", json.loads(body)["error"])
+
+    def test_non_image_body_is_refused(self):
+        status, _, body = self.post("?slug=rioja", b"not an image")
+        self.assertEqual(status, 400)
+        self.assertIn("image", json.loads(body)["error"])
+
+    def test_oversized_upload_is_refused_unread(self):
+        status, _, _ = self.post("?slug=rioja", b"", length=self.server_module.MAX_BODY + 1)
+        self.assertEqual(status, 413)
+
+    def test_full_pool_answers_503(self):
+        for _ in range(self.JOBS + self.QUEUE):
+            self.assertTrue(self.pipeline.reserve())
+        try:
+            status, headers, _ = self.post("?slug=rioja", photo(1))
+            self.assertEqual(status, 503)
+            self.assertEqual(headers["Retry-After"], "1")
+        finally:
+            for _ in range(self.JOBS + self.QUEUE):
+                self.pipeline.release()
+        self.assertEqual(self.post("?slug=rioja", photo(1))[0], 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+"""Start-up check of bottle-cli.py: status and dry-run stay fast and never import rembg.
+
+Runs bench-bottles.py's -X importtime report against a throwaway copy of
+wini-app (the scripts plus a one-bottle manifest and its photo), so it
+needs no real photos, no model download, and leaves the checkout's build
+state and caches alone.
+
+Usage (from wini-app/scripts): python -m unittest discover tests
+"""
+import importlib.util
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+
+
+def load_module(path: Path):
+    spec = importlib.util.spec_from_file_location(path.stem.replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class StartupTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.app = Path(tmp.name) / "wini-app"
+        shutil.copytree(SCRIPTS_DIR, self.app / "scripts", ignore=shutil.ignore_patterns("__pycache__", "tests"))
+
+        stock = self.app / "assets" / "stock-photos"
+        stock.mkdir(parents=True)
+        Image.new("RGB", (64, 128), (120, 20, 40)).save(stock / "test-bottle.png")
+        manifest = {"bottles": [{"file": "test-bottle.png", "name": "Test", "type": "red", "slug": "test-bottle"}]}
+        (self.app / "assets" / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+
+    def test_status_and_dry_run_start_fast_without_heavy_imports(self):
+        bench = load_module(self.app / "scripts" / "bench-bottles.py")
+        failures = bench.startup_report(self.app / "scripts" / "bottle-cli.py")
+        self.assertEqual(failures, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""strips.py against the whole-frame helpers, down to one-row bands.
+
+Usage (from wini-app/scripts): python -m unittest discover tests
+"""
+import unittest
+
+import numpy as np
+from PIL import Image
+
+from bottle_pipeline.alpha import clean_alpha
+from bottle_pipeline.components import segment_components
+from bottle_pipeline.segment import segment_columns
+from bottle_pipeline.strips import (AlphaStrips, band_rows, clean_alpha_strips, segment_columns_strips,
+                                    segment_components_strips)
+
+WIDTH, HEIGHT = 300, 200
+
+
+def discs(centres: list[tuple[int, int]], radius: int = 40, size: tuple[int, int] = (300, 200)) -> np.ndarray:
+    """A (height, width) alpha channel with an opaque disc at each (x, y) centre."""
+    ys, xs = np.mgrid[:size[1], :size[0]]
+    alpha = np.zeros((size[1], size[0]), dtype=np.uint8)
+    for cx, cy in centres:
+        alpha[(xs - cx) ** 2 + (ys - cy) ** 2 <= radius ** 2] = 255
+    return alpha
+
+
+def frame() -> Image.Image:
+    """Two touching discs and a third one apart, with a faint halo and a little noise, as rembg leaves them."""
+    alpha = discs([(70, 100), (140, 100), (240, 90)], radius=35, size=(WIDTH, HEIGHT))
+    halo = discs([(70, 100), (140, 100), (240, 90)], radius=40, size=(WIDTH, HEIGHT)) // 40
+    noise = np.random.default_rng(3).integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+    return Image.fromarray(np.dstack([noise, np.maximum(alpha, halo)]), "RGBA")
+
+
+class StripsTest(unittest.TestCase):
+    # One-row bands, bands that do not divide the height, and a single band
+    TILES = (4 * WIDTH, 4 * WIDTH * 7, 4 * WIDTH * HEIGHT)
+
+    def test_band_rows(self):
+        self.assertEqual(band_rows(WIDTH, 4 * WIDTH), 1)
+        self.assertEqual(band_rows(WIDTH, 4 * WIDTH * 7, align=4), 4)
+        self.assertEqual(band_rows(WIDTH, 1, align=4), 4)
+
+    def test_clean_alpha_matches_the_whole_frame(self):
+        for feather in (0.0, 2.0):
+            whole = np.asarray(clean_alpha(frame(), feather=feather))
+            for tile in self.TILES:
+                with self.subTest(feather=feather, tile=tile):
+                    strips = np.asarray(clean_alpha_strips(frame(), feather=feather, tile_bytes=tile))
+                    self.assertTrue(np.array_equal(strips, whole))
+
+    def test_splits_and_bbox_match_the_whole_frame(self):
+        clean = clean_alpha(frame())
+        alpha = np.asarray(clean.getchannel("A"))
+        columns = segment_columns(alpha, 3, 10)
+        components, found = segment_components(alpha, 3, 10)
+        for tile in self.TILES:
+            for src in (clean, np.asarray(clean)):
+                with self.subTest(tile=tile, source=type(src).__name__):
+                    strips = AlphaStrips(src, tile)
+                    self.assertEqual(strips.bbox(), clean.getbbox())
+                    self.assertEqual(segment_columns_strips(strips, 3, 10), columns)
+                    regions, strip_found = segment_components_strips(strips, 3, 10)
+                    self.assertEqual(strip_found, found)
+                    self.assertEqual([(r["box"], r["confidence"]) for r in regions],
+                                     [(r["box"], r["confidence"]) for r in components])
+                    for a, b in zip(regions, components):
+                        self.assertTrue(np.array_equal(a["mask"], b["mask"]))
+
+    def test_empty_frame_has_no_bbox(self):
+        self.assertIsNone(AlphaStrips(Image.new("RGBA", (20, 10)), 4 * 20).bbox())
+
+
+if __name__ == "__main__":
+    unittest.main()
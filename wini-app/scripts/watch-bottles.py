@@ -0,0 +1,331 @@
+"""Watch the intake folders and process new bottle photos as they land.
+
+  assets/stock-photos/            -> process-bottles.py steps, manifest.json entry added if missing
+  public/bottles/normalized/      -> process-uploaded-bottles.py steps (raw uploads next to the outputs)
+
+The rembg session is loaded once at startup. Each folder is polled every
+--interval seconds with one directory listing; a file counts as landed once
+its size and mtime have not changed for --settle seconds. Files that land
+together, like a copied batch, are processed as one burst, after the last
+of them has settled. Only those files go through the pipeline; build state,
+the duplicate index and src/lib/bottle-index.json are updated in place,
+entry by entry, so a dropped photo is a carousel-ready asset a few seconds
+later.
+
+A stock photo without a manifest entry gets one: its slug and name come
+from the file name and its type from --type, so the bottle shows up in
+BOTTLES at once and can be renamed in manifest.json later. An upload that
+SINGLES/MULTIS does not list is processed as a single bottle and indexed
+with a name and --type, which lists it in BOTTLES after the manifest's
+bottles. A slug is never taken over: if the file name's slug is already
+used by a manifest entry, SINGLES/MULTIS, the bottle index or an output in
+normalized/, the new bottle gets a numbered one (chardonnay-2). Files
+present at startup are left alone; run the batch scripts for those.
+
+Usage: python watch-bottles.py [--model u2net|u2netp|isnet|silueta] [--work-size PX]
+                               [--interval S] [--settle S] [--type red|white|both|sparkling|rosé]
+                               [--allow-duplicates] [--trace PATH]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+try:
+    from bottle_pipeline.buildstate import BuildState, make_record
+    from bottle_pipeline.cache import file_digest
+    from bottle_pipeline.dedupe import IMAGE_SUFFIXES, HashIndex
+    from bottle_pipeline.engine import DEFAULT_MODEL, MODELS, get_remover
+    from bottle_pipeline.metadata import BottleIndex
+    from bottle_pipeline.scripts import load_script
+    from bottle_pipeline.trace import RUN_LOG, Tracer
+except ImportError as e:
+    print(f"Missing dependency: {e}")
+    print("Run: pip install Pillow numpy")
+    sys.exit(1)
+
+POLL_INTERVAL = 0.5  # seconds between folder listings
+SETTLE_S = 1.0  # a burst is processed once none of its files has changed for this long
+BOTTLE_TYPES = ("red", "white", "both", "sparkling", "rosé")  # BottleType in src/lib/types.ts
+# What the pipelines write into normalized/: full canvases and their variants, and normalize-bottles.py's halves
+OUTPUT_NAME = re.compile(r"(-full(-\d+w)?\.\w+|-(left|right)\.png)$")
+FULL_SUFFIX = "-full.png"
+
+
+def slugify(stem: str) -> str:
+    """ascii, lowercase, dash-separated slug of a file stem."""
+    ascii_stem = unicodedata.normalize("NFKD", stem).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", ascii_stem.lower()).strip("-") or "bottle"
+
+
+def display_name(stem: str) -> str:
+    """A carousel name from a file stem, e.g. "rioja_reserve-2019" -> "Rioja Reserve 2019"."""
+    return " ".join(word.capitalize() for word in re.split(r"[\s_-]+", stem) if word)
+
+
+class FolderWatch:
+    """New or changed files in one folder, reported once a burst of them has settled."""
+
+    def __init__(self, folder: Path, accept):
+        self.folder = folder
+        self.accept = accept
+        self.known = self._scan()  # name -> (size, mtime_ns) of files already handled
+        self.pending: dict[str, tuple[tuple[int, int], float, float]] = {}  # name -> (signature, first seen, last change)
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        found = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file() and self.accept(entry.name):
+                    st = entry.stat()
+                    found[entry.name] = (st.st_size, st.st_mtime_ns)
+        return found
+
+    def poll(self, settle: float) -> tuple[list[str], float | None]:
+        """Files of a settled burst and when its first file was seen, or ([], None) while one is still landing."""
+        now = time.monotonic()
+        current = self._scan()
+        for name in list(self.known):
+            if name not in current:  # archived or deleted; landing again counts as new
+                del self.known[name]
+        for name, signature in current.items():
+            if self.known.get(name) == signature:
+                continue
+            seen = self.pending.get(name)
+            if seen is None:
+                self.pending[name] = (signature, now, now)
+            elif seen[0] != signature:
+                self.pending[name] = (signature, seen[1], now)
+        for name in [n for n in self.pending if n not in current]:
+            del self.pending[name]
+
+        if not self.pending or any(now - changed < settle for _, _, changed in self.pending.values()):
+            return [], None
+        ready = sorted(self.pending)
+        first = min(seen for _, seen, _ in self.pending.values())
+        for name in ready:
+            self.known[name] = self.pending.pop(name)[0]
+        return ready, first
+
+
+class Ingest:
+    """The two scripts' processing steps behind one warm remover, applied to a few files at a time."""
+
+    def __init__(self, model: str, work_size: int | None, bottle_type: str, allow_duplicates: bool, trace: Path):
+        self.stock = load_script("process-bottles.py")
+        self.uploads = load_script("process-uploaded-bottles.py")
+        self.model = model
+        self.work_size = work_size
+        self.bottle_type = bottle_type
+        self.allow_duplicates = allow_duplicates
+        self.trace = trace
+        self.remover = get_remover(model, True, work_size)
+        self.remover.warm_up()
+        self.unlisted_slugs: dict[str, str] = {}  # upload filename -> slug given this session, kept on re-drops
+
+    def _load_manifest(self) -> dict:
+        if not self.stock.MANIFEST.exists():
+            return {"bottles": []}
+        with open(self.stock.MANIFEST, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _taken_slugs(self, bottles: list[dict]) -> set[str]:
+        """Slugs a new photo must not reuse: manifest entries, SINGLES/MULTIS, indexed bottles and written outputs."""
+        taken = {e["slug"] for e in bottles}
+        taken.update(self.uploads.SINGLES.values())
+        for slugs in self.uploads.MULTIS.values():
+            taken.update(slugs)
+        names = [src.rsplit("/", 1)[-1] for src in BottleIndex(self.stock.BOTTLE_INDEX).bottles]
+        names += [p.name for p in self.stock.OUT_DIR.glob(f"*{FULL_SUFFIX}")]
+        taken.update(name[:-len(FULL_SUFFIX)] for name in names if name.endswith(FULL_SUFFIX))
+        return taken
+
+    @staticmethod
+    def _free_slug(stem: str, taken: set[str]) -> str:
+        """slugify(stem), numbered (-2, -3, ...) until it is not in taken."""
+        base = slug = slugify(stem)
+        n = 2
+        while slug in taken:
+            slug, n = f"{base}-{n}", n + 1
+        return slug
+
+    def _new_entry(self, filename: str, bottles: list[dict]) -> dict:
+        """A manifest entry for a photo nobody has described yet, with a slug no other bottle uses."""
+        stem = Path(filename).stem
+        slug = self._free_slug(stem, self._taken_slugs(bottles))
+        return {"file": filename, "name": display_name(stem), "type": self.bottle_type, "slug": slug}
+
+    def _save_manifest(self, manifest: dict) -> None:
+        """Rewrite manifest.json atomically, one entry per line as it is hand-kept."""
+        lines = ["    { " + json.dumps(e, ensure_ascii=False)[1:-1] + " }" for e in manifest["bottles"]]
+        body = "{\n  \"bottles\": [\n" + ",\n".join(lines) + "\n  ]\n}\n"
+        tmp = self.stock.MANIFEST.with_suffix(".tmp")
+        tmp.write_text(body, encoding="utf-8")
+        os.replace(tmp, self.stock.MANIFEST)
+
+    def stock_photos(self, filenames: list[str], tracer: Tracer) -> list[str]:
+        """process-bottles.py for new stock photos; returns the outputs written."""
+        script = self.stock
+        manifest = self._load_manifest()
+        by_file = {e["file"]: e for e in manifest["bottles"]}
+        added = []
+        for filename in filenames:
+            if filename not in by_file:
+                by_file[filename] = self._new_entry(filename, manifest["bottles"] + added)
+                added.append(by_file[filename])
+        if added:
+            manifest["bottles"].extend(added)
+            self._save_manifest(manifest)
+            for entry in added:
+                print(f"  Added {entry['slug']} to {script.MANIFEST.name} as \"{entry['name']}\" ({entry['type']})")
+
+        state = BuildState(script.BUILD_STATE)
+        params = script.build_params(self.model, self.work_size)
+        index = HashIndex()
+        bottle_index = BottleIndex(script.BOTTLE_INDEX)
+        script.OUT_DIR.mkdir(parents=True, exist_ok=True)
+        script.ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+        written = []
+        for filename in filenames:
+            entry = by_file[filename]
+            slug = entry["slug"]
+            src = script.STOCK_DIR / filename
+            out = script.OUT_DIR / f"{slug}-full.png"
+            try:
+                digest = file_digest(src)
+                duplicate = index.admit_source(src, digest, slug, check=not out.exists() and not self.allow_duplicates)
+                if duplicate is not None:
+                    print(f"  SKIP {slug} — {filename} near-duplicates the source of {duplicate[0]} "
+                          f"({duplicate[1]} bits apart; --allow-duplicates to keep it)")
+                    continue
+                record = make_record(digest, params, "process-bottles", script.PIPELINE_VERSION)
+                if state.is_stale(out, record):
+                    result = script.process_entry(entry, self.model, True, self.work_size, digest=digest)
+                    tracer.extend(result["events"])
+                    print(f"  Done {slug}: {result['original_size']} -> {out.name} ({result['seconds']:.1f}s)")
+                    state.record(out, record)
+                    duplicate = index.add_output(out, slug)
+                    if duplicate is not None:
+                        print(f"  WARNING: {out.name} looks like {duplicate[0]}-full.png ({duplicate[1]} bits apart)")
+                    bottle_index.update(out, entry["name"], entry["type"], measure=False, described=result["described"],
+                                        order=manifest["bottles"].index(entry))
+                    written.append(out.name)
+                else:
+                    print(f"  SKIP {slug} — up to date")
+                archived = script.archive_source(entry)
+                if archived:
+                    print(f"    Archived original to {archived}")
+            except (OSError, ValueError) as e:  # a broken or vanished file must not stop the watch
+                print(f"  ERROR {filename}: {e}")
+        state.save()
+        index.save()
+        bottle_index.save()
+        return written
+
+    def upload_photos(self, filenames: list[str], tracer: Tracer) -> list[str]:
+        """process-uploaded-bottles.py for new uploads; returns the outputs written."""
+        script = self.uploads
+        state = BuildState(script.BUILD_STATE)
+        params = script.build_params(self.model, self.work_size)
+        index = HashIndex()
+        bottle_index = BottleIndex(script.BOTTLE_INDEX)
+        described = {}
+        unlisted = {}
+        for filename in filenames:
+            if filename in script.SKIP:
+                continue
+            try:
+                if filename in script.MULTIS:
+                    _, written = script.process_multi(filename, script.MULTIS[filename], self.remover, state, params,
+                                                      tracer, index, allow_duplicates=self.allow_duplicates)
+                    described.update(written)
+                    continue
+                slug = script.SINGLES.get(filename)
+                if slug is None:
+                    stem = Path(filename).stem
+                    slug = self.unlisted_slugs.get(filename)
+                    if slug is None:
+                        slug = self._free_slug(stem, self._taken_slugs(self._load_manifest()["bottles"]))
+                        if slug != slugify(stem):
+                            print(f"  {filename}: slug {slugify(stem)} is taken, using {slug}")
+                        self.unlisted_slugs[filename] = slug
+                    unlisted[slug] = display_name(stem)
+                _, written = script.process_single(filename, slug, self.remover, state, params, tracer, index,
+                                                   allow_duplicates=self.allow_duplicates)
+                described.update(written)
+            except (OSError, ValueError) as e:
+                print(f"  ERROR {filename}: {e}")
+
+        written = []
+        for slug, metadata in described.items():
+            out = script.NORM_DIR / f"{slug}-full.png"
+            # Listed uploads have hand-written entries in bottles.ts; the others are listed through the index
+            bottle_index.update(out, unlisted.get(slug), self.bottle_type if slug in unlisted else None,
+                                described=metadata)
+            written.append(out.name)
+        state.save()
+        index.save()
+        bottle_index.save()
+        return written
+
+
+def is_upload(name: str) -> bool:
+    """A raw upload, as opposed to an output the pipeline wrote next to it."""
+    return Path(name).suffix.lower() in IMAGE_SUFFIXES and not OUTPUT_NAME.search(name)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Process bottle photos as they land in the intake folders.")
+    parser.add_argument("--model", choices=MODELS, default=DEFAULT_MODEL, help="rembg model")
+    parser.add_argument("--work-size", type=int, metavar="PX",
+                        help="run rembg on a copy at most PX on its long side, upsampling only the mask")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL,
+                        help=f"seconds between folder listings (default: {POLL_INTERVAL})")
+    parser.add_argument("--settle", type=float, default=SETTLE_S,
+                        help=f"seconds a burst of files must stay unchanged before it is processed (default: {SETTLE_S})")
+    parser.add_argument("--type", choices=BOTTLE_TYPES, default="red",
+                        help="bottle type for photos that have no manifest or SINGLES entry (default: red)")
+    parser.add_argument("--allow-duplicates", action="store_true",
+                        help="process new photos even if they near-duplicate another source")
+    parser.add_argument("--trace", type=Path, default=RUN_LOG, help=f"run report to append to (default: {RUN_LOG})")
+    args = parser.parse_args()
+
+    print(f"Loading {args.model} ...")
+    try:
+        ingest = Ingest(args.model, args.work_size, args.type, args.allow_duplicates, args.trace)
+    except ImportError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    stock, uploads = ingest.stock, ingest.uploads
+    stock.STOCK_DIR.mkdir(parents=True, exist_ok=True)
+    uploads.NORM_DIR.mkdir(parents=True, exist_ok=True)
+    watches = [
+        (FolderWatch(stock.STOCK_DIR, lambda name: Path(name).suffix.lower() in IMAGE_SUFFIXES), ingest.stock_photos),
+        (FolderWatch(uploads.NORM_DIR, is_upload), ingest.upload_photos),
+    ]
+    print(f"Watching {stock.STOCK_DIR} and {uploads.NORM_DIR} every {args.interval:g}s "
+          f"(session load {ingest.remover.session_load_s * 1000:.0f} ms; Ctrl+C to stop)")
+    try:
+        while True:
+            for watch, handle in watches:
+                ready, first_seen = watch.poll(args.settle)
+                if not ready:
+                    continue
+                print(f"\n=== {len(ready)} new in {watch.folder.name}/ ===")
+                tracer = Tracer("watch-bottles")
+                written = handle(ready, tracer)
+                tracer.write(args.trace)
+                print(f"  {len(written)} output(s) ready {time.monotonic() - first_seen:.1f}s after the first file landed")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\nStopped")
+        print(ingest.remover.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import { describe, it, expect } from "vitest";
-import { BOTTLES, isSparklingBottle } from "@/lib/bottles";
+import { BOTTLES, BOTTLE_META, isSparklingBottle } from "@/lib/bottles";
+import { ATLAS_CANVAS, ATLAS_SHEETS, BOTTLE_SPRITES } from "@/lib/bottle-atlas";
 
 describe("bottles", () => {
   it("has bottles defined", () => {
@@ -28,4 +29,34 @@ describe("bottles", () => {
     expect(isSparklingBottle("Shiraz Cabernet")).toBe(false);
     expect(isSparklingBottle("Minarete")).toBe(false);
   });
+
+  it("bottle metadata bboxes fit inside their image", () => {
+    for (const meta of Object.values(BOTTLE_META)) {
+      if (!meta.bbox) continue;
+      const [left, top, right, bottom] = meta.bbox;
+      expect(left).toBeLessThan(right);
+      expect(top).toBeLessThan(bottom);
+      expect(right).toBeLessThanOrEqual(meta.width);
+      expect(bottom).toBeLessThanOrEqual(meta.height);
+      expect(meta.bytes.png).toBeDefined();
+      expect(meta.placeholder).toMatch(/^data:image\/webp;base64,/);
+    }
+  });
+
+  it("lists pipeline-added bottles in manifest order", () => {
+    const orders = BOTTLES.map((b) => (BOTTLE_META[b.src] as { order?: number } | undefined)?.order)
+      .filter((order): order is number => order !== undefined);
+    expect(orders).toEqual([...orders].sort((a, b) => a - b));
+  });
+
+  it("atlas sprites fit inside their sheet and canvas", () => {
+    for (const sprite of Object.values(BOTTLE_SPRITES)) {
+      const sheet = ATLAS_SHEETS[sprite.sheet];
+      expect(sheet).toBeDefined();
+      expect(sprite.x + sprite.w).toBeLessThanOrEqual(sheet.w);
+      expect(sprite.y + sprite.h).toBeLessThanOrEqual(sheet.h);
+      expect(sprite.offsetX + sprite.w).toBeLessThanOrEqual(ATLAS_CANVAS.w);
+      expect(sprite.offsetY + sprite.h).toBeLessThanOrEqual(ATLAS_CANVAS.h);
+    }
+  });
 });
@@ -3,8 +3,10 @@
 import { useState, useCallback, useRef, useEffect, forwardRef, useImperativeHandle } from "react";
 import { motion, AnimatePresence } from "framer-motion";
 import Image from "next/image";
-import { BOTTLES, isSparklingBottle, BOTTLE_INFO } from "@/lib/bottles";
+import { BOTTLES, isSparklingBottle, BOTTLE_INFO, BOTTLE_META } from "@/lib/bottles";
+import { BOTTLE_SPRITES } from "@/lib/bottle-atlas";
 import BubbleParticles from "./BubbleParticles";
+import BottleSprite from "./BottleSprite";
 
 type BottleCarouselProps = {
   isCompact?: boolean;
@@ -82,6 +84,8 @@ const BottleCarousel = forwardRef<BottleCarouselRef, BottleCarouselProps>(
     useImperativeHandle(ref, () => ({ cycleRed: cycle, cycleWhite: cycle }));
 
     const current = BOTTLES[index];
+    const sprite = BOTTLE_SPRITES[current.src];
+    const placeholder = BOTTLE_META[current.src]?.placeholder;
     const info = BOTTLE_INFO[current.name];
     const showBubbles = isSparklingBottle(current.name);
 
@@ -120,15 +124,28 @@ const BottleCarousel = forwardRef<BottleCarouselRef, BottleCarouselProps>(
               tabIndex={0}
               aria-label={`${current.name} — hover or click to change`}
             >
-              <Image
-                src={current.src}
-                alt={current.name}
-                width={400}
-                height={800}
-                className="w-full h-full"
-                priority
-                style={{ objectFit: "contain", objectPosition: "center" }}
-              />
+              {/* Atlas sprite when the bottle is packed; falls back to its own PNG */}
+              {sprite ? (
+                <BottleSprite
+                  sprite={sprite}
+                  alt={current.name}
+                  width={bottleWidth}
+                  height={containerHeight}
+                  placeholder={placeholder}
+                />
+              ) : (
+                <Image
+                  src={current.src}
+                  alt={current.name}
+                  width={400}
+                  height={800}
+                  className="w-full h-full"
+                  priority
+                  placeholder={placeholder ? "blur" : "empty"}
+                  blurDataURL={placeholder}
+                  style={{ objectFit: "contain", objectPosition: "center" }}
+                />
+              )}
             </motion.div>
           </AnimatePresence>
 
@@ -0,0 +1,63 @@
+import { useState } from "react";
+import { ATLAS_CANVAS, ATLAS_SHEETS, type BottleSprite as Sprite } from "@/lib/bottle-atlas";
+
+type BottleSpriteProps = {
+  sprite: Sprite;
+  alt: string;
+  width: string;
+  height: string;
+  placeholder?: string;
+};
+
+const pct = (n: number, of: number) => `${(n / of) * 100}%`;
+
+/**
+ * Draws one bottle from the sprite atlas where it sits on its 400x800 canvas,
+ * sized like an objectFit "contain" image inside width x height.
+ * The blurred placeholder fills the canvas until the sheet has loaded.
+ */
+export default function BottleSprite({ sprite, alt, width, height, placeholder }: BottleSpriteProps) {
+  const sheet = ATLAS_SHEETS[sprite.sheet];
+  const aspect = ATLAS_CANVAS.w / ATLAS_CANVAS.h;
+  const [loaded, setLoaded] = useState(false);
+
+  return (
+    <div
+      className="relative"
+      style={{
+        width: `min(${width}, calc(${height} * ${aspect}))`,
+        aspectRatio: `${ATLAS_CANVAS.w} / ${ATLAS_CANVAS.h}`,
+        ...(placeholder && !loaded ? { backgroundImage: `url(${placeholder})`, backgroundSize: "100% 100%" } : {}),
+      }}
+    >
+      <div
+        className="absolute overflow-hidden"
+        style={{
+          left: pct(sprite.offsetX, ATLAS_CANVAS.w),
+          top: pct(sprite.offsetY, ATLAS_CANVAS.h),
+          width: pct(sprite.w, ATLAS_CANVAS.w),
+          height: pct(sprite.h, ATLAS_CANVAS.h),
+        }}
+      >
+        {/* eslint-disable-next-line @next/next/no-img-element */}
+        <img
+          src={sheet.src}
+          alt={alt}
+          draggable={false}
+          ref={(el) => {
+            if (el?.complete) setLoaded(true); // already decoded (cached) before hydration
+          }}
+          onLoad={() => setLoaded(true)}
+          className="absolute"
+          style={{
+            maxWidth: "none",
+            width: pct(sheet.w, sprite.w),
+            height: pct(sheet.h, sprite.h),
+            left: pct(-sprite.x, sprite.w),
+            top: pct(-sprite.y, sprite.h),
+          }}
+        />
+      </div>
+    </div>
+  );
+}
@@ -2,16 +2,28 @@
 
 import { useEffect } from "react";
 import { BOTTLES } from "@/lib/bottles";
+import { ATLAS_SHEETS, BOTTLE_SPRITES } from "@/lib/bottle-atlas";
+
+// Atlas sheet for bottles that are packed, the bottle's own PNG otherwise
+const imageUrl = (src: string) => {
+  const sprite = BOTTLE_SPRITES[src];
+  return sprite ? ATLAS_SHEETS[sprite.sheet].src : src;
+};
 
 /**
  * Preload bottle images for snappy carousel transitions.
+ * Packed bottles share atlas sheets: the first 4 have a small sheet of their own, the rest share another.
  * First 4 bottles load immediately (visible on home), rest via requestIdleCallback.
  */
 export function useBottlePreload() {
   useEffect(() => {
+    const seen = new Set<string>();
     const preload = (src: string) => {
+      const url = imageUrl(src);
+      if (seen.has(url)) return;
+      seen.add(url);
       const img = new Image();
-      img.src = src;
+      img.src = url;
     };
 
     // Preload first 4 immediately (above the fold)
@@ -0,0 +1,48 @@
+// Generated by scripts/build-bottle-atlas.py — do not edit by hand.
+
+export type BottleSprite = {
+  sheet: number;
+  x: number;
+  y: number;
+  w: number;
+  h: number;
+  offsetX: number;
+  offsetY: number;
+};
+
+export type AtlasSheet = { src: string; w: number; h: number };
+
+export const ATLAS_CANVAS = { w: 400, h: 800 };
+
+export const ATLAS_SHEETS: AtlasSheet[] = [
+  { src: "/bottles/atlas/bottles-0.webp?v=d1350fe8", w: 588, h: 577 },
+  { src: "/bottles/atlas/bottles-1.webp?v=59ac2589", w: 2045, h: 1156 },
+];
+
+export const BOTTLE_SPRITES: Record<string, BottleSprite> = {
+  "/bottles/normalized/costieres-red-full.png": { sheet: 0, x: 0, y: 0, w: 139, h: 575, offsetX: 130, offsetY: 113 },
+  "/bottles/normalized/shiraz-cabernet-full.png": { sheet: 0, x: 446, y: 0, w: 140, h: 573, offsetX: 130, offsetY: 113 },
+  "/bottles/normalized/red-label-full.png": { sheet: 0, x: 294, y: 0, w: 150, h: 574, offsetX: 125, offsetY: 113 },
+  "/bottles/normalized/gold-label-full.png": { sheet: 0, x: 141, y: 0, w: 151, h: 574, offsetX: 124, offsetY: 113 },
+  "/bottles/normalized/colheita-full.png": { sheet: 1, x: 0, y: 0, w: 165, h: 576, offsetX: 117, offsetY: 112 },
+  "/bottles/normalized/cotes-du-rhone-villages-full.png": { sheet: 1, x: 1296, y: 0, w: 154, h: 576, offsetX: 123, offsetY: 112 },
+  "/bottles/normalized/dolcetto-dasti-full.png": { sheet: 1, x: 148, y: 578, w: 142, h: 576, offsetX: 129, offsetY: 112 },
+  "/bottles/normalized/minarete-full.png": { sheet: 1, x: 292, y: 578, w: 141, h: 576, offsetX: 129, offsetY: 112 },
+  "/bottles/normalized/yarra-valley-pinot-noir-full.png": { sheet: 1, x: 167, y: 0, w: 165, h: 576, offsetX: 117, offsetY: 112 },
+  "/bottles/normalized/hj-fabre-malbec-full.png": { sheet: 1, x: 1909, y: 0, w: 134, h: 576, offsetX: 133, offsetY: 112 },
+  "/bottles/normalized/rodolfo-sadler-malbec-full.png": { sheet: 1, x: 435, y: 578, w: 127, h: 576, offsetX: 136, offsetY: 112 },
+  "/bottles/normalized/telegraph-road-full.png": { sheet: 1, x: 334, y: 0, w: 162, h: 576, offsetX: 119, offsetY: 112 },
+  "/bottles/normalized/auction-house-chardonnay-full.png": { sheet: 1, x: 1760, y: 0, w: 147, h: 576, offsetX: 126, offsetY: 112 },
+  "/bottles/normalized/joey-brown-full.png": { sheet: 1, x: 0, y: 578, w: 146, h: 576, offsetX: 127, offsetY: 112 },
+  "/bottles/normalized/el-coto-blanco-full.png": { sheet: 1, x: 564, y: 578, w: 91, h: 576, offsetX: 154, offsetY: 112 },
+  "/bottles/normalized/perrin-cdr-reserve-full.png": { sheet: 1, x: 498, y: 0, w: 162, h: 576, offsetX: 119, offsetY: 112 },
+  "/bottles/normalized/cannonball-chardonnay-full.png": { sheet: 1, x: 1608, y: 0, w: 150, h: 576, offsetX: 125, offsetY: 112 },
+  "/bottles/normalized/blason-dargent-full.png": { sheet: 1, x: 1139, y: 0, w: 155, h: 576, offsetX: 122, offsetY: 112 },
+  "/bottles/normalized/delamotte-full.png": { sheet: 1, x: 815, y: 578, w: 155, h: 575, offsetX: 122, offsetY: 113 },
+  "/bottles/normalized/gobillard-full.png": { sheet: 1, x: 657, y: 578, w: 156, h: 575, offsetX: 122, offsetY: 113 },
+  "/bottles/normalized/hattingley-reserve-full.png": { sheet: 1, x: 1452, y: 0, w: 154, h: 576, offsetX: 123, offsetY: 112 },
+  "/bottles/normalized/hattingley-rose-full.png": { sheet: 1, x: 972, y: 578, w: 154, h: 575, offsetX: 123, offsetY: 112 },
+  "/bottles/normalized/hattingley-blanc-de-blancs-full.png": { sheet: 1, x: 822, y: 0, w: 157, h: 576, offsetX: 121, offsetY: 112 },
+  "/bottles/normalized/moet-brut-imperial-full.png": { sheet: 1, x: 662, y: 0, w: 158, h: 576, offsetX: 121, offsetY: 112 },
+  "/bottles/normalized/moet-rose-imperial-full.png": { sheet: 1, x: 981, y: 0, w: 156, h: 576, offsetX: 122, offsetY: 112 },
+};
@@ -1,8 +1,16 @@
-import { Bottle } from "./types";
+import { Bottle, BottleMeta, BottleType } from "./types";
+import bottleIndex from "./bottle-index.json";
 
 const BASE = "/bottles/normalized";
 
-export const BOTTLES: Bottle[] = [
+type IndexEntry = BottleMeta & { name?: string; type?: BottleType; order?: number };
+
+const INDEX = bottleIndex.bottles as Record<string, IndexEntry>;
+
+// Size, alpha bbox, dominant colour and bytes per format of every normalized bottle, keyed by src
+export const BOTTLE_META: Record<string, BottleMeta> = INDEX;
+
+const LISTED: Bottle[] = [
   // ── Existing ──
   { name: "Costières de Nîmes", src: `${BASE}/costieres-red-full.png`, type: "red" },
   { name: "Shiraz Cabernet", src: `${BASE}/shiraz-cabernet-full.png`, type: "red" },
@@ -44,6 +52,16 @@ export const BOTTLES: Bottle[] = [
   { name: "Moët Rosé Impérial", src: `${BASE}/moet-rose-imperial-full.png`, type: "rosé" },
 ];
 
+// Bottles added by scripts/process-bottles.py from assets/manifest.json, in manifest order
+// (the index is written with sorted keys; entries without an order follow, by src)
+const UNORDERED = Number.MAX_SAFE_INTEGER;
+const GENERATED: Bottle[] = Object.entries(INDEX)
+  .filter(([src, entry]) => entry.name && entry.type && !LISTED.some((b) => b.src === src))
+  .sort(([, a], [, b]) => (a.order ?? UNORDERED) - (b.order ?? UNORDERED))
+  .map(([src, entry]) => ({ name: entry.name!, src, type: entry.type! }));
+
+export const BOTTLES: Bottle[] = [...LISTED, ...GENERATED];
+
 export type BottleInfo = {
   grape: string;
   region: string;
@@ -73,3 +73,13 @@ export type Bottle = {
   src: string;
   type: BottleType;
 };
+
+// Measured by scripts/bottle_pipeline/metadata.py; see src/lib/bottle-index.json
+export type BottleMeta = {
+  width: number;
+  height: number;
+  bbox: [number, number, number, number] | null; // alpha bounds: left, top, right, bottom
+  dominant: string | null;
+  placeholder: string; // blurred 16x32 WebP data URI, shown until the image loads
+  bytes: Record<string, Record<string, number>>; // format -> width -> bytes
+};